@@ -11,8 +11,9 @@
 #define TRAVERSE_STEP_PIN   12    // Step pulse pin for Traverse Motor
 #define TRAVERSE_ENABLE_PIN 33    // Enable pin for Traverse Motor (LOW enables)
 
-// Hall Sensor Pin
+// Hall Sensor Pins
 #define HALL_SENSOR_PIN     34
+#define HALL2_SENSOR_PIN    35    // Hall sensor on the 2nd winder's spindle
 
 // Additional Winder Motor Pins
 #define WINDER2_DIR_PIN     25    // Direction pin for 2nd Winder Motor
@@ -26,365 +27,563 @@
 
 //-------------------- Global Objects --------------------
 FastAccelStepperEngine engine = FastAccelStepperEngine();
-FastAccelStepper *winderStepper = NULL;
-FastAccelStepper *winder2Stepper = NULL;
 FastAccelStepper *traverseStepper = NULL;
 FastAccelStepper *traverse2Stepper = NULL;
 
 //-------------------- Global Variables --------------------
-// Control flags
-bool motorsRunning = false;  
-
-// Winder Motor Variables
-volatile long windCount = 0;      // Incremented via ISR on hall sensor
-int desiredWindCount = 1000;      // Target wind count
-long winderSpeed = 150000;        // Default winder speed (Hz)
+// Winder Motor Settings
 long winderAcceleration = 20000;  // Winder acceleration
 const int slowdownWinds = 111;    // Slowdown threshold
 
-// Traverse Motor Variables
+// Optional slowdown profile uploaded with "decel:<span>,<p0>,...,<pN-1>".
+// Entry i is the speed in permille of winderSpeed with span*i/(N-1) winds
+// left after the current one; beyond span the winder runs at full speed.
+const int MAX_DECEL_POINTS = 32;
+
+// Traverse Motor Settings
 const int STEPS_PER_REVOLUTION = 3200;  // 3200 microsteps per revolution
-int traverseStepDelay = 500;      // Delay per half-step (µs)
-int leftSweepLimit = 0;           // Left sweep limit in steps
-int rightSweepLimit = 6400;       // Right sweep limit in steps
-bool traverseMovingRight = true;  // Traverse direction flag
-int currentTraverseStep = 0;      // Current traverse position in steps
-int currentTraverse2Step = 0;     // Current traverse2 position in steps
+
+// A traverse step lasts 2 x traverseStepDelay + 100 µs, as when one pass
+// pulsed both traverse motors in turn, and loop() reads the hall sensors
+// after every STEPS_PER_PASS steps. The traverse planner and the slowdown
+// profiles assume this timing.
+const unsigned long STEP_OVERHEAD_US = 100;
+const int STEPS_PER_PASS = 5;
+
+// startMotors() steps the traverse 50 times before the winder starts, then
+// waits a second; the next step of the sequence runs on each loop() pass
+const int START_BURST_STEPS = 50;
+const unsigned long START_BURST_INTERVAL = 5300;  // µs between burst steps
+const unsigned long START_PAUSE = 1000;           // ms before the winder starts
+
+//-------------------- Winding Channels --------------------
+// Channel 1 is Winder 1 and Traverse 1 with the hall sensor on
+// HALL_SENSOR_PIN; channel 2 is Winder 2 and Traverse 2 with HALL2_SENSOR_PIN.
+// Each winds its own coil with its own count, target, speed and limits.
+// Commands prefixed "2:" go to channel 2 and so does every line printed
+// about it; unprefixed commands go to channel 1, so a host that only knows
+// one channel sees the same protocol as before.
+const int CHANNEL_COUNT = 2;
+
+enum StartPhase { START_IDLE, START_BURST, START_PAUSING };
+
+struct WindingChannel {
+  const char *replyPrefix;        // "" for channel 1, "2:" for channel 2
+  int winderDirPin;
+  int winderStepPin;
+  int winderEnablePin;
+  int traverseDirPin;
+  int traverseStepPin;
+  int traverseEnablePin;
+  int hallPin;
+  FastAccelStepper *winderStepper;
+  
+  // Control flags
+  bool motorsRunning;
+  bool addressed;                 // Channel 2 only reports once it has had a command
+  StartPhase startPhase;
+  int startStepsLeft;
+  unsigned long startPhaseTime;   // µs of the last burst step, or ms the pause began
+  
+  // Winder
+  volatile long windCount;        // Incremented on each hall sensor edge
+  int desiredWindCount;           // Target wind count
+  long winderSpeed;               // Winder speed (Hz)
+  long lastAdjustedSpeed;         // Last speed applied by updateWinderSpeed()
+  int decelPoints;                // 0 = linear slowdown over slowdownWinds
+  int decelSpan;
+  int decelTable[MAX_DECEL_POINTS];
+  int lastSensorState;
+  
+  // Traverse
+  int traverseStepDelay;          // Delay per half-step (µs)
+  int leftSweepLimit;             // Left sweep limit in steps
+  int rightSweepLimit;            // Right sweep limit in steps
+  bool traverseMovingRight;       // Traverse direction flag
+  int currentTraverseStep;        // Current traverse position in steps
+  unsigned long nextStepTime;     // micros() at which the next step is due
+};
+
+WindingChannel channels[CHANNEL_COUNT];
 
 //-------------------- Status Timer Variables --------------------
 unsigned long lastStatusPrintTime = 0;
 const unsigned long statusPrintInterval = 1000; // 1 second
 
+//-------------------- Telemetry Variables --------------------
+// Binary frames: 0xA5 0x5A, uint32 wind count, uint32 millis, uint32 winder Hz,
+// int32 traverse position (all little endian), uint8 sum of the 16 payload bytes.
+// Frames carry channel 1; channel 2 always reports in text.
+bool binaryTelemetry = false;     // Enabled by the GUI with "telemetry:bin"
+const int TELEMETRY_FRAME_SIZE = 19;
+
 //-------------------- Function Prototypes --------------------
+void initChannel(WindingChannel &ch, const char *replyPrefix, int winderDir, int winderStep, int winderEnable,
+                 int traverseDir, int traverseStep, int traverseEnable, int hallPin);
 void processCommand(String command);
-void updateWinderSpeed();
-void moveTraverseToPosition(int targetSteps);
-void moveTraverse2ToPosition(int targetSteps);
-void startMotors();
-void stopMotors();
-void countWinds();
+void processChannelCommand(WindingChannel &ch, String command);
+void updateWinderSpeed(WindingChannel &ch);
+void moveTraverseToPosition(WindingChannel &ch, int targetSteps);
+void startMotors(WindingChannel &ch);
+void continueStart(WindingChannel &ch);
+void stopMotors(WindingChannel &ch);
+void countWinds(WindingChannel &ch);
+void pulseStep(int pin);
 void pulseTraverseStep(int pin, int delay_us);
-void controlBothTraverseMotors(int stepDelay, int leftLimit, int rightLimit);
+unsigned long traverseStepPeriod(WindingChannel &ch);
+void stepTraverse(WindingChannel &ch);
 void disableAllMotors();
+void sendTelemetryFrame();
+void setDecelProfile(WindingChannel &ch, String values);
+float decelFactor(WindingChannel &ch, int remainingWinds);
+
+//-------------------- Channel Setup --------------------
+void initChannel(WindingChannel &ch, const char *replyPrefix, int winderDir, int winderStep, int winderEnable,
+                 int traverseDir, int traverseStep, int traverseEnable, int hallPin) {
+  ch.replyPrefix = replyPrefix;
+  ch.winderDirPin = winderDir;
+  ch.winderStepPin = winderStep;
+  ch.winderEnablePin = winderEnable;
+  ch.traverseDirPin = traverseDir;
+  ch.traverseStepPin = traverseStep;
+  ch.traverseEnablePin = traverseEnable;
+  ch.hallPin = hallPin;
+  ch.winderStepper = NULL;
+  
+  ch.motorsRunning = false;
+  ch.addressed = false;
+  ch.startPhase = START_IDLE;
+  ch.startStepsLeft = 0;
+  ch.startPhaseTime = 0;
+  
+  ch.windCount = 0;
+  ch.desiredWindCount = 1000;
+  ch.winderSpeed = 150000;
+  ch.lastAdjustedSpeed = 0;
+  ch.decelPoints = 0;
+  ch.decelSpan = 0;
+  ch.lastSensorState = HIGH;
+  
+  ch.traverseStepDelay = 500;
+  ch.leftSweepLimit = 0;
+  ch.rightSweepLimit = 6400;
+  ch.traverseMovingRight = true;
+  ch.currentTraverseStep = 0;
+  ch.nextStepTime = 0;
+}
 
 //-------------------- Helper Function for Step Pulses --------------------
-void pulseTraverseStep(int pin, int delay_us) {
+void pulseStep(int pin) {
   digitalWrite(pin, HIGH);
   delayMicroseconds(10); // Ensure minimum pulse width
   digitalWrite(pin, LOW);
+}
+
+void pulseTraverseStep(int pin, int delay_us) {
+  pulseStep(pin);
   delayMicroseconds(delay_us - 10 > 0 ? delay_us - 10 : 1); // Maintain timing
 }
 
-//-------------------- Control Both Traverse Motors --------------------
-void controlBothTraverseMotors(int stepDelay, int leftLimit, int rightLimit) {
-  if (traverseMovingRight) {
-    // Both motors moving right (increasing position)
-    if (currentTraverseStep >= rightLimit) {
-      // Reached right limit, change direction for both motors
-      traverseMovingRight = false;
+unsigned long traverseStepPeriod(WindingChannel &ch) {
+  return 2UL * ch.traverseStepDelay + STEP_OVERHEAD_US;
+}
+
+//-------------------- Traverse Sweep --------------------
+// Called when the channel's step is due; loop() keeps the step rate
+void stepTraverse(WindingChannel &ch) {
+  if (ch.traverseMovingRight) {
+    if (ch.currentTraverseStep >= ch.rightSweepLimit) {
+      // Reached right limit, change direction
+      ch.traverseMovingRight = false;
+      Serial.print(ch.replyPrefix);
       Serial.println("Traverse: Changing direction to LEFT");
     } else {
-      // Continue moving right for both motors
-      // Traverse 1
-      digitalWrite(TRAVERSE_DIR_PIN, HIGH); // Direction for RIGHT movement
-      pulseTraverseStep(TRAVERSE_STEP_PIN, stepDelay);
-      currentTraverseStep++; // Update position
-      
-      // Traverse 2 - SAME direction
-      digitalWrite(TRAVERSE2_DIR_PIN, HIGH); // Direction for RIGHT movement
-      pulseTraverseStep(TRAVERSE2_STEP_PIN, stepDelay);
-      currentTraverse2Step++; // Update position
+      digitalWrite(ch.traverseDirPin, HIGH); // Direction for RIGHT movement
+      pulseStep(ch.traverseStepPin);
+      ch.currentTraverseStep++; // Update position
     }
   } else {
-    // Both motors moving left (decreasing position)
-    if (currentTraverseStep <= leftLimit) {
-      // Reached left limit, change direction for both motors
-      traverseMovingRight = true;
+    if (ch.currentTraverseStep <= ch.leftSweepLimit) {
+      // Reached left limit, change direction
+      ch.traverseMovingRight = true;
+      Serial.print(ch.replyPrefix);
       Serial.println("Traverse: Changing direction to RIGHT");
     } else {
-      // Continue moving left for both motors
-      // Traverse 1
-      digitalWrite(TRAVERSE_DIR_PIN, LOW); // Direction for LEFT movement
-      pulseTraverseStep(TRAVERSE_STEP_PIN, stepDelay);
-      currentTraverseStep--; // Update position
-      
-      // Traverse 2 - SAME direction
-      digitalWrite(TRAVERSE2_DIR_PIN, LOW); // Direction for LEFT movement
-      pulseTraverseStep(TRAVERSE2_STEP_PIN, stepDelay);
-      currentTraverse2Step--; // Update position
+      digitalWrite(ch.traverseDirPin, LOW); // Direction for LEFT movement
+      pulseStep(ch.traverseStepPin);
+      ch.currentTraverseStep--; // Update position
     }
   }
 }
 
+//-------------------- Binary Telemetry Frame --------------------
+void sendTelemetryFrame() {
+  WindingChannel &ch = channels[0];
+  uint8_t frame[TELEMETRY_FRAME_SIZE];
+  uint32_t count = ch.windCount;
+  uint32_t timestamp = millis();
+  uint32_t speedHz = 0;
+  int32_t traversePosition = ch.currentTraverseStep;
+  
+  if (ch.winderStepper) {
+    speedHz = abs(ch.winderStepper->getCurrentSpeedInMilliHz()) / 1000;
+  }
+  
+  frame[0] = 0xA5;
+  frame[1] = 0x5A;
+  memcpy(&frame[2], &count, 4);          // ESP32 is little endian
+  memcpy(&frame[6], &timestamp, 4);
+  memcpy(&frame[10], &speedHz, 4);
+  memcpy(&frame[14], &traversePosition, 4);
+  
+  uint8_t checksum = 0;
+  for (int i = 2; i < TELEMETRY_FRAME_SIZE - 1; i++) {
+    checksum += frame[i];
+  }
+  frame[TELEMETRY_FRAME_SIZE - 1] = checksum;
+  
+  Serial.write(frame, TELEMETRY_FRAME_SIZE);
+}
+
 //-------------------- Process Serial Commands --------------------
 void processCommand(String command) {
+  // "2:N500" is N500 for channel 2; "1:" is accepted for channel 1 too
+  if (command.length() > 2 && command.charAt(1) == ':' &&
+      command.charAt(0) >= '1' && command.charAt(0) < '1' + CHANNEL_COUNT) {
+    WindingChannel &ch = channels[command.charAt(0) - '1'];
+    ch.addressed = true;
+    processChannelCommand(ch, command.substring(2));
+  }
+  else if (command == "disable_all_motors") {
+    disableAllMotors();
+  }
+  else if (command == "telemetry:bin") {
+    binaryTelemetry = true;
+    Serial.println("Telemetry mode: binary");
+  }
+  else if (command == "telemetry:text") {
+    binaryTelemetry = false;
+    Serial.println("Telemetry mode: text");
+  }
+  else {
+    processChannelCommand(channels[0], command);
+  }
+}
+
+void processChannelCommand(WindingChannel &ch, String command) {
   if (command == "S") {
-    startMotors();
+    startMotors(ch);
   }
   else if (command == "T") {
-    stopMotors();
+    stopMotors(ch);
   }
   else if (command == "R") {
-    windCount = 0;
+    ch.windCount = 0;
+    Serial.print(ch.replyPrefix);
     Serial.println("Wind count reset to 0.");
+    Serial.print(ch.replyPrefix);
     Serial.print("Current wind count: ");
-    Serial.println(windCount);
-  
+    Serial.println(ch.windCount);
+    
     // Monitor the Hall sensor status
+    Serial.print(ch.replyPrefix);
     Serial.print("Hall sensor current state: ");
-    Serial.println(digitalRead(HALL_SENSOR_PIN) == HIGH ? "HIGH" : "LOW");
+    Serial.println(digitalRead(ch.hallPin) == HIGH ? "HIGH" : "LOW");
   }
   else if (command.startsWith("N")) {
     int newWindCount = command.substring(1).toInt();
     if (newWindCount > 0) {
-      desiredWindCount = newWindCount;
+      ch.desiredWindCount = newWindCount;
+      Serial.print(ch.replyPrefix);
       Serial.print("Desired wind count set to ");
-      Serial.println(desiredWindCount);
+      Serial.println(ch.desiredWindCount);
     }
   }
   else if (command.startsWith("w_speed:")) {
     long newSpeed = command.substring(8).toInt();
     if (newSpeed > 0) {
-      winderSpeed = newSpeed;
-      if (winderStepper && motorsRunning) {
-        winderStepper->setSpeedInHz(winderSpeed);
-      }
-      if (winder2Stepper && motorsRunning) {
-        winder2Stepper->setSpeedInHz(winderSpeed);
+      ch.winderSpeed = newSpeed;
+      if (ch.winderStepper && ch.motorsRunning) {
+        ch.winderStepper->setSpeedInHz(ch.winderSpeed);
       }
+      Serial.print(ch.replyPrefix);
       Serial.print("Winder speed set to ");
-      Serial.print(winderSpeed);
+      Serial.print(ch.winderSpeed);
       Serial.println(" Hz");
     }
   }
   else if (command.startsWith("t_speed:")) {
     int newDelay = command.substring(8).toInt();
     if (newDelay > 0) {
-      traverseStepDelay = newDelay;
+      ch.traverseStepDelay = newDelay;
+      Serial.print(ch.replyPrefix);
       Serial.print("Traverse step delay set to ");
-      Serial.print(traverseStepDelay);
+      Serial.print(ch.traverseStepDelay);
       Serial.println(" microseconds");
     }
   }
   else if (command.startsWith("t_leftlimit:")) {
     int newLimit = command.substring(12).toInt();
-    leftSweepLimit = newLimit;
+    ch.leftSweepLimit = newLimit;
+    Serial.print(ch.replyPrefix);
     Serial.print("Left sweep limit set to ");
-    Serial.println(leftSweepLimit);
+    Serial.println(ch.leftSweepLimit);
   }
   else if (command.startsWith("t_rightlimit:")) {
     int newLimit = command.substring(13).toInt();
+    Serial.print(ch.replyPrefix);
     if (newLimit >= 0 && newLimit <= 12800) {  // Allow up to 4 full revolutions
-      rightSweepLimit = newLimit;
+      ch.rightSweepLimit = newLimit;
       Serial.print("Right sweep limit set to: ");
-      Serial.println(rightSweepLimit);
+      Serial.println(ch.rightSweepLimit);
     } else {
       Serial.println("Error: Right limit must be between 0 and 12800");
     }
   }
   else if (command == "t_home") {
-    currentTraverseStep = 0;
+    ch.currentTraverseStep = 0;
+    Serial.print(ch.replyPrefix);
     Serial.println("Traverse position reset to home (0)");
   }
-  else if (command == "disable_all_motors") {
-    disableAllMotors();
+  else if (command == "decel:off") {
+    ch.decelPoints = 0;
+    Serial.print(ch.replyPrefix);
+    Serial.println("Deceleration profile off");
+  }
+  else if (command.startsWith("decel:")) {
+    setDecelProfile(ch, command.substring(6));
   }
   else {
+    Serial.print(ch.replyPrefix);
     Serial.print("Unknown command: ");
     Serial.println(command);
   }
 }
 
+//-------------------- Deceleration Profile --------------------
+void setDecelProfile(WindingChannel &ch, String values) {
+  int parsed[MAX_DECEL_POINTS + 1];
+  int count = 0;
+  int start = 0;
+  while (start <= (int)values.length() && count <= MAX_DECEL_POINTS) {
+    int comma = values.indexOf(',', start);
+    if (comma < 0) comma = values.length();
+    parsed[count++] = values.substring(start, comma).toInt();
+    start = comma + 1;
+  }
+  
+  Serial.print(ch.replyPrefix);
+  if (count < 3 || start <= (int)values.length() || parsed[0] <= 0) {
+    Serial.println("Error: Deceleration profile needs a span and 2 to 32 points");
+    return;
+  }
+  for (int i = 1; i < count; i++) {
+    if (parsed[i] <= 0 || parsed[i] > 1000) {
+      Serial.println("Error: Deceleration profile points must be 1 to 1000");
+      return;
+    }
+  }
+  
+  ch.decelSpan = parsed[0];
+  ch.decelPoints = count - 1;
+  for (int i = 0; i < ch.decelPoints; i++) {
+    ch.decelTable[i] = parsed[i + 1];
+  }
+  Serial.print("Deceleration profile set: ");
+  Serial.print(ch.decelPoints);
+  Serial.print(" points over ");
+  Serial.print(ch.decelSpan);
+  Serial.println(" winds");
+}
+
+float decelFactor(WindingChannel &ch, int remainingWinds) {
+  int after = remainingWinds - 1;
+  if (after >= ch.decelSpan) return 1.0f;
+  if (after < 0) after = 0;
+  float position = after * (ch.decelPoints - 1) / (float)ch.decelSpan;
+  int index = (int)position;
+  int next = index + 1 < ch.decelPoints ? index + 1 : index;
+  float fraction = position - index;
+  return (ch.decelTable[index] + (ch.decelTable[next] - ch.decelTable[index]) * fraction) / 1000.0f;
+}
+
 //-------------------- Start Motors Function --------------------
-void startMotors() {
-  if (!motorsRunning) {
-    // Enable traverse motors first
-    digitalWrite(TRAVERSE_ENABLE_PIN, LOW);
-    digitalWrite(TRAVERSE2_ENABLE_PIN, LOW);
+void startMotors(WindingChannel &ch) {
+  if (!ch.motorsRunning && ch.startPhase == START_IDLE) {
+    // Enable the traverse motor first
+    digitalWrite(ch.traverseEnablePin, LOW);
     
-    // Initialize traverse direction flags
-    traverseMovingRight = true;
+    // Initialize traverse direction flag
+    ch.traverseMovingRight = true;
     
-    // Send a burst of steps to get the traverse motors moving
+    // A burst of steps gets the traverse moving; continueStart() sends
+    // them from loop() so the other channel keeps winding meanwhile
+    Serial.print(ch.replyPrefix);
     Serial.println("Starting traverse motors first...");
-    for (int i = 0; i < 50; i++) {
-      digitalWrite(TRAVERSE_DIR_PIN, HIGH);
-      digitalWrite(TRAVERSE2_DIR_PIN, HIGH);
-      
-      pulseTraverseStep(TRAVERSE_STEP_PIN, 300); 
-      pulseTraverseStep(TRAVERSE2_STEP_PIN, 300);
-      delay(5);
-    }
-    
-    // Add a delay before starting winder motors
-    delay(1000);
-    
-    Serial.println("Traverse motors running, now starting winder motors...");
-    
-    // Initialize the winder motors
-    if (winderStepper) {
-      winderStepper->stopMove();
-      winderStepper->forceStopAndNewPosition(0);
-    }
-    
-    if (winder2Stepper) {
-      winder2Stepper->stopMove();
-      winder2Stepper->forceStopAndNewPosition(0);
-    }
-    
-    // Enable Winder Motors
-    digitalWrite(WINDER_ENABLE_PIN, LOW);
-    digitalWrite(WINDER2_ENABLE_PIN, LOW);
-    
-    // Configure and start the Winder Motors rotation
-    if (winderStepper) {
-      winderStepper->setSpeedInHz(winderSpeed);
-      winderStepper->setAcceleration(winderAcceleration);
-      winderStepper->runForward();
-    }
-    
-    if (winder2Stepper) {
-      winder2Stepper->setSpeedInHz(winderSpeed);
-      winder2Stepper->setAcceleration(winderAcceleration);
-      winder2Stepper->runForward();
-    }
-    
-    // Set flag
-    motorsRunning = true;
-    
-    Serial.println("All motors running");
+    ch.startPhase = START_BURST;
+    ch.startStepsLeft = START_BURST_STEPS;
+    ch.startPhaseTime = micros() - START_BURST_INTERVAL;
   }
 }
 
-//-------------------- Disable All Motors Function --------------------
-void disableAllMotors() {
-  // First stop any stepper movement
-  if (winderStepper) {
-    winderStepper->stopMove();
-    winderStepper->forceStopAndNewPosition(0);
-    winderStepper->disableOutputs();
+void continueStart(WindingChannel &ch) {
+  if (ch.startPhase == START_BURST) {
+    if (micros() - ch.startPhaseTime < START_BURST_INTERVAL) return;
+    ch.startPhaseTime = micros();
+    digitalWrite(ch.traverseDirPin, HIGH);
+    pulseTraverseStep(ch.traverseStepPin, 300);
+    if (--ch.startStepsLeft > 0) return;
+    
+    // Add a delay before starting the winder motor
+    ch.startPhase = START_PAUSING;
+    ch.startPhaseTime = millis();
+    return;
   }
-  if (winder2Stepper) {
-    winder2Stepper->stopMove();
-    winder2Stepper->forceStopAndNewPosition(0);
-    winder2Stepper->disableOutputs();
+  if (ch.startPhase != START_PAUSING || millis() - ch.startPhaseTime < START_PAUSE) return;
+  ch.startPhase = START_IDLE;
+  
+  Serial.print(ch.replyPrefix);
+  Serial.println("Traverse motors running, now starting winder motors...");
+  
+  // Initialize the winder motor
+  if (ch.winderStepper) {
+    ch.winderStepper->stopMove();
+    ch.winderStepper->forceStopAndNewPosition(0);
   }
   
-  // Disable all motor outputs
-  digitalWrite(WINDER_ENABLE_PIN, HIGH);
-  digitalWrite(WINDER2_ENABLE_PIN, HIGH);
-  digitalWrite(TRAVERSE_ENABLE_PIN, HIGH);
-  digitalWrite(TRAVERSE2_ENABLE_PIN, HIGH);
+  // Enable Winder Motor
+  digitalWrite(ch.winderEnablePin, LOW);
+  
+  // Configure and start the Winder Motor rotation
+  if (ch.winderStepper) {
+    ch.winderStepper->setSpeedInHz(ch.winderSpeed);
+    ch.winderStepper->setAcceleration(winderAcceleration);
+    ch.winderStepper->runForward();
+  }
   
-  // Update state flag
-  motorsRunning = false;
+  // Set flag
+  ch.motorsRunning = true;
+  ch.lastAdjustedSpeed = ch.winderSpeed;
+  ch.nextStepTime = micros();
+  
+  Serial.print(ch.replyPrefix);
+  Serial.println("All motors running");
+}
+
+//-------------------- Disable All Motors Function --------------------
+void disableAllMotors() {
+  for (int i = 0; i < CHANNEL_COUNT; i++) {
+    WindingChannel &ch = channels[i];
+    
+    // First stop any stepper movement
+    if (ch.winderStepper) {
+      ch.winderStepper->stopMove();
+      ch.winderStepper->forceStopAndNewPosition(0);
+      ch.winderStepper->disableOutputs();
+    }
+    
+    // Disable all motor outputs
+    digitalWrite(ch.winderEnablePin, HIGH);
+    digitalWrite(ch.traverseEnablePin, HIGH);
+    
+    // Update state flags
+    ch.motorsRunning = false;
+    ch.startPhase = START_IDLE;
+  }
   
   Serial.println("All motors disabled.");
 }
 
 //-------------------- Stop Motors Function --------------------
-void stopMotors() {
-  if (motorsRunning) {
-    // Stop the winder stepper motors
-    if (winderStepper) {
-      winderStepper->stopMove();
-      winderStepper->forceStopAndNewPosition(0);
-    }
-    if (winder2Stepper) {
-      winder2Stepper->stopMove();
-      winder2Stepper->forceStopAndNewPosition(0);
+void stopMotors(WindingChannel &ch) {
+  if (ch.motorsRunning || ch.startPhase != START_IDLE) {
+    // Stop the winder stepper motor
+    if (ch.winderStepper) {
+      ch.winderStepper->stopMove();
+      ch.winderStepper->forceStopAndNewPosition(0);
     }
     
-    // Disable all motors
-    digitalWrite(WINDER_ENABLE_PIN, HIGH);
-    digitalWrite(WINDER2_ENABLE_PIN, HIGH);
-    digitalWrite(TRAVERSE_ENABLE_PIN, HIGH);
-    digitalWrite(TRAVERSE2_ENABLE_PIN, HIGH);
+    // Disable this channel's motors
+    digitalWrite(ch.winderEnablePin, HIGH);
+    digitalWrite(ch.traverseEnablePin, HIGH);
     
-    // Update motor running flag
-    motorsRunning = false;
+    // Update motor running flags
+    ch.motorsRunning = false;
+    ch.startPhase = START_IDLE;
     
+    Serial.print(ch.replyPrefix);
     Serial.println("All motors stopped and disabled.");
   }
 }
 
 //-------------------- Update Winder Speed --------------------
-void updateWinderSpeed() {
-  if (!motorsRunning) return;
+void updateWinderSpeed(WindingChannel &ch) {
+  if (!ch.motorsRunning) return;
   
-  int remainingWinds = desiredWindCount - windCount;
-  if (remainingWinds <= slowdownWinds) {
+  int remainingWinds = ch.desiredWindCount - ch.windCount;
+  float slowdownFactor;
+  if (ch.decelPoints > 0) {
+    if (remainingWinds - 1 >= ch.decelSpan) return;
+    slowdownFactor = decelFactor(ch, remainingWinds);
+  } else {
+    if (remainingWinds > slowdownWinds) return;
     float ratio = remainingWinds / (float)slowdownWinds;
-    float slowdownFactor = (ratio > 0.1f) ? ratio : 0.1f;
-    long adjustedSpeed = winderSpeed * slowdownFactor;
-    if (winderStepper) {
-      winderStepper->setSpeedInHz(adjustedSpeed);
-    }
-    if (winder2Stepper) {
-      winder2Stepper->setSpeedInHz(adjustedSpeed);
-    }
+    slowdownFactor = (ratio > 0.1f) ? ratio : 0.1f;
   }
-}
-
-//-------------------- Move Traverse Function (Motor 1) --------------------
-void moveTraverseToPosition(int targetSteps) {
-  // Force enable the traverse motor
-  digitalWrite(TRAVERSE_ENABLE_PIN, LOW);
   
-  if (targetSteps > currentTraverseStep) {
-    while (currentTraverseStep < targetSteps) {
-      digitalWrite(TRAVERSE_DIR_PIN, HIGH);
-      pulseTraverseStep(TRAVERSE_STEP_PIN, traverseStepDelay);
-      currentTraverseStep++;
-    }
-  }
-  else if (targetSteps < currentTraverseStep) {
-    while (currentTraverseStep > targetSteps) {
-      digitalWrite(TRAVERSE_DIR_PIN, LOW);
-      pulseTraverseStep(TRAVERSE_STEP_PIN, traverseStepDelay);
-      currentTraverseStep--;
-    }
+  long adjustedSpeed = ch.winderSpeed * slowdownFactor;
+  if (adjustedSpeed == ch.lastAdjustedSpeed) return;
+  ch.lastAdjustedSpeed = adjustedSpeed;
+  
+  // A running stepper only picks up a new speed once it is applied
+  if (ch.winderStepper) {
+    ch.winderStepper->setSpeedInHz(adjustedSpeed);
+    ch.winderStepper->applySpeedAcceleration();
   }
 }
 
-//-------------------- Move Traverse Function (Motor 2) --------------------
-void moveTraverse2ToPosition(int targetSteps) {
+//-------------------- Move Traverse Function --------------------
+void moveTraverseToPosition(WindingChannel &ch, int targetSteps) {
   // Force enable the traverse motor
-  digitalWrite(TRAVERSE2_ENABLE_PIN, LOW);
+  digitalWrite(ch.traverseEnablePin, LOW);
   
-  if (targetSteps > currentTraverse2Step) {
-    while (currentTraverse2Step < targetSteps) {
-      digitalWrite(TRAVERSE2_DIR_PIN, HIGH);
-      pulseTraverseStep(TRAVERSE2_STEP_PIN, traverseStepDelay);
-      currentTraverse2Step++;
+  if (targetSteps > ch.currentTraverseStep) {
+    while (ch.currentTraverseStep < targetSteps) {
+      digitalWrite(ch.traverseDirPin, HIGH);
+      pulseTraverseStep(ch.traverseStepPin, ch.traverseStepDelay);
+      ch.currentTraverseStep++;
     }
   }
-  else if (targetSteps < currentTraverse2Step) {
-    while (currentTraverse2Step > targetSteps) {
-      digitalWrite(TRAVERSE2_DIR_PIN, LOW);
-      pulseTraverseStep(TRAVERSE2_STEP_PIN, traverseStepDelay);
-      currentTraverse2Step--;
+  else if (targetSteps < ch.currentTraverseStep) {
+    while (ch.currentTraverseStep > targetSteps) {
+      digitalWrite(ch.traverseDirPin, LOW);
+      pulseTraverseStep(ch.traverseStepPin, ch.traverseStepDelay);
+      ch.currentTraverseStep--;
     }
   }
 }
 
 //-------------------- Wind Counting Function --------------------
-void countWinds() {
-  static int lastSensorState = HIGH;
-  int sensorState = digitalRead(HALL_SENSOR_PIN);
+void countWinds(WindingChannel &ch) {
+  int sensorState = digitalRead(ch.hallPin);
   
   // Detect falling edge (magnet approaching sensor)
-  if (lastSensorState == HIGH && sensorState == LOW) {
-    windCount++;
+  if (ch.lastSensorState == HIGH && sensorState == LOW) {
+    ch.windCount++;
     
+    // Binary frames are small enough to send on every wind
+    if (binaryTelemetry && &ch == &channels[0]) {
+      sendTelemetryFrame();
+    }
     // Output wind count periodically for debugging
-    if (windCount % 5 == 0 || windCount < 10) {
+    else if (ch.windCount % 5 == 0 || ch.windCount < 10) {
+      Serial.print(ch.replyPrefix);
       Serial.print("Wind Count: ");
-      Serial.println(windCount);
+      Serial.println(ch.windCount);
     }
   }
   
-  lastSensorState = sensorState;
+  ch.lastSensorState = sensorState;
 }
 
 //-------------------- Setup --------------------
@@ -393,52 +592,40 @@ void setup() {
   
   // Initialize the FastAccelStepper engine
   engine.init();
-
-  // Reset the wind count
-  windCount = 0;
-  
-  // Configure Winder Motors
-  pinMode(WINDER_DIR_PIN, OUTPUT);
-  pinMode(WINDER_STEP_PIN, OUTPUT);
-  pinMode(WINDER_ENABLE_PIN, OUTPUT);
-  digitalWrite(WINDER_ENABLE_PIN, HIGH);  // Start disabled
-  
-  pinMode(WINDER2_DIR_PIN, OUTPUT);
-  pinMode(WINDER2_STEP_PIN, OUTPUT);
-  pinMode(WINDER2_ENABLE_PIN, OUTPUT);
-  digitalWrite(WINDER2_ENABLE_PIN, HIGH);  // Start disabled
-  
-  // Configure Traverse Motors
-  pinMode(TRAVERSE_DIR_PIN, OUTPUT);
-  pinMode(TRAVERSE_STEP_PIN, OUTPUT);
-  pinMode(TRAVERSE_ENABLE_PIN, OUTPUT);
-  digitalWrite(TRAVERSE_ENABLE_PIN, HIGH); // Start disabled
-  
-  pinMode(TRAVERSE2_DIR_PIN, OUTPUT);
-  pinMode(TRAVERSE2_STEP_PIN, OUTPUT);
-  pinMode(TRAVERSE2_ENABLE_PIN, OUTPUT);
-  digitalWrite(TRAVERSE2_ENABLE_PIN, HIGH); // Start disabled
-  
-  // Configure Hall Sensor
-  pinMode(HALL_SENSOR_PIN, INPUT_PULLUP);
-  
-  // Setup steppers
-  winderStepper = engine.stepperConnectToPin(WINDER_STEP_PIN);
-  if (winderStepper) {
-    winderStepper->setDirectionPin(WINDER_DIR_PIN);
-    winderStepper->setEnablePin(WINDER_ENABLE_PIN);
-    winderStepper->setAutoEnable(false);
-    winderStepper->setSpeedInHz(winderSpeed);
-    winderStepper->setAcceleration(winderAcceleration);
-  }
-  
-  winder2Stepper = engine.stepperConnectToPin(WINDER2_STEP_PIN);
-  if (winder2Stepper) {
-    winder2Stepper->setDirectionPin(WINDER2_DIR_PIN);
-    winder2Stepper->setEnablePin(WINDER2_ENABLE_PIN);
-    winder2Stepper->setAutoEnable(false);
-    winder2Stepper->setSpeedInHz(winderSpeed);
-    winder2Stepper->setAcceleration(winderAcceleration);
+  
+  // Both channels start with the same defaults and a wind count of 0
+  initChannel(channels[0], "", WINDER_DIR_PIN, WINDER_STEP_PIN, WINDER_ENABLE_PIN,
+              TRAVERSE_DIR_PIN, TRAVERSE_STEP_PIN, TRAVERSE_ENABLE_PIN, HALL_SENSOR_PIN);
+  initChannel(channels[1], "2:", WINDER2_DIR_PIN, WINDER2_STEP_PIN, WINDER2_ENABLE_PIN,
+              TRAVERSE2_DIR_PIN, TRAVERSE2_STEP_PIN, TRAVERSE2_ENABLE_PIN, HALL2_SENSOR_PIN);
+  
+  for (int i = 0; i < CHANNEL_COUNT; i++) {
+    WindingChannel &ch = channels[i];
+    
+    // Configure Winder Motor
+    pinMode(ch.winderDirPin, OUTPUT);
+    pinMode(ch.winderStepPin, OUTPUT);
+    pinMode(ch.winderEnablePin, OUTPUT);
+    digitalWrite(ch.winderEnablePin, HIGH);  // Start disabled
+    
+    // Configure Traverse Motor
+    pinMode(ch.traverseDirPin, OUTPUT);
+    pinMode(ch.traverseStepPin, OUTPUT);
+    pinMode(ch.traverseEnablePin, OUTPUT);
+    digitalWrite(ch.traverseEnablePin, HIGH); // Start disabled
+    
+    // Configure Hall Sensor
+    pinMode(ch.hallPin, INPUT_PULLUP);
+    
+    // Setup winder stepper
+    ch.winderStepper = engine.stepperConnectToPin(ch.winderStepPin);
+    if (ch.winderStepper) {
+      ch.winderStepper->setDirectionPin(ch.winderDirPin);
+      ch.winderStepper->setEnablePin(ch.winderEnablePin);
+      ch.winderStepper->setAutoEnable(false);
+      ch.winderStepper->setSpeedInHz(ch.winderSpeed);
+      ch.winderStepper->setAcceleration(winderAcceleration);
+    }
   }
   
   traverseStepper = engine.stepperConnectToPin(TRAVERSE_STEP_PIN);
@@ -470,6 +657,9 @@ void setup() {
   Serial.println("  t_rightlimit:X -> Set right sweep limit (steps)");
   Serial.println("  t_home        -> Reset traverse position to 0 (home)");
   Serial.println("  disable_all_motors -> Disable all motors");
+  Serial.println("  telemetry:bin / telemetry:text -> Binary or text wind count telemetry");
+  Serial.println("  decel:<span>,<p0>,... / decel:off -> Slowdown profile (permille of speed)");
+  Serial.println("  2:<command>   -> Send S, T, R, N, w_speed, t_*, decel to winder 2");
 }
 
 //-------------------- Main Loop --------------------
@@ -481,39 +671,76 @@ void loop() {
     processCommand(command);
   }
   
+  bool anyRunning = false;
+  for (int i = 0; i < CHANNEL_COUNT; i++) {
+    WindingChannel &ch = channels[i];
+    continueStart(ch);
+    if (ch.motorsRunning) {
+      // Update winder motor speed if needed
+      updateWinderSpeed(ch);
+      anyRunning = true;
+    }
+  }
+  
   // This section runs when motors are actively running
-  if (motorsRunning) {
-    // Update winder motor speed if needed
-    updateWinderSpeed();
+  if (anyRunning) {
+    // Process only a few steps per loop iteration: the pass lasts
+    // STEPS_PER_PASS steps of the first running channel. Each channel steps
+    // on its own deadline, so neither changes the other's traverse pitch
+    // and channel 1's pass is the same whatever channel 2 is doing.
+    WindingChannel &pacer = channels[0].motorsRunning ? channels[0] : channels[1];
+    unsigned long passStart = micros();
+    unsigned long passLength = STEPS_PER_PASS * traverseStepPeriod(pacer);
+    while (micros() - passStart < passLength) {
+      for (int c = 0; c < CHANNEL_COUNT; c++) {
+        WindingChannel &ch = channels[c];
+        if (!ch.motorsRunning) continue;
+        unsigned long now = micros();
+        if ((long)(now - ch.nextStepTime) < 0) continue;
+        
+        digitalWrite(ch.traverseEnablePin, LOW);
+        stepTraverse(ch);
+        ch.nextStepTime += traverseStepPeriod(ch);
+        // Time spent outside the pass (commands, status) is made up, but
+        // a step more than a period late is not, to avoid a burst
+        if ((long)(now - ch.nextStepTime) >= 0) {
+          ch.nextStepTime = now + traverseStepPeriod(ch);
+        }
+      }
+    }
     
-    // Process only a few steps per loop iteration
-    for (int i = 0; i < 5; i++) {
-      // Enable traverse motors
-      digitalWrite(TRAVERSE_ENABLE_PIN, LOW);
-      digitalWrite(TRAVERSE2_ENABLE_PIN, LOW);
+    for (int i = 0; i < CHANNEL_COUNT; i++) {
+      WindingChannel &ch = channels[i];
+      if (!ch.motorsRunning) continue;
       
-      // Use the synchronized control function for both traverse motors
-      controlBothTraverseMotors(traverseStepDelay, leftSweepLimit, rightSweepLimit);
+      // Count winds via hall sensor
+      countWinds(ch);
       
-      // Short delay to prevent overwhelming the CPU
-      delayMicroseconds(100);
-    }
-    
-    // Count winds via hall sensor
-    countWinds();
-    
-    // Check if we've reached the desired wind count
-    if (desiredWindCount > 0 && (windCount + windCountOffset) >= desiredWindCount) {
-      stopMotors();
-      Serial.print("Target wind count reached: ");
-      Serial.println(windCount + windCountOffset);
+      // Check if we've reached the desired wind count
+      if (ch.desiredWindCount > 0 && ch.windCount >= ch.desiredWindCount) {
+        stopMotors(ch);
+        Serial.print(ch.replyPrefix);
+        Serial.print("Target wind count reached: ");
+        Serial.println(ch.windCount);
+      }
     }
   }
   
-  // Print status every second
+  // Print status every second; channel 2 stays quiet until it is used
   if (millis() - lastStatusPrintTime >= statusPrintInterval) {
-    Serial.print("Current Wind Count: ");
-    Serial.println(windCount);
+    if (binaryTelemetry) {
+      sendTelemetryFrame();
+    } else {
+      Serial.print("Current Wind Count: ");
+      Serial.println(channels[0].windCount);
+    }
+    for (int i = 1; i < CHANNEL_COUNT; i++) {
+      if (channels[i].addressed) {
+        Serial.print(channels[i].replyPrefix);
+        Serial.print("Current Wind Count: ");
+        Serial.println(channels[i].windCount);
+      }
+    }
     lastStatusPrintTime = millis();
   }
 }
@@ -1,15 +1,79 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import serial
-import serial.tools.list_ports
+import argparse
 import threading
 import time
+import queue
+import socket
+import os
+
+from serial_reader import SerialLineReader, EVENT_COUNT, EVENT_FRAME, EVENT_LINE, EVENT_ERROR, \
+    EVENT_CHANNEL_COUNT
+from telemetry import REQUEST_BINARY, REPLY_BINARY, REPLY_UNSUPPORTED
+from run_recorder import RunStore, command_event, EVENT_COMPLETE, EVENT_TARGET, EVENT_WINDER_SPEED, \
+    EVENT_TRAVERSE_DELAY, EVENT_LEFT_LIMIT, EVENT_RIGHT_LIMIT, EVENT_MISSED
+from rate_estimator import RateEstimator, DecimatedSeries
+from recipes import Recipe, RecipeBook, JobQueue
+from decel_profile import fit_model, optimal_profile, PROFILE_OFF
+from traverse_planner import TraversePlanner, PlanTable, WIRE_DIAMETERS, SCATTER_PATTERNS, DEFAULT_LEAD_MM, \
+    MAX_RIGHT_LIMIT
+from command_pipeline import CommandPipeline, RESULT_SENT, RESULT_ACK, RESULT_NACK, RESULT_TIMEOUT, \
+    RESULT_ERROR
+from console_buffer import ConsoleView, MESSAGE_CLASSES
+from port_discovery import PortWatcher, PortInfo, load_last_port, save_last_port, find_port
+from winder_client import parse_wind_count, parse_winder_speed, parse_traverse_delay, parse_left_limit, \
+    parse_right_limit
+from link_supervisor import LinkSupervisor, setpoint_commands, reconcile_count, STATE_DOWN, STATE_LOST, \
+    STALE_AFTER, POLL_LOST, POLL_RECONNECTED, COUNT_AHEAD, COUNT_LOST
+from count_estimator import CountEstimator
+from serial_capture import SerialCapture, CapturingSerial, ReplaySerial, parse_speed
+from channels import ChannelState, split_channel, PRIMARY_CHANNEL, STATUS_STARTING, STATUS_STOPPING, \
+    STATUS_STOPPED, STATUS_RUNNING, STATUS_COMPLETE, STATUS_DISABLED
+from metrics import MetricsRegistry, MetricsServer, MetricsFile, SamplingProfiler, LoopLagMeter, \
+    add_process_metrics, quantiles
+
+# Upper bound on serial events handled per Tk frame so a burst can't stall the UI
+MAX_EVENTS_PER_FRAME = 2000
+
+# Lines kept in the console history and widget
+CONSOLE_CAPACITY = 5000
+
+# How long to wait for a reply to the binary telemetry request (ms)
+TELEMETRY_NEGOTIATION_TIMEOUT = 3000
+
+# Winder speeds offered as presets; traverse plans are precomputed for these
+PRESET_SPEEDS = [50000, 100000, 150000, 200000]
+
+# How often the Tk thread checks for port list changes (ms)
+PORT_EVENT_INTERVAL = 250
+
+# How often the Tk thread checks the link for faults and retries reconnects (ms)
+LINK_CHECK_INTERVAL = 250
+
+# Milliseconds between status updates; how late they run is the Tk loop lag
+STATUS_INTERVAL = 100
+
+# Rate plot size in pixels, and how many status updates between redraws
+RATE_PLOT_WIDTH = 320
+RATE_PLOT_HEIGHT = 90
+RATE_PLOT_EVERY = 5
+
+# Colour of each motor state in the status panels
+STATUS_COLOURS = {
+    STATUS_STOPPED: "red",
+    STATUS_STARTING: "orange",
+    STATUS_RUNNING: "green",
+    STATUS_STOPPING: "orange",
+    STATUS_COMPLETE: "blue",
+    STATUS_DISABLED: "red",
+}
 
 class WinderControlApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Winding Machine Control")
-        self.root.geometry("750x550")
+        self.root.geometry("800x900")
         self.root.configure(padx=10, pady=10)
         
         # Serial connection variables
@@ -17,6 +81,9 @@ class WinderControlApp:
         self.connected = False
         self.monitoring_thread = None
         self.thread_running = False
+        self.serial_reader = None
+        self.command_pipeline = None
+        self.telemetry_mode = "text"
         
         # Winding machine variables
         self.current_wind_count = 0
@@ -26,11 +93,94 @@ class WinderControlApp:
         self.left_limit = 0
         self.right_limit = 6400
         
+        # Latest values from binary telemetry frames
+        self.reported_winder_hz = 0
+        self.reported_traverse_position = 0
+        
+        # Run recording
+        self.run_store = RunStore()
+        self.active_run = None
+        
+        # Wind rate estimation and plot history
+        self.rate_estimator = RateEstimator()
+        self.rate_series = DecimatedSeries(capacity=RATE_PLOT_WIDTH // 2)
+        self.status_updates = 0
+        
+        # Count dead-reckoned from the commanded speed between hall reports,
+        # and cross-checked against them for missed pulses
+        self.count_estimator = CountEstimator()
+        self.missed_reported = False
+        
+        # Second spindle, winding its own coil on the same link; recipes,
+        # jobs, plans and the optimized slowdown apply to channel 1
+        self.channel2 = ChannelState(2)
+        self.channel2_rate = RateEstimator()
+        self.channel2_run = None
+        
+        # Recipes and back-to-back job queue
+        self.recipe_book = RecipeBook()
+        self.job_queue = JobQueue()
+        self.jobs_window = None
+        
+        # Traverse plan, looked up by winder speed
+        self.plan_table = None
+        self.traverse_plan = None
+        self.planner_window = None
+        
+        # Optimized end-of-coil slowdown; the model is refitted from the run
+        # history after each completed coil
+        self.decel_model = None
+        self.decel_profile = None
+        
+        # Ports are enumerated in the background; the last winder used is
+        # reconnected on startup and whenever it is plugged back in, until
+        # the operator disconnects
+        self.last_port = load_last_port()
+        self.auto_connect = self.last_port is not None
+        self.connected_port = None
+        self.ports_listed = False
+        self.port_watcher = PortWatcher().start()
+        
+        # A link that fails or goes quiet is reconnected with backoff and the
+        # device resynced; turns the device lost track of after a restart are
+        # carried in count_offset
+        self.link_port = None
+        self.link_opened_at = 0.0
+        self.link_supervisor = LinkSupervisor(self.reconnect_link, self.link_dropped)
+        self.awaiting_count = False
+        self.status_before_resync = None
+        self.count_offset = 0
+        
+        # Optional raw capture of everything on the link, and replay of a
+        # capture in place of a port
+        self.capture = None
+        self.replay = None
+        
+        # Instrumentation, read by the metrics endpoint when one is started
+        self.loop_lag = LoopLagMeter()
+        self.wind_rate = 0.0
+        self.metrics = MetricsRegistry()
+        self.profiler = SamplingProfiler()
+        self.metrics_server = None
+        self.metrics_file = None
+        self.register_metrics()
+        
         # UI layout
         self.create_interface()
         
         # Update status periodically
-        self.root.after(100, self.update_status)
+        self.loop_lag.schedule(STATUS_INTERVAL / 1000.0)
+        self.root.after(STATUS_INTERVAL, self.update_status)
+        
+        # Drain events from the serial thread
+        self.root.after(50, self.process_serial_events)
+        
+        # Port list changes and the startup reconnect
+        self.root.after(0, self.connect_last_port)
+        self.root.after(PORT_EVENT_INTERVAL, self.process_port_events)
+        self.root.after(LINK_CHECK_INTERVAL, self.supervise_link)
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_interface(self):
         # Set up grid for two-column layout
@@ -56,6 +206,9 @@ class WinderControlApp:
         # Create motor buttons section
         self.create_motor_buttons_section(left_frame)
         
+        # Create second channel section
+        self.create_channel2_section(left_frame)
+        
         # Create status display section
         self.create_status_section(right_frame)
         
@@ -72,15 +225,14 @@ class WinderControlApp:
         
         ttk.Label(port_frame, text="Port:").pack(side="left")
         
-        # Get available ports
-        self.port_var = tk.StringVar()
+        # Filled in by the port watcher
+        self.port_var = tk.StringVar(value=self.last_port.device if self.last_port else "")
         self.port_combo = ttk.Combobox(port_frame, textvariable=self.port_var)
         self.port_combo.pack(side="left", padx=5, expand=True, fill="x")
-        self.refresh_ports()
         
         ttk.Button(port_frame, text="Refresh", command=self.refresh_ports).pack(side="left", padx=2)
         ttk.Button(port_frame, text="Connect", command=self.connect_serial).pack(side="left", padx=2)
-        ttk.Button(port_frame, text="Disconnect", command=self.disconnect_serial).pack(side="left", padx=2)
+        ttk.Button(port_frame, text="Disconnect", command=self.user_disconnect).pack(side="left", padx=2)
         
         # Status indicator
         status_frame = ttk.Frame(connection_frame)
@@ -128,6 +280,16 @@ class WinderControlApp:
         ttk.Button(preset_frame, text="Medium (100k)", command=lambda: self.set_preset_speed(100000)).pack(side="left", padx=2)
         ttk.Button(preset_frame, text="Fast (150k)", command=lambda: self.set_preset_speed(150000)).pack(side="left", padx=2)
         ttk.Button(preset_frame, text="Ultra (200k)", command=lambda: self.set_preset_speed(200000)).pack(side="left", padx=2)
+        
+        # Slowdown profile row
+        decel_frame = ttk.Frame(winder_frame)
+        decel_frame.pack(fill="x", padx=5, pady=5)
+        
+        self.decel_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(decel_frame, text="Optimized slowdown", variable=self.decel_var,
+                        command=self.update_decel_profile).pack(side="left")
+        self.decel_label = ttk.Label(decel_frame, text="Linear over last 111 winds")
+        self.decel_label.pack(side="left", padx=5)
     
     def create_traverse_control_section(self, parent):
         traverse_frame = ttk.LabelFrame(parent, text="Traverse Control")
@@ -186,6 +348,7 @@ class WinderControlApp:
         home_frame.pack(fill="x", padx=5, pady=5)
         
         ttk.Button(home_frame, text="Reset Traverse Home", command=self.reset_traverse_home).pack(side="left")
+        ttk.Button(home_frame, text="Plan...", command=self.open_planner_window).pack(side="left", padx=5)
     
     def create_motor_buttons_section(self, parent):
         button_frame = ttk.LabelFrame(parent, text="Motor Controls")
@@ -209,6 +372,185 @@ class WinderControlApp:
         
         ttk.Button(extra_frame, text="RESET COUNTER", command=self.reset_counter).pack(side="left", padx=5, expand=True, fill="x")
         ttk.Button(extra_frame, text="DISABLE ALL", command=self.disable_all_motors).pack(side="left", padx=5, expand=True, fill="x")
+        ttk.Button(extra_frame, text="JOBS...", command=self.open_jobs_window).pack(side="left", padx=5, expand=True, fill="x")
+    
+    def create_channel2_section(self, parent):
+        channel_frame = ttk.LabelFrame(parent, text="Channel 2")
+        channel_frame.pack(fill="x", padx=5, pady=5)
+        
+        # Setpoints, sent together with Set
+        setpoint_frame = ttk.Frame(channel_frame)
+        setpoint_frame.pack(fill="x", padx=5, pady=5)
+        
+        self.channel2_vars = {}
+        fields = [
+            ("desired_wind_count", "Count:"),
+            ("winder_speed", "Speed (Hz):"),
+            ("traverse_delay", "Delay (µs):"),
+            ("left_limit", "Left:"),
+            ("right_limit", "Right:"),
+        ]
+        for i, (key, label) in enumerate(fields):
+            row, column = divmod(i, 3)
+            ttk.Label(setpoint_frame, text=label).grid(row=row, column=column * 2, sticky="w", padx=2, pady=2)
+            var = tk.StringVar(value=str(getattr(self.channel2, key)))
+            ttk.Entry(setpoint_frame, textvariable=var, width=8).grid(row=row, column=column * 2 + 1, sticky="w",
+                                                                      padx=2, pady=2)
+            self.channel2_vars[key] = var
+        ttk.Button(setpoint_frame, text="Set", command=self.set_channel2_setpoints).grid(row=1, column=4, columnspan=2,
+                                                                                        sticky="ew", padx=2, pady=2)
+        
+        # Count, target and progress
+        count_frame = ttk.Frame(channel_frame)
+        count_frame.pack(fill="x", padx=5, pady=5)
+        
+        self.channel2_count_label = ttk.Label(count_frame, text="0", font=("Arial", 16))
+        self.channel2_count_label.pack(side="left")
+        self.channel2_target_label = ttk.Label(count_frame, text=f"/ {self.channel2.desired_wind_count}")
+        self.channel2_target_label.pack(side="left", padx=5)
+        self.channel2_progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(count_frame, variable=self.channel2_progress_var, length=120,
+                        mode="determinate").pack(side="left", padx=5, expand=True, fill="x")
+        self.channel2_percent = ttk.Label(count_frame, text="0%")
+        self.channel2_percent.pack(side="left", padx=5)
+        
+        # Motor state, rate and ETA
+        state_frame = ttk.Frame(channel_frame)
+        state_frame.pack(fill="x", padx=5)
+        
+        ttk.Label(state_frame, text="Motors:").pack(side="left")
+        self.channel2_status_label = ttk.Label(state_frame, text=STATUS_STOPPED,
+                                               foreground=STATUS_COLOURS[STATUS_STOPPED])
+        self.channel2_status_label.pack(side="left", padx=5)
+        self.channel2_rate_label = ttk.Label(state_frame, text="0.0 turns/s, ETA --:--")
+        self.channel2_rate_label.pack(side="left", padx=(10, 0))
+        
+        # Motor buttons
+        btn_frame = ttk.Frame(channel_frame)
+        btn_frame.pack(fill="x", padx=5, pady=5)
+        
+        start_btn = ttk.Button(btn_frame, text="START 2", command=self.start_channel2)
+        start_btn.pack(side="left", padx=5, expand=True, fill="x")
+        start_btn.configure(style='Green.TButton')
+        
+        stop_btn = ttk.Button(btn_frame, text="STOP 2", command=self.stop_channel2)
+        stop_btn.pack(side="left", padx=5, expand=True, fill="x")
+        stop_btn.configure(style='Red.TButton')
+        
+        ttk.Button(btn_frame, text="RESET 2", command=self.reset_channel2_counter).pack(side="left", padx=5,
+                                                                                        expand=True, fill="x")
+        ttk.Button(btn_frame, text="HOME 2", command=lambda: self.send_channel2_command("t_home")).pack(
+            side="left", padx=5, expand=True, fill="x")
+    
+    def open_jobs_window(self):
+        if self.jobs_window is not None:
+            self.jobs_window.deiconify()
+            self.jobs_window.lift()
+            return
+        
+        self.jobs_window = tk.Toplevel(self.root)
+        self.jobs_window.title("Recipes and Jobs")
+        self.jobs_window.configure(padx=10, pady=10)
+        self.jobs_window.protocol("WM_DELETE_WINDOW", self.jobs_window.withdraw)
+        
+        # Recipe selection
+        recipe_frame = ttk.LabelFrame(self.jobs_window, text="Recipes")
+        recipe_frame.pack(fill="x", padx=5, pady=5)
+        
+        select_frame = ttk.Frame(recipe_frame)
+        select_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Label(select_frame, text="Recipe:").pack(side="left")
+        self.recipe_var = tk.StringVar()
+        self.recipe_combo = ttk.Combobox(select_frame, textvariable=self.recipe_var, state="readonly")
+        self.recipe_combo.pack(side="left", padx=5, expand=True, fill="x")
+        ttk.Button(select_frame, text="Load", command=self.load_selected_recipe).pack(side="left", padx=2)
+        ttk.Button(select_frame, text="Delete", command=self.delete_selected_recipe).pack(side="left", padx=2)
+        
+        save_frame = ttk.Frame(recipe_frame)
+        save_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Label(save_frame, text="Name:").pack(side="left")
+        self.recipe_name_var = tk.StringVar()
+        ttk.Entry(save_frame, textvariable=self.recipe_name_var, width=20).pack(side="left", padx=5)
+        self.recipe_home_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(save_frame, text="Home traverse", variable=self.recipe_home_var).pack(side="left", padx=5)
+        ttk.Button(save_frame, text="Save Current Settings", command=self.save_current_recipe).pack(side="left", padx=2)
+        
+        # Job queue
+        queue_frame = ttk.LabelFrame(self.jobs_window, text="Job Queue")
+        queue_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        add_frame = ttk.Frame(queue_frame)
+        add_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Label(add_frame, text="Quantity:").pack(side="left")
+        self.job_quantity_var = tk.StringVar(value="1")
+        ttk.Entry(add_frame, textvariable=self.job_quantity_var, width=5).pack(side="left", padx=5)
+        ttk.Button(add_frame, text="Add Selected Recipe", command=self.add_selected_job).pack(side="left", padx=2)
+        
+        self.job_listbox = tk.Listbox(queue_frame, height=8)
+        self.job_listbox.pack(fill="both", expand=True, padx=5, pady=5)
+        
+        control_frame = ttk.Frame(queue_frame)
+        control_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Button(control_frame, text="Start Queue", command=self.start_job_queue).pack(side="left", padx=2)
+        ttk.Button(control_frame, text="Stop Queue", command=self.stop_job_queue).pack(side="left", padx=2)
+        ttk.Button(control_frame, text="Clear", command=self.clear_job_queue).pack(side="left", padx=2)
+        
+        self.job_status_label = ttk.Label(queue_frame, text="Idle")
+        self.job_status_label.pack(fill="x", padx=5, pady=5)
+        
+        self.refresh_recipe_list()
+        self.refresh_job_list()
+    
+    def open_planner_window(self):
+        if self.planner_window is not None:
+            self.planner_window.deiconify()
+            self.planner_window.lift()
+            return
+        
+        self.planner_window = tk.Toplevel(self.root)
+        self.planner_window.title("Traverse Planner")
+        self.planner_window.configure(padx=10, pady=10)
+        self.planner_window.protocol("WM_DELETE_WINDOW", self.planner_window.withdraw)
+        
+        geometry_frame = ttk.LabelFrame(self.planner_window, text="Bobbin and Wire")
+        geometry_frame.pack(fill="x", padx=5, pady=5)
+        
+        self.planner_vars = {}
+        fields = [
+            ("width", "Bobbin Width (mm):", "9.0"),
+            ("offset", "Left Offset (mm):", "0.0"),
+            ("lead", "Lead (mm/rev):", str(DEFAULT_LEAD_MM)),
+            ("turns_per_layer", "Turns per Layer (0 = level):", "0"),
+        ]
+        for row, (key, label, default) in enumerate(fields):
+            ttk.Label(geometry_frame, text=label).grid(row=row, column=0, sticky="w", padx=5, pady=2)
+            var = tk.StringVar(value=default)
+            ttk.Entry(geometry_frame, textvariable=var, width=10).grid(row=row, column=1, sticky="w", padx=5, pady=2)
+            self.planner_vars[key] = var
+        
+        row = len(fields)
+        ttk.Label(geometry_frame, text="Wire (AWG):").grid(row=row, column=0, sticky="w", padx=5, pady=2)
+        self.planner_vars["awg"] = tk.StringVar(value="42")
+        ttk.Combobox(geometry_frame, textvariable=self.planner_vars["awg"], width=8,
+                     values=[str(awg) for awg in WIRE_DIAMETERS]).grid(row=row, column=1, sticky="w", padx=5, pady=2)
+        
+        ttk.Label(geometry_frame, text="Pattern:").grid(row=row + 1, column=0, sticky="w", padx=5, pady=2)
+        self.planner_vars["scatter"] = tk.StringVar(value="level")
+        ttk.Combobox(geometry_frame, textvariable=self.planner_vars["scatter"], width=12, state="readonly",
+                     values=list(SCATTER_PATTERNS)).grid(row=row + 1, column=1, sticky="w", padx=5, pady=2)
+        
+        button_frame = ttk.Frame(self.planner_window)
+        button_frame.pack(fill="x", padx=5, pady=5)
+        ttk.Button(button_frame, text="Compute", command=self.compute_traverse_plan).pack(side="left", padx=2)
+        ttk.Button(button_frame, text="Apply", command=self.apply_traverse_plan).pack(side="left", padx=2)
+        ttk.Button(button_frame, text="Clear Plan", command=self.clear_traverse_plan).pack(side="left", padx=2)
+        
+        self.plan_result_label = ttk.Label(self.planner_window, text="", justify="left")
+        self.plan_result_label.pack(fill="x", padx=5, pady=5)
     
     def create_status_section(self, parent):
         status_frame = ttk.LabelFrame(parent, text="Status")
@@ -248,11 +590,78 @@ class WinderControlApp:
         ttk.Label(motor_frame, text="Motors:").pack(side="left")
         self.motor_status_label = ttk.Label(motor_frame, text="STOPPED", foreground="red")
         self.motor_status_label.pack(side="left", padx=5)
+        
+        # Measured rate against the commanded speed
+        rate_frame = ttk.Frame(status_frame)
+        rate_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Label(rate_frame, text="Rate:").pack(side="left")
+        self.rate_label = ttk.Label(rate_frame, text="0.0 turns/s, 0 RPM")
+        self.rate_label.pack(side="left", padx=5)
+        ttk.Label(rate_frame, text="ETA:").pack(side="left", padx=(10, 0))
+        self.eta_label = ttk.Label(rate_frame, text="--:--")
+        self.eta_label.pack(side="left", padx=5)
+        
+        commanded_frame = ttk.Frame(status_frame)
+        commanded_frame.pack(fill="x", padx=5)
+        
+        ttk.Label(commanded_frame, text="Commanded:").pack(side="left")
+        self.commanded_rpm_label = ttk.Label(commanded_frame, text="0 RPM")
+        self.commanded_rpm_label.pack(side="left", padx=5)
+        
+        # Dead-reckoned count and the missed pulse check
+        estimate_frame = ttk.Frame(status_frame)
+        estimate_frame.pack(fill="x", padx=5, pady=(5, 0))
+        
+        ttk.Label(estimate_frame, text="Estimated:").pack(side="left")
+        self.estimated_count_label = ttk.Label(estimate_frame, text="0.0")
+        self.estimated_count_label.pack(side="left", padx=5)
+        ttk.Label(estimate_frame, text="Hall check:").pack(side="left", padx=(10, 0))
+        self.hall_check_label = ttk.Label(estimate_frame, text="--")
+        self.hall_check_label.pack(side="left", padx=5)
+        
+        # Live RPM plot; measured in blue, commanded in grey
+        self.rate_canvas = tk.Canvas(status_frame, width=RATE_PLOT_WIDTH, height=RATE_PLOT_HEIGHT,
+                                     background="white", highlightthickness=0)
+        self.rate_canvas.pack(fill="x", padx=5, pady=5)
+        self.commanded_line = self.rate_canvas.create_line(0, 0, 0, 0, fill="grey", dash=(3, 3))
+        self.rate_line = self.rate_canvas.create_line(0, 0, 0, 0, fill="blue")
+        
+        # Serial link throughput
+        link_frame = ttk.Frame(status_frame)
+        link_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Label(link_frame, text="Link:").pack(side="left")
+        self.link_rate_label = ttk.Label(link_frame, text="0 lines/s, 0 B/s")
+        self.link_rate_label.pack(side="left", padx=5)
+        
+        ttk.Label(link_frame, text="Telemetry:").pack(side="left", padx=(10, 0))
+        self.telemetry_mode_label = ttk.Label(link_frame, text="text")
+        self.telemetry_mode_label.pack(side="left", padx=5)
+        
+        # Command round trip
+        rtt_frame = ttk.Frame(status_frame)
+        rtt_frame.pack(fill="x", padx=5)
+        
+        ttk.Label(rtt_frame, text="Command RTT:").pack(side="left")
+        self.command_rtt_label = ttk.Label(rtt_frame, text="-")
+        self.command_rtt_label.pack(side="left", padx=5)
     
     def create_console_section(self, parent):
         console_frame = ttk.LabelFrame(parent, text="Console")
         console_frame.pack(fill="both", padx=5, pady=5, expand=True)
         
+        # Message class filters
+        filter_frame = ttk.Frame(console_frame)
+        filter_frame.pack(side="top", fill="x", padx=5)
+        
+        self.console_filter_vars = {}
+        for cls in MESSAGE_CLASSES:
+            var = tk.BooleanVar(value=True)
+            self.console_filter_vars[cls] = var
+            ttk.Checkbutton(filter_frame, text=cls.capitalize(), variable=var,
+                            command=self.update_console_filter).pack(side="left", padx=2)
+        
         # Console output with scrollbar
         self.console = tk.Text(console_frame, height=15, width=50)
         self.console.pack(side="left", fill="both", expand=True, padx=5, pady=5)
@@ -263,95 +672,619 @@ class WinderControlApp:
         
         # Make the console read-only
         self.console.config(state=tk.DISABLED)
+        
+        # Ring-buffered history, flushed to the widget once per frame
+        self.console_view = ConsoleView(self.console, CONSOLE_CAPACITY)
     
     # Utility functions
     def refresh_ports(self):
-        ports = serial.tools.list_ports.comports()
-        available_ports = [port.device for port in ports]
-        self.port_combo['values'] = available_ports
-        if available_ports:
-            self.port_combo.current(0)
+        # The list updates when the scan finishes
+        self.port_watcher.refresh()
+    
+    def process_port_events(self):
+        while True:
+            try:
+                ports, added, removed = self.port_watcher.changes.get_nowait()
+            except queue.Empty:
+                break
+            self.port_combo['values'] = [port.device for port in ports]
+            if not self.port_var.get() and ports:
+                self.port_combo.current(0)
+            if self.ports_listed:
+                for device in removed:
+                    self.add_to_console(f"Port {device} removed")
+                for device in added:
+                    info = self.port_watcher.find(device)
+                    self.add_to_console(f"Port {info.label() if info else device} added")
+            self.ports_listed = True
+            
+            if self.connected:
+                # Fill in the USB identity of a port connected before the
+                # first scan finished
+                info = self.port_watcher.find(self.connected_port)
+                if info and info.identity() and (not self.last_port or
+                                                 self.last_port.identity() != info.identity()):
+                    self.remember_port(info)
+            elif self.link_supervisor.state == STATE_LOST:
+                # The winder came back; don't wait out the backoff
+                if added:
+                    self.link_supervisor.retry_now()
+            elif self.auto_connect:
+                match = find_port(ports, self.last_port)
+                if match:
+                    self.port_var.set(match.device)
+                    self.connect_serial(match.device, interactive=False)
+        
+        self.root.after(PORT_EVENT_INTERVAL, self.process_port_events)
     
-    def connect_serial(self):
+    def connect_last_port(self):
+        # Try the remembered device straight away rather than waiting for
+        # the first scan; if it has been renamed the scan will find it
+        if not self.auto_connect or self.connected:
+            return
+        device = self.last_port.device
+        if os.name == "nt" or os.path.exists(device):
+            self.connect_serial(device, interactive=False)
+    
+    def remember_port(self, info):
+        self.last_port = info
+        try:
+            save_last_port(info)
+        except OSError as e:
+            self.add_to_console(f"Could not save the last port: {str(e)}")
+    
+    def user_disconnect(self):
+        # Stay disconnected until the operator connects again
+        self.auto_connect = False
+        self.disconnect_serial()
+    
+    def connect_serial(self, port=None, interactive=True):
         if self.connected:
-            messagebox.showinfo("Info", "Already connected")
+            if interactive:
+                messagebox.showinfo("Info", "Already connected")
             return
         
-        port = self.port_var.get()
+        port = port or self.port_var.get()
         if not port:
             messagebox.showerror("Error", "No port selected")
             return
         
         try:
-            self.serial_conn = serial.Serial(port, 115200, timeout=1)
-            self.connected = True
-            self.connection_status.config(text="Status: Connected", foreground="green")
-            
-            # Start the monitoring thread
-            self.thread_running = True
-            self.monitoring_thread = threading.Thread(target=self.monitor_serial)
-            self.monitoring_thread.daemon = True
-            self.monitoring_thread.start()
-            
-            self.add_to_console(f"Connected to {port}")
+            self.open_link(port)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to connect: {str(e)}")
-    
-    def disconnect_serial(self):
-        if not self.connected:
+            if interactive:
+                messagebox.showerror("Error", f"Failed to connect: {str(e)}")
+            else:
+                self.add_to_console(f"Failed to connect to {port}: {str(e)}")
             return
         
-        # Stop the monitoring thread
+        self.connection_status.config(text="Status: Connected", foreground="green")
+        self.add_to_console(f"Connected to {port}")
+        self.link_supervisor.started(time.monotonic(), self.serial_reader.meter.bytes)
+        self.connected_port = port
+        self.auto_connect = True
+        info = self.port_watcher.find(port)
+        if info:
+            self.remember_port(info)
+        elif not self.last_port or self.last_port.device != port:
+            self.remember_port(PortInfo(port))
+    
+    def open_link(self, port):
+        # Opens the port and starts the reader thread and command writer;
+        # raises if the port can't be opened
+        if self.replay:
+            conn = ReplaySerial(*self.replay)
+        else:
+            conn = serial.Serial(port, 115200, timeout=1)
+        if self.capture:
+            self.capture.mark(f"open {port}")
+            conn = CapturingSerial(conn, self.capture)
+        self.serial_conn = conn
+        self.serial_reader = SerialLineReader(self.serial_conn)
+        self.command_pipeline = CommandPipeline(self.serial_conn.write).start()
+        self.serial_reader.line_hook = self.command_pipeline.handle_line
+        self.connected = True
+        self.link_port = port
+        self.link_opened_at = time.monotonic()
+        
+        # Start the monitoring thread
+        self.thread_running = True
+        self.monitoring_thread = threading.Thread(target=self.monitor_serial)
+        self.monitoring_thread.daemon = True
+        self.monitoring_thread.start()
+        
+        self.request_binary_telemetry()
+    
+    def close_link(self):
+        # Stop the monitoring thread and the command writer
         self.thread_running = False
-        if self.monitoring_thread:
+        if self.serial_reader:
+            self.serial_reader.stop()
+        if self.command_pipeline:
+            self.command_pipeline.stop()
+        if self.monitoring_thread and self.monitoring_thread is not threading.current_thread():
             self.monitoring_thread.join(timeout=1)
         
         if self.serial_conn:
-            self.serial_conn.close()
+            try:
+                self.serial_conn.close()
+            except Exception:
+                pass
             self.serial_conn = None
+            if self.capture:
+                self.capture.mark("close")
         
         self.connected = False
+        self.awaiting_count = False
+        self.set_telemetry_mode("text")
+    
+    def disconnect_serial(self):
+        lost = self.link_supervisor.state == STATE_LOST
+        self.link_supervisor.stopped()
+        if not self.connected and not lost:
+            return
+        
+        if self.connected:
+            self.close_link()
+        self.replay = None
+        self.end_run(completed=False)
+        self.connected_port = None
         self.connection_status.config(text="Status: Disconnected", foreground="red")
         self.add_to_console("Disconnected")
     
+    def link_dropped(self):
+        # Called by the supervisor when the link fails; the coil in progress
+        # is kept so it can carry on after the reconnect
+        self.close_link()
+        self.connection_status.config(text="Status: Reconnecting...", foreground="orange")
+    
+    def reconnect_link(self):
+        # The remembered winder may have come back under a new device name
+        match = find_port(self.port_watcher.ports or [], self.last_port)
+        port = match.device if match else self.link_port
+        try:
+            self.open_link(port)
+        except Exception:
+            self.connection_status.config(
+                text=f"Status: Reconnecting ({self.link_supervisor.attempts})...", foreground="orange")
+            return False
+        self.connected_port = port
+        self.connection_status.config(text="Status: Connected", foreground="green")
+        return True
+    
+    def supervise_link(self):
+        now = time.monotonic()
+        reader = self.serial_reader if self.connected else None
+        result = self.link_supervisor.poll(now, reader.meter.bytes if reader else 0)
+        if result == POLL_LOST:
+            self.add_to_console(f"Connection lost: {self.link_supervisor.reason}; reconnecting")
+        elif result == POLL_RECONNECTED:
+            self.add_to_console(f"Reconnected to {self.link_port} after "
+                                f"{self.link_supervisor.last_reconnect_time:.1f} s")
+            self.start_resync()
+        elif self.link_supervisor.reconcile_overdue(now):
+            # The setpoints or the count report went missing; try again
+            self.start_resync()
+        elif self.replay and self.connected and self.serial_conn.finished:
+            self.add_to_console(f"Replay finished: {self.serial_conn.bytes_replayed} bytes")
+            self.connection_status.config(text="Status: Replay finished", foreground="blue")
+            self.replay = None
+        self.root.after(LINK_CHECK_INTERVAL, self.supervise_link)
+    
+    def start_capture(self, path):
+        # Every link from here on, including reconnects, goes into one file
+        try:
+            self.capture = SerialCapture(path)
+        except OSError as e:
+            self.add_to_console(f"Could not start the capture: {str(e)}")
+            return
+        self.add_to_console(f"Capturing the serial link to {path}")
+    
+    def start_replay(self, path, speed):
+        # Feeds a capture through the reader thread and the Tk callbacks as
+        # if it came from a winder; commands are accepted and dropped
+        self.auto_connect = False
+        self.replay = (path, speed)
+        try:
+            self.open_link(f"replay of {os.path.basename(path)}")
+        except (OSError, ValueError) as e:
+            self.replay = None
+            messagebox.showerror("Error", f"Failed to replay: {str(e)}")
+            return
+        # A capture that goes quiet isn't a dead link
+        self.link_supervisor.stopped()
+        self.connection_status.config(text="Status: Replaying", foreground="blue")
+        self.add_to_console(f"Replaying {path} at {f'{speed:g}x' if speed else 'maximum speed'}")
+    
+    def link_lost(self, reason):
+        if self.link_supervisor.lost(reason, time.monotonic()):
+            self.add_to_console(f"Connection lost: {reason}; reconnecting")
+    
+    def start_resync(self):
+        # Put the device back into the state this window holds; START stays
+        # blocked until its wind count has been reconciled
+        self.link_supervisor.begin_resync(time.monotonic())
+        if not self.awaiting_count:
+            self.status_before_resync = self.motor_status_label.cget("text")
+        self.awaiting_count = True
+        self.motor_status_label.config(text="RESYNCING", foreground="orange")
+        for command in setpoint_commands(self.desired_wind_count, self.winder_speed, self.traverse_delay,
+                                         self.left_limit, self.right_limit, self.count_offset):
+            self.send_command(command)
+        if self.decel_profile:
+            self.send_command(self.decel_profile.command())
+        if self.channel2.used:
+            for command in self.channel2.setpoint_commands():
+                self.send_command(command)
+    
+    def handle_device_restart(self):
+        if self.link_supervisor.state == STATE_DOWN:
+            return
+        now = time.monotonic()
+        if now - self.link_opened_at < STALE_AFTER:
+            # Opening the port reset the board; not a fault, but it still
+            # needs the settings shown in this window
+            self.add_to_console("Winder started; sending the current settings")
+        else:
+            self.add_to_console("Winder restarted; restoring its settings")
+            self.link_supervisor.device_restarted(now)
+        if self.channel2.status in (STATUS_STARTING, STATUS_RUNNING, STATUS_STOPPING):
+            # Channel 2's count isn't carried over a restart; its coil stops here
+            self.add_to_console(f"Channel 2 stopped at {self.channel2.wind_count} turns by the restart")
+            self.channel2.status = STATUS_STOPPED
+            self.end_channel2_run(completed=False)
+        self.start_resync()
+    
+    def reconcile_wind_count(self, raw):
+        # First count after a resync: did the device keep its count?
+        self.awaiting_count = False
+        last = self.current_wind_count
+        outcome = reconcile_count(last, raw + self.count_offset)
+        if outcome == COUNT_LOST:
+            status = "STOPPED"
+            self.end_run(completed=False)
+            if 0 < last < self.desired_wind_count and messagebox.askyesno(
+                    "Resume Coil", f"The winder lost its wind count (it reports {raw}, "
+                                   f"the last count seen was {last}).\n\nContinue this coil from {last}?"):
+                self.count_offset = last - raw
+                self.send_command(f"N{max(self.desired_wind_count - self.count_offset, 1)}")
+                self.add_to_console(f"Continuing from {last}; START winds the remaining "
+                                    f"{self.desired_wind_count - last} turns")
+            else:
+                self.count_offset = 0
+                self.send_command("R")
+                raw = 0
+                self.add_to_console(f"Wind count lost at {last}; counter reset")
+        else:
+            status = self.status_before_resync
+            if outcome == COUNT_AHEAD:
+                self.add_to_console(f"Winder counted {raw + self.count_offset - last} turns while disconnected")
+            if raw + self.count_offset >= self.desired_wind_count and self.active_run:
+                # The coil finished while the link was down
+                status = "STOPPED"
+                self.active_run.add_event(time.time(), EVENT_COMPLETE, raw + self.count_offset)
+                self.end_run(completed=True)
+                self.handle_coil_complete()
+        self.link_supervisor.resynced(time.monotonic())
+        self.add_to_console(f"Resynced {self.link_supervisor.last_resync_time:.1f} s after the fault")
+        if status in ("RUNNING", "STOPPED", "DISABLED"):
+            self.motor_status_label.config(text=status, foreground="green" if status == "RUNNING" else "red")
+        else:
+            self.motor_status_label.config(text="UNKNOWN", foreground="orange")
+        return raw
+    
+    def request_binary_telemetry(self):
+        # Frames are accepted as soon as we ask; older firmware never sends
+        # the sync byte so a text-only link is unaffected
+        self.serial_reader.enable_frames(True)
+        self.set_telemetry_mode("negotiating")
+        self.send_command(REQUEST_BINARY)
+        self.root.after(TELEMETRY_NEGOTIATION_TIMEOUT, self.check_telemetry_negotiation)
+    
+    def check_telemetry_negotiation(self):
+        if self.connected and self.telemetry_mode == "negotiating":
+            self.add_to_console("No reply to binary telemetry request, using text telemetry")
+            self.set_telemetry_mode("text")
+    
+    def set_telemetry_mode(self, mode):
+        self.telemetry_mode = mode
+        if self.serial_reader and mode == "text":
+            self.serial_reader.enable_frames(False)
+        self.telemetry_mode_label.config(text=mode)
+    
+    def handle_protocol_line(self, line):
+        channel, text = split_channel(line)
+        if channel != PRIMARY_CHANNEL:
+            self.handle_channel2_line(text)
+        elif line == REPLY_BINARY:
+            self.set_telemetry_mode("binary")
+        elif line.startswith(REPLY_UNSUPPORTED):
+            self.add_to_console("Firmware has no binary telemetry, using text telemetry")
+            self.set_telemetry_mode("text")
+        elif line.startswith("Traverse: Changing direction") and self.traverse_plan:
+            if len(self.traverse_plan.layer_delays) > 1:
+                self.push_plan_delay(self.traverse_plan.next_delay())
+            else:
+                self.traverse_plan.next_delay()
+        elif line.startswith("Target wind count reached"):
+            self.count_estimator.stop(time.monotonic())
+            if self.count_estimator.missed:
+                self.add_to_console(f"Hall sensor missed about {self.count_estimator.missed} pulses; "
+                                    f"the bobbin has about {self.count_estimator.finish_turns():.0f} turns")
+            if self.active_run:
+                self.active_run.add_event(time.time(), EVENT_COMPLETE, self.current_wind_count)
+                self.end_run(completed=True)
+            self.handle_coil_complete()
+        elif line.startswith("All motors disabled"):
+            # Both channels
+            self.channel2.handle_line(line)
+            self.end_channel2_run(completed=False)
+        elif line == "System initialized":
+            if self.telemetry_mode != "text":
+                # The ESP32 resets when the port opens, so the first request
+                # may have been sent before the firmware was listening
+                self.request_binary_telemetry()
+            self.handle_device_restart()
+    
     def add_to_console(self, message):
-        self.console.config(state=tk.NORMAL)
-        self.console.insert(tk.END, message + "\n")
-        self.console.see(tk.END)
-        self.console.config(state=tk.DISABLED)
+        # Buffered; the widget is updated by process_serial_events each frame
+        self.console_view.append(message)
+    
+    def update_console_filter(self):
+        classes = [cls for cls, var in self.console_filter_vars.items() if var.get()]
+        self.console_view.set_filter(classes)
     
     def monitor_serial(self):
+        # Runs on the background thread; never touches Tk widgets directly
+        reader = self.serial_reader
         while self.thread_running and self.serial_conn:
             try:
-                if self.serial_conn.in_waiting:
-                    line = self.serial_conn.readline().decode('utf-8').strip()
-                    if line:
-                        # Parse wind count from responses
-                        if "Wind Count:" in line:
-                            try:
-                                count_value = line.split("Wind Count:")[1].strip()
-                                self.current_wind_count = int(count_value)
-                            except (ValueError, IndexError):
-                                pass
-                        
-                        self.add_to_console(line)
+                reader.pump()
             except Exception as e:
-                self.add_to_console(f"Error reading: {str(e)}")
+                reader.post(EVENT_ERROR, f"Error reading: {str(e)}")
                 break
-            time.sleep(0.01)
+    
+    def process_serial_events(self):
+        reader = self.serial_reader
+        if reader:
+            for _ in range(MAX_EVENTS_PER_FRAME):
+                try:
+                    kind, payload = reader.events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == EVENT_FRAME:
+                    count, _, winder_hz, traverse_position = payload
+                    self.reported_winder_hz = winder_hz
+                    self.reported_traverse_position = traverse_position
+                    self.count_estimator.speed_report(time.monotonic(), winder_hz)
+                    self.handle_count(count)
+                elif kind == EVENT_COUNT:
+                    self.handle_count(payload)
+                elif kind == EVENT_CHANNEL_COUNT:
+                    self.handle_channel2_count(*payload)
+                elif kind == EVENT_LINE:
+                    self.add_to_console(payload)
+                    self.handle_protocol_line(payload)
+                elif kind == EVENT_ERROR:
+                    self.add_to_console(payload)
+                    self.link_lost(payload)
+        
+        if self.command_pipeline:
+            self.process_command_results()
+        
+        self.console_view.flush()
+        self.root.after(50, self.process_serial_events)
     
     def send_command(self, command):
         if not self.connected or not self.serial_conn:
             messagebox.showerror("Error", "Not connected to device")
             return False
         
-        try:
-            self.serial_conn.write((command + "\n").encode())
-            self.add_to_console(f"Sent: {command}")
-            return True
-        except Exception as e:
-            self.add_to_console(f"Error sending command: {str(e)}")
-            return False
+        # Written by the pipeline thread; results come back through
+        # process_command_results
+        self.command_pipeline.submit(command)
+        return True
+    
+    def process_command_results(self):
+        pipeline = self.command_pipeline
+        while True:
+            try:
+                kind, command, detail, latency_ms = pipeline.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == RESULT_SENT:
+                self.add_to_console(f"Sent: {command}")
+                self.record_command(command)
+            elif kind == RESULT_ACK:
+                self.handle_command_ack(command)
+            elif kind == RESULT_NACK:
+                self.add_to_console(f"Error: '{command}' rejected: {detail}")
+            elif kind == RESULT_TIMEOUT:
+                self.handle_command_timeout(command)
+            elif kind == RESULT_ERROR:
+                self.add_to_console(f"Error sending command: {detail}")
+                self.link_lost(detail)
+    
+    def handle_command_ack(self, command):
+        if command == "S":
+            self.motor_status_label.config(text="RUNNING", foreground="green")
+            self.configure_count_estimator()
+            self.count_estimator.start(time.monotonic(), self.current_wind_count)
+            self.missed_reported = False
+        elif command == "T":
+            self.motor_status_label.config(text="STOPPED", foreground="red")
+            self.count_estimator.stop(time.monotonic())
+    
+    def handle_command_timeout(self, command):
+        if command == "T":
+            # The firmware only stays silent when the motors were already stopped
+            self.motor_status_label.config(text="STOPPED", foreground="red")
+        elif command == "2:T":
+            self.channel2.status = STATUS_STOPPED
+        else:
+            self.add_to_console(f"No reply to '{command}'")
+            if command == "S":
+                self.motor_status_label.config(text="UNKNOWN", foreground="orange")
+            elif command == "2:S":
+                self.channel2.status = STATUS_STOPPED
+    
+    # Run recording
+    def machine_name(self):
+        return f"{socket.gethostname()}:{self.port_var.get()}"
+    
+    def begin_run(self):
+        self.end_run(completed=False)
+        self.rate_estimator.reset()
+        self.rate_series.reset()
+        now = time.time()
+        self.active_run = self.run_store.start_run(self.machine_name(), self.desired_wind_count,
+                                                   self.winder_speed, started=now)
+        # Setpoints in force at the start of the coil
+        self.active_run.add_event(now, EVENT_TARGET, self.desired_wind_count)
+        self.active_run.add_event(now, EVENT_WINDER_SPEED, self.winder_speed)
+        self.active_run.add_event(now, EVENT_TRAVERSE_DELAY, self.traverse_delay)
+        self.active_run.add_event(now, EVENT_LEFT_LIMIT, self.left_limit)
+        self.active_run.add_event(now, EVENT_RIGHT_LIMIT, self.right_limit)
+        self.active_run.add_sample(now, self.current_wind_count)
+    
+    def end_run(self, completed):
+        if self.active_run:
+            self.run_store.finish_run(self.active_run, completed)
+            self.active_run = None
+            if completed:
+                self.decel_model = None
+    
+    def record_command(self, command):
+        channel, text = split_channel(command)
+        if channel != PRIMARY_CHANNEL:
+            self.record_channel2_command(text)
+            return
+        if command == "S":
+            self.begin_run()
+        event = command_event(command)
+        if self.active_run and event:
+            self.active_run.add_event(time.time(), *event)
+        if command in ("T", "disable_all_motors"):
+            self.end_run(completed=False)
+        if command == "disable_all_motors":
+            self.end_channel2_run(completed=False)
+    
+    def record_count(self, count):
+        if self.active_run:
+            self.active_run.add_sample(time.time(), count)
+    
+    def handle_count(self, count):
+        if self.awaiting_count:
+            count = self.reconcile_wind_count(count)
+        count += self.count_offset
+        self.current_wind_count = count
+        now = time.monotonic()
+        self.rate_estimator.add(now, count)
+        self.record_count(count)
+        if self.count_estimator.observe(now, count):
+            self.report_missed_pulses()
+    
+    def configure_count_estimator(self):
+        self.count_estimator.configure(self.desired_wind_count, self.winder_speed, self.decel_profile)
+    
+    def report_missed_pulses(self):
+        # The status row tracks the total; the console only gets the first
+        # miss and, on completion, the final figure
+        estimator = self.count_estimator
+        if not self.missed_reported:
+            self.missed_reported = True
+            self.add_to_console(f"Hall sensor is missing pulses; expect about "
+                                f"{estimator.finish_turns():.0f} turns on the bobbin")
+        if self.active_run:
+            self.active_run.add_event(time.time(), EVENT_MISSED, estimator.missed)
+    
+    # Metrics and profiling
+    def register_metrics(self):
+        # Read on the metrics thread, so these only look at plain attributes
+        # and never call into Tk or the rate estimator
+        metrics = self.metrics
+        reader = lambda: self.serial_reader if self.connected else None
+        pipeline = lambda: self.command_pipeline if self.connected else None
+        metrics.gauge("winder_connected", "1 while the serial link is up", lambda: int(self.connected))
+        metrics.counter("winder_serial_bytes_total", "Bytes received on the current link",
+                        lambda: reader() and reader().meter.bytes)
+        metrics.counter("winder_capture_bytes_total", "Bytes written to the serial capture",
+                        lambda: self.capture and {'direction="in"': self.capture.bytes_in,
+                                                  'direction="out"': self.capture.bytes_out})
+        metrics.counter("winder_serial_lines_total", "Lines and telemetry frames received on the current link",
+                        lambda: reader() and reader().meter.lines)
+        metrics.gauge("winder_serial_bytes_per_second", "Receive rate at the last status update",
+                      lambda: reader() and reader().meter.bytes_per_sec)
+        metrics.gauge("winder_serial_lines_per_second", "Line rate at the last status update",
+                      lambda: reader() and reader().meter.lines_per_sec)
+        metrics.counter("winder_serial_parse_errors_total", "Unparseable wind counts and bad frame checksums",
+                        lambda: reader() and reader().parse_errors)
+        metrics.gauge("winder_serial_event_backlog", "Serial events waiting for the Tk thread",
+                      lambda: reader() and reader().events.qsize())
+        metrics.counter("winder_link_faults_total", "Serial faults and firmware restarts",
+                        lambda: self.link_supervisor.faults)
+        metrics.counter("winder_link_reconnects_total", "Successful automatic reconnects",
+                        lambda: self.link_supervisor.reconnects)
+        metrics.gauge("winder_command_rtt_ms", "Command round trip, upper bucket bound",
+                      lambda: pipeline() and quantiles(pipeline().overall))
+        metrics.gauge("winder_command_rtt_mean_ms", "Mean command round trip",
+                      lambda: pipeline() and pipeline().overall.mean())
+        metrics.counter("winder_commands_acked_total", "Commands acknowledged on the current link",
+                        lambda: pipeline() and pipeline().overall.total)
+        metrics.gauge("winder_command_backlog", "Commands waiting to be written",
+                      lambda: pipeline() and len(pipeline().pending))
+        metrics.gauge("tk_loop_lag_ms", "How late the last status update ran", lambda: self.loop_lag.last_ms)
+        metrics.gauge("tk_loop_lag_recent_ms", "Status update lag over the last minute",
+                      lambda: {'stat="max"': self.loop_lag.recent_max(),
+                               'stat="p99"': self.loop_lag.recent_percentile(99)})
+        metrics.gauge("tk_loop_lag_ms_quantile", "Status update lag since startup, upper bucket bound",
+                      lambda: quantiles(self.loop_lag.histogram))
+        metrics.gauge("console_backlog_lines", "Console lines waiting to be drawn",
+                      lambda: len(self.console_view.pending))
+        metrics.gauge("console_history_lines", "Console lines held in the history",
+                      lambda: len(self.console_view.buffer))
+        metrics.gauge("console_widget_lines", "Lines in the console widget",
+                      lambda: self.console_view.widget_lines)
+        metrics.gauge("winder_wind_count", "Wind count", lambda: self.current_wind_count)
+        metrics.gauge("winder_target_count", "Desired wind count", lambda: self.desired_wind_count)
+        metrics.gauge("winder_wind_rate_turns_per_second", "Measured winding rate", lambda: self.wind_rate)
+        metrics.gauge("winder_missed_pulses", "Hall pulses missed this coil",
+                      lambda: self.count_estimator.missed)
+        metrics.gauge("winder_channel2_wind_count", "Channel 2 wind count", lambda: self.channel2.wind_count)
+        metrics.gauge("winder_channel2_target_count", "Channel 2 desired wind count",
+                      lambda: self.channel2.desired_wind_count)
+        add_process_metrics(metrics)
+        self.profiler.add_metrics(metrics)
+    
+    def start_metrics(self, port=None, path=None, profile=False):
+        if port is not None:
+            # Optional; a port in use (say, a second window) mustn't stop the GUI
+            try:
+                self.metrics_server = MetricsServer(self.metrics, self.profiler, port=port).start()
+            except OSError as e:
+                self.add_to_console(f"Metrics disabled: {str(e)}")
+            else:
+                self.add_to_console(f"Metrics on http://127.0.0.1:{self.metrics_server.port}/metrics")
+        if path:
+            self.metrics_file = MetricsFile(self.metrics, path, profiler=self.profiler).start()
+            self.add_to_console(f"Writing metrics to {path}")
+        if profile:
+            self.profiler.start()
+    
+    def on_close(self):
+        self.profiler.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.metrics_file:
+            self.metrics_file.stop()
+        self.port_watcher.stop()
+        self.disconnect_serial()
+        if self.capture:
+            self.capture.close()
+        self.end_run(completed=False)
+        self.end_channel2_run(completed=False)
+        self.run_store.close()
+        self.root.destroy()
     
     # UI update functions
     def update_winder_speed_display(self, value):
@@ -373,101 +1306,460 @@ class WinderControlApp:
     # Command functions
     def set_wind_count(self):
         try:
-            count = int(self.wind_count_var.get())
-            if count <= 0:
-                messagebox.showerror("Error", "Wind count must be greater than 0")
-                return
-            
-            self.desired_wind_count = count
-            self.target_count_label.config(text=str(count))
-            self.send_command(f"N{count}")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid wind count value")
+            count = parse_wind_count(self.wind_count_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.desired_wind_count = count
+        self.target_count_label.config(text=str(count))
+        # The device only counts the turns since its last restart
+        self.send_command(f"N{max(count - self.count_offset, 1)}")
     
     def set_winder_speed(self):
         try:
-            speed = int(self.winder_speed_var.get())
-            if speed <= 0:
-                messagebox.showerror("Error", "Speed must be greater than 0")
-                return
-            
-            self.winder_speed = speed
-            self.winder_speed_slider.set(speed)
-            self.send_command(f"w_speed:{speed}")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid speed value")
+            speed = parse_winder_speed(self.winder_speed_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.winder_speed = speed
+        self.winder_speed_slider.set(speed)
+        self.send_command(f"w_speed:{speed}")
+        self.plan_speed_changed()
+        if self.decel_profile:
+            self.update_decel_profile()
     
     def set_preset_speed(self, speed):
         self.winder_speed = speed
         self.winder_speed_var.set(str(speed))
         self.winder_speed_slider.set(speed)
         self.send_command(f"w_speed:{speed}")
+        self.plan_speed_changed()
+        if self.decel_profile:
+            self.update_decel_profile()
     
     def set_traverse_delay(self):
         try:
-            delay = int(self.traverse_delay_var.get())
-            if delay <= 0:
-                messagebox.showerror("Error", "Delay must be greater than 0")
-                return
-            
-            self.traverse_delay = delay
-            self.traverse_delay_slider.set(delay)
-            self.send_command(f"t_speed:{delay}")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid delay value")
+            delay = parse_traverse_delay(self.traverse_delay_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.traverse_delay = delay
+        self.traverse_delay_slider.set(delay)
+        self.send_command(f"t_speed:{delay}")
     
     def set_left_limit(self):
         try:
-            limit = int(self.left_limit_var.get())
-            if limit < 0:
-                messagebox.showerror("Error", "Left limit cannot be negative")
-                return
-            
-            self.left_limit = limit
-            self.left_limit_slider.set(limit)
-            self.send_command(f"t_leftlimit:{limit}")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid limit value")
+            limit = parse_left_limit(self.left_limit_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.left_limit = limit
+        self.left_limit_slider.set(limit)
+        self.send_command(f"t_leftlimit:{limit}")
     
     def set_right_limit(self):
         try:
-            limit = int(self.right_limit_var.get())
-            if limit <= 0 or limit > 12800:
-                messagebox.showerror("Error", "Right limit must be between 1 and 12800")
-                return
-            
-            self.right_limit = limit
-            self.right_limit_slider.set(limit)
-            self.send_command(f"t_rightlimit:{limit}")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid limit value")
+            limit = parse_right_limit(self.right_limit_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        self.right_limit = limit
+        self.right_limit_slider.set(limit)
+        self.send_command(f"t_rightlimit:{limit}")
     
     def start_motors(self):
-        self.send_command("S")
-        self.motor_status_label.config(text="RUNNING", foreground="green")
+        if self.connected and not self.link_supervisor.ready:
+            messagebox.showinfo("Info", "Wait for the winder to resync after the reconnect")
+            return
+        
+        # Every coil starts on the plan's first layer
+        if self.traverse_plan and self.connected:
+            self.traverse_plan.restart()
+            self.push_plan_delay(self.traverse_plan.first_delay())
+        
+        # The slowdown profile depends on the speed and traverse delay
+        # the coil starts with
+        if self.decel_var.get() and self.connected:
+            self.update_decel_profile()
+        
+        # RUNNING is shown once the firmware confirms the start
+        if self.send_command("S"):
+            self.motor_status_label.config(text="STARTING", foreground="orange")
     
     def stop_motors(self):
-        self.send_command("T")
-        self.motor_status_label.config(text="STOPPED", foreground="red")
+        if self.send_command("T"):
+            self.motor_status_label.config(text="STOPPING", foreground="orange")
     
     def reset_counter(self):
         self.send_command("R")
+        if self.count_offset:
+            # The device holds a target shortened by the resumed count
+            self.count_offset = 0
+            self.send_command(f"N{self.desired_wind_count}")
         self.current_wind_count = 0
+        self.rate_estimator.reset()
         self.current_count_label.config(text="0")
         self.progress_var.set(0)
         self.progress_percent.config(text="0%")
     
     def disable_all_motors(self):
+        self.count_estimator.stop(time.monotonic())
         self.send_command("disable_all_motors")
         self.motor_status_label.config(text="DISABLED", foreground="red")
     
     def reset_traverse_home(self):
         self.send_command("t_home")
     
+    # Channel 2
+    def send_channel2_command(self, command):
+        return self.send_command(self.channel2.command(command))
+    
+    def set_channel2_setpoints(self):
+        entries = self.channel2_vars
+        try:
+            values = {
+                "desired_wind_count": parse_wind_count(entries["desired_wind_count"].get()),
+                "winder_speed": parse_winder_speed(entries["winder_speed"].get()),
+                "traverse_delay": parse_traverse_delay(entries["traverse_delay"].get()),
+                "left_limit": parse_left_limit(entries["left_limit"].get()),
+                "right_limit": parse_right_limit(entries["right_limit"].get()),
+            }
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        for key, value in values.items():
+            setattr(self.channel2, key, value)
+        if not self.connected:
+            messagebox.showerror("Error", "Not connected to device")
+            return
+        self.channel2.used = True
+        for command in self.channel2.setpoint_commands():
+            self.send_command(command)
+    
+    def start_channel2(self):
+        if self.connected and not self.link_supervisor.ready:
+            messagebox.showinfo("Info", "Wait for the winder to resync after the reconnect")
+            return
+        if self.send_channel2_command("S"):
+            self.channel2.status = STATUS_STARTING
+    
+    def stop_channel2(self):
+        if self.send_channel2_command("T"):
+            self.channel2.status = STATUS_STOPPING
+    
+    def reset_channel2_counter(self):
+        if self.send_channel2_command("R"):
+            self.channel2.wind_count = 0
+            self.channel2_rate.reset()
+    
+    def handle_channel2_line(self, line):
+        # "All motors stopped" comes just before the target line, so runs
+        # are only ended early by a STOP 2 the host sent
+        if self.channel2.handle_line(line):
+            if self.channel2_run:
+                self.channel2_run.add_event(time.time(), EVENT_COMPLETE, self.channel2.wind_count)
+            self.end_channel2_run(completed=True)
+    
+    def handle_channel2_count(self, channel, count):
+        if channel != self.channel2.channel:
+            return
+        self.channel2.wind_count = count
+        self.channel2_rate.add(time.monotonic(), count)
+        if self.channel2_run:
+            self.channel2_run.add_sample(time.time(), count)
+    
+    def record_channel2_command(self, command):
+        # Channel 2's coils are recorded as their own machine, so fits and
+        # queries never mix the two spindles
+        if command == "S":
+            self.end_channel2_run(completed=False)
+            self.channel2_rate.reset()
+            channel = self.channel2
+            now = time.time()
+            self.channel2_run = self.run_store.start_run(f"{self.machine_name()}/2", channel.desired_wind_count,
+                                                         channel.winder_speed, started=now)
+            self.channel2_run.add_event(now, EVENT_TARGET, channel.desired_wind_count)
+            self.channel2_run.add_event(now, EVENT_WINDER_SPEED, channel.winder_speed)
+            self.channel2_run.add_event(now, EVENT_TRAVERSE_DELAY, channel.traverse_delay)
+            self.channel2_run.add_event(now, EVENT_LEFT_LIMIT, channel.left_limit)
+            self.channel2_run.add_event(now, EVENT_RIGHT_LIMIT, channel.right_limit)
+            self.channel2_run.add_sample(now, channel.wind_count)
+            return
+        event = command_event(command)
+        if self.channel2_run and event:
+            self.channel2_run.add_event(time.time(), *event)
+        if command == "T":
+            self.end_channel2_run(completed=False)
+    
+    def end_channel2_run(self, completed):
+        if self.channel2_run:
+            self.run_store.finish_run(self.channel2_run, completed)
+            self.channel2_run = None
+    
+    def update_channel2_display(self):
+        channel = self.channel2
+        self.channel2_count_label.config(text=str(channel.wind_count))
+        self.channel2_target_label.config(text=f"/ {channel.desired_wind_count}")
+        self.channel2_progress_var.set(channel.progress)
+        self.channel2_percent.config(text=f"{int(channel.progress)}%")
+        self.channel2_status_label.config(text=channel.status, foreground=STATUS_COLOURS[channel.status])
+        rate, _, _, _, eta = self.channel2_rate.estimate(channel.wind_count, channel.desired_wind_count,
+                                                         channel.winder_speed)
+        if channel.status == STATUS_RUNNING and rate > 0 and eta != float("inf"):
+            minutes, seconds = divmod(int(eta), 60)
+            self.channel2_rate_label.config(text=f"{rate:.1f} turns/s, ETA {minutes:02d}:{seconds:02d}")
+        else:
+            self.channel2_rate_label.config(text=f"{rate:.1f} turns/s, ETA --:--")
+    
+    # Recipes and jobs
+    def refresh_recipe_list(self):
+        names = self.recipe_book.names()
+        self.recipe_combo['values'] = names
+        if names and self.recipe_var.get() not in names:
+            self.recipe_combo.current(0)
+    
+    def refresh_job_list(self):
+        if self.jobs_window is None:
+            return
+        self.job_listbox.delete(0, tk.END)
+        for name in self.job_queue.describe():
+            self.job_listbox.insert(tk.END, name)
+        current = self.job_queue.current
+        if self.job_queue.active and current:
+            text = f"Winding {current.name} ({self.job_queue.completed} done, {len(self.job_queue.jobs)} left)"
+        else:
+            text = f"Idle ({len(self.job_queue.jobs)} queued)"
+        self.job_status_label.config(text=text)
+    
+    def selected_recipe(self):
+        recipe = self.recipe_book.get(self.recipe_var.get())
+        if recipe is None:
+            messagebox.showerror("Error", "No recipe selected")
+        return recipe
+    
+    def save_current_recipe(self):
+        try:
+            recipe = Recipe(self.recipe_name_var.get().strip(), self.desired_wind_count, self.winder_speed,
+                            self.traverse_delay, self.left_limit, self.right_limit,
+                            self.recipe_home_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        try:
+            self.recipe_book.add(recipe)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save recipes: {str(e)}")
+        self.refresh_recipe_list()
+        self.recipe_var.set(recipe.name)
+    
+    def delete_selected_recipe(self):
+        recipe = self.selected_recipe()
+        if recipe:
+            try:
+                self.recipe_book.remove(recipe.name)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save recipes: {str(e)}")
+            self.recipe_var.set("")
+            self.refresh_recipe_list()
+    
+    def load_selected_recipe(self):
+        recipe = self.selected_recipe()
+        if recipe:
+            self.apply_recipe(recipe)
+    
+    def apply_recipe(self, recipe):
+        # Goes through the normal set_* paths so validation, the sliders and
+        # the run recorder all see the change
+        self.wind_count_var.set(str(recipe.wind_count))
+        self.set_wind_count()
+        self.winder_speed_var.set(str(recipe.winder_speed))
+        self.set_winder_speed()
+        self.traverse_delay_var.set(str(recipe.traverse_delay))
+        self.set_traverse_delay()
+        self.left_limit_var.set(str(recipe.left_limit))
+        self.set_left_limit()
+        self.right_limit_var.set(str(recipe.right_limit))
+        self.set_right_limit()
+        if recipe.home_traverse:
+            self.reset_traverse_home()
+        self.add_to_console(f"Loaded recipe {recipe.name}")
+    
+    def add_selected_job(self):
+        recipe = self.selected_recipe()
+        if not recipe:
+            return
+        try:
+            quantity = int(self.job_quantity_var.get())
+            if quantity <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Quantity must be a whole number greater than 0")
+            return
+        self.job_queue.add(recipe, quantity)
+        self.refresh_job_list()
+    
+    def start_job_queue(self):
+        if not self.connected:
+            messagebox.showerror("Error", "Not connected to device")
+            return
+        recipe = self.job_queue.start()
+        if recipe is None:
+            messagebox.showerror("Error", "Job queue is empty")
+            return
+        self.load_job(recipe)
+    
+    def stop_job_queue(self):
+        self.job_queue.stop()
+        self.refresh_job_list()
+    
+    def clear_job_queue(self):
+        self.job_queue.clear()
+        self.refresh_job_list()
+    
+    def load_job(self, recipe):
+        # Parameters go out straight away; only the bobbin swap waits for the
+        # operator. The reset comes first so the target is sent without the
+        # previous coil's count offset.
+        self.reset_counter()
+        self.apply_recipe(recipe)
+        self.refresh_job_list()
+        self.root.after(0, self.confirm_job_start)
+    
+    def confirm_job_start(self):
+        recipe = self.job_queue.current
+        if not self.job_queue.active or recipe is None:
+            return
+        if messagebox.askokcancel("Bobbin Swap", f"Load a fresh bobbin for {recipe.name}, then press OK to start."):
+            self.start_motors()
+        else:
+            self.stop_job_queue()
+            self.add_to_console("Job queue stopped")
+    
+    def handle_coil_complete(self):
+        if not self.job_queue.active:
+            return
+        recipe = self.job_queue.coil_complete()
+        if recipe is None:
+            self.add_to_console(f"Job queue finished: {self.job_queue.completed} coils")
+            self.refresh_job_list()
+        else:
+            self.load_job(recipe)
+    
+    # Traverse planning
+    def compute_traverse_plan(self):
+        # Preview only: the table becomes active, and its limits and delays
+        # are sent, when it is applied
+        try:
+            planner = TraversePlanner(bobbin_width_mm=float(self.planner_vars["width"].get()),
+                                      awg=float(self.planner_vars["awg"].get()),
+                                      lead_mm=float(self.planner_vars["lead"].get()),
+                                      left_offset_mm=float(self.planner_vars["offset"].get()))
+            turns_per_layer = float(self.planner_vars["turns_per_layer"].get())
+            if (planner.bobbin_width_mm <= 0 or planner.lead_mm <= 0 or turns_per_layer < 0
+                    or not 0 <= planner.left_offset_mm * planner.steps_per_mm < MAX_RIGHT_LIMIT):
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Invalid planner value")
+            return None
+        
+        # Precompute every preset speed so later speed changes are a lookup
+        try:
+            table = PlanTable(planner, self.desired_wind_count, PRESET_SPEEDS + [self.winder_speed],
+                              turns_per_layer or None, self.planner_vars["scatter"].get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Can't plan this bobbin: {e}")
+            return None
+        plan = table.get(self.winder_speed)
+        
+        delays = ", ".join(str(d) for d in plan.layer_delays[:6])
+        if len(plan.layer_delays) > 6:
+            delays += ", ..."
+        lines = [
+            f"Limits: {plan.left_limit} - {plan.right_limit} steps",
+            f"Step delay per layer: {delays} µs",
+            f"Turns per layer: {plan.turns_per_layer:.1f}, layers: {plan.layers}",
+            f"Build height: {min(plan.profile):.2f} - {max(plan.profile):.2f} mm",
+            f"Wire length: {plan.wire_length_m:.0f} m",
+        ]
+        lines.extend(plan.warnings)
+        self.plan_result_label.config(text="\n".join(lines))
+        return table
+    
+    def apply_traverse_plan(self):
+        table = self.compute_traverse_plan()
+        if table is None:
+            return
+        self.plan_table = table
+        plan = table.get(self.winder_speed)
+        self.traverse_plan = plan
+        plan.restart()
+        self.left_limit_var.set(str(plan.left_limit))
+        self.set_left_limit()
+        self.right_limit_var.set(str(plan.right_limit))
+        self.set_right_limit()
+        self.push_plan_delay(plan.first_delay())
+        self.add_to_console(f"Traverse plan applied ({len(plan.layer_delays)} layer pattern)")
+    
+    def clear_traverse_plan(self):
+        self.traverse_plan = None
+        self.plan_table = None
+        self.plan_result_label.config(text="")
+    
+    def push_plan_delay(self, delay):
+        self.traverse_delay_var.set(str(delay))
+        self.set_traverse_delay()
+    
+    def plan_speed_changed(self):
+        # New winder speed: switch to the applied plan for it, same layer
+        if not self.traverse_plan:
+            return
+        layer = self.traverse_plan.layer
+        self.traverse_plan = self.plan_table.get(self.winder_speed)
+        self.traverse_plan.layer = layer
+        self.push_plan_delay(self.traverse_plan.layer_delays[layer % len(self.traverse_plan.layer_delays)])
+    
+    # End-of-coil slowdown
+    def update_decel_profile(self):
+        # Uploads a profile for the current speed and traverse delay, or
+        # turns the firmware back to its linear slowdown
+        if not self.decel_var.get():
+            if self.decel_profile and self.connected:
+                self.send_command(PROFILE_OFF)
+            self.decel_profile = None
+            self.decel_label.config(text="Linear over last 111 winds")
+            return
+        if not self.connected:
+            self.decel_label.config(text="Uploaded when the coil starts")
+            return
+        if self.decel_model is None:
+            self.decel_model = fit_model(self.run_store, self.machine_name())
+        self.decel_model.traverse_delay = self.traverse_delay
+        profile = optimal_profile(self.decel_model, self.winder_speed)
+        if profile and self.send_command(profile.command()):
+            self.decel_profile = profile
+            self.decel_label.config(text=f"Over last {profile.span} winds, ending at {profile.table[0] / 10.0:.0f}%")
+    
     def update_status(self):
+        self.loop_lag.tick()
+        
         # Update wind count display
         self.current_count_label.config(text=str(self.current_wind_count))
         
+        # Update link throughput roughly once a second
+        if self.serial_reader and time.monotonic() - self.serial_reader.meter.last_time >= 1.0:
+            lines_per_sec, bytes_per_sec = self.serial_reader.meter.sample()
+            self.link_rate_label.config(text=f"{lines_per_sec:.0f} lines/s, {bytes_per_sec:.0f} B/s")
+            if self.command_pipeline and self.command_pipeline.overall.total:
+                overall = self.command_pipeline.overall
+                self.command_rtt_label.config(
+                    text=f"mean {overall.mean():.0f} ms, p95 <= {overall.percentile(95):.0f} ms")
+        
         # Update progress bar
         if self.desired_wind_count > 0:
             progress = (self.current_wind_count / self.desired_wind_count) * 100
@@ -478,8 +1770,59 @@ class WinderControlApp:
             if self.current_wind_count >= self.desired_wind_count:
                 self.motor_status_label.config(text="COMPLETE", foreground="blue")
         
+        self.update_rate_display()
+        self.update_channel2_display()
+        
         # Schedule the next update
-        self.root.after(100, self.update_status)
+        self.loop_lag.schedule(STATUS_INTERVAL / 1000.0)
+        self.root.after(STATUS_INTERVAL, self.update_status)
+
+    def update_rate_display(self):
+        rate, rpm, commanded_rpm, _, eta = self.rate_estimator.estimate(
+            self.current_wind_count, self.desired_wind_count, self.winder_speed, self.decel_profile)
+        
+        # Between hall reports the dead-reckoned count is smoother and its
+        # ETA allows for pulses the sensor is missing
+        estimator = self.count_estimator
+        self.configure_count_estimator()
+        now = time.monotonic()
+        self.estimated_count_label.config(text=f"{estimator.estimate(now):.1f}")
+        self.hall_check_label.config(text=estimator.describe(),
+                                     foreground="red" if estimator.missed else "black")
+        if estimator.running and estimator.baseline is not None:
+            eta = estimator.finish_eta(now)
+        self.wind_rate = rate
+        self.rate_label.config(text=f"{rate:.1f} turns/s, {rpm:.0f} RPM")
+        self.commanded_rpm_label.config(text=f"{commanded_rpm:.0f} RPM")
+        if self.active_run and rate > 0 and eta != float("inf"):
+            minutes, seconds = divmod(int(eta), 60)
+            self.eta_label.config(text=f"{minutes:02d}:{seconds:02d}")
+        else:
+            self.eta_label.config(text="--:--")
+        
+        if self.active_run:
+            self.rate_series.add(time.monotonic(), rpm)
+        self.status_updates += 1
+        if self.status_updates % RATE_PLOT_EVERY == 0:
+            self.draw_rate_plot(commanded_rpm)
+    
+    def draw_rate_plot(self, commanded_rpm):
+        # Redraw cost is bounded by the decimated series length, not run length
+        times, values = self.rate_series.points()
+        if len(times) < 2:
+            return
+        top = max(max(values), commanded_rpm, 1.0) * 1.1
+        t0 = times[0]
+        span = max(times[-1] - t0, 1e-6)
+        width = RATE_PLOT_WIDTH
+        height = RATE_PLOT_HEIGHT
+        coords = []
+        for t, value in zip(times, values):
+            coords.append((t - t0) / span * width)
+            coords.append(height - value / top * height)
+        self.rate_canvas.coords(self.rate_line, *coords)
+        commanded_y = height - commanded_rpm / top * height
+        self.rate_canvas.coords(self.commanded_line, 0, commanded_y, width, commanded_y)
 
 # Create colored button styles
 def setup_styles():
@@ -488,7 +1831,23 @@ def setup_styles():
     style.configure('Red.TButton', background='red')
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Winding machine control")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve metrics and the profiler on http://127.0.0.1:PORT (0 picks a free port)")
+    parser.add_argument("--metrics-file", help="Rewrite this file with the metrics every 10 seconds")
+    parser.add_argument("--profile", action="store_true", help="Start the sampling profiler straight away")
+    parser.add_argument("--capture", help="Record the raw serial link, with timestamps, to this file")
+    parser.add_argument("--replay", help="Play a capture back instead of connecting to a winder")
+    parser.add_argument("--replay-speed", type=parse_speed, default=1.0,
+                        help="1 for real time, 10 for ten times faster, max for no waiting")
+    args = parser.parse_args()
+    
     root = tk.Tk()
     setup_styles()
     app = WinderControlApp(root)
+    app.start_metrics(args.metrics_port, args.metrics_file, args.profile)
+    if args.capture:
+        app.start_capture(args.capture)
+    if args.replay:
+        app.start_replay(args.replay, args.replay_speed)
     root.mainloop()
@@ -0,0 +1,87 @@
+"""Push a large number of console lines through ConsoleView and report frame time and peak RSS.
+
+    python benchmarks/bench_console.py --lines 1000000
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from console_buffer import ConsoleView, MESSAGE_CLASSES
+from headless import HeadlessText
+
+
+def make_text_widget():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None, HeadlessText()
+    root.withdraw()
+    return root, tk.Text(root)
+
+
+def sample_lines():
+    count = 0
+    while True:
+        count += 1
+        if count % 40 == 0:
+            yield "Traverse: Changing direction to LEFT"
+        elif count % 1000 == 0:
+            yield f"Sent: w_speed:{count}"
+        else:
+            yield f"Wind Count: {count}"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Console append benchmark")
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--per-frame", type=int, default=500,
+                        help="Lines arriving between two flushes")
+    parser.add_argument("--capacity", type=int, default=5000)
+    args = parser.parse_args()
+
+    root, text = make_text_widget()
+    view = ConsoleView(text, args.capacity)
+    source = sample_lines()
+
+    frame_times = []
+    start = time.perf_counter()
+    pushed = 0
+    while pushed < args.lines:
+        for _ in range(min(args.per_frame, args.lines - pushed)):
+            view.append(next(source))
+        pushed += args.per_frame
+        frame_start = time.perf_counter()
+        view.flush()
+        if root:
+            root.update_idletasks()
+        frame_times.append((time.perf_counter() - frame_start) * 1000.0)
+    elapsed = time.perf_counter() - start
+
+    filter_start = time.perf_counter()
+    view.set_filter([cls for cls in MESSAGE_CLASSES if cls != "telemetry"])
+    filter_time = (time.perf_counter() - filter_start) * 1000.0
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print(f"Widget: {'tk.Text' if root else 'headless stand-in'}")
+    print(f"Lines: {args.lines} in {elapsed:.2f}s ({args.lines / elapsed:.0f} lines/s)")
+    print(f"Frame time: p50 {percentile(frame_times, 50):.3f} ms, "
+          f"p99 {percentile(frame_times, 99):.3f} ms, max {max(frame_times):.3f} ms")
+    print(f"Filter switch: {filter_time:.2f} ms")
+    print(f"Peak RSS: {peak_rss_mb:.1f} MB")
+
+    if root:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
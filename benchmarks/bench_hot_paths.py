@@ -0,0 +1,464 @@
+"""Regression suite for the controller's hot paths, checked against saved baselines.
+
+    python benchmarks/bench_hot_paths.py                 # run and compare with baselines.json
+    python benchmarks/bench_hot_paths.py --update        # record new baselines
+    python benchmarks/bench_hot_paths.py --only parse console --output results.json
+
+Everything runs headless: the GUI gets stand-in widgets (--tk uses real
+Tk if there is a display) and a FakeSerial that answers like the sketch.
+The cases are:
+
+    parse     SerialLineReader, the parsing done for monitor_serial, on text
+              lines and on binary frames
+    console   add_to_console and the per-frame flush to the widget
+    commands  send_command for a burst of commands, and their round trips
+    status    one update_status pass during a coil
+    shift     an 8-hour shift of back-to-back coils, replayed as fast as
+              the app can take it, through the reader thread, the command
+              pipeline, run recording and every Tk callback
+
+Times are scaled by a fixed pure-Python calibration loop, so a baseline
+recorded on one PC still means something on a slower one. The per-item
+costs are timed against a short calibration run just before each repeat
+and the median of those ratios is kept, so a busy spell that slows both
+cancels out. A metric regresses when it is worse than baseline x
+(1 + threshold) + slack; the thresholds and slack live in the baselines
+file and can be edited there.
+The exit status is 1 if anything regressed or a correctness check failed.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from headless import load_app, run_frame, settle
+
+from command_pipeline import RESULT_ACK, RESULT_NACK, RESULT_TIMEOUT
+from console_buffer import MESSAGE_CLASSES
+from metrics import resident_bytes
+from rate_estimator import slowdown_factor, STEPS_PER_REVOLUTION
+from serial_reader import SerialLineReader
+from telemetry import encode_frame
+from traverse_planner import steps_per_sec_for
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+CASES = ["parse", "console", "commands", "status", "shift"]
+
+# Metric -> (description, threshold, slack, scaled by the calibration).
+# Lower is better for all of them.
+METRICS = {
+    "parse_text_us_per_line": ("Reader cost per text line", 0.3, 0.5, True),
+    "parse_binary_us_per_frame": ("Reader cost per binary frame", 0.3, 0.5, True),
+    "console_us_per_line": ("add_to_console plus flush, per line", 0.3, 0.1, True),
+    "console_flush_p99_ms": ("Console flush per frame, p99", 0.5, 0.05, True),
+    "send_command_p99_us": ("send_command on the Tk thread, p99", 0.5, 5.0, True),
+    "command_burst_ms": ("Time for a burst to be written and acknowledged", 0.5, 20.0, True),
+    "command_rtt_p95_ms": ("Write to acknowledgement, p95", 0.5, 1.0, True),
+    "update_status_p50_us": ("update_status, p50", 0.3, 10.0, True),
+    "update_status_p99_us": ("update_status, p99", 0.5, 20.0, True),
+    "shift_us_per_line": ("Shift replay wall time per line received", 0.3, 0.0, True),
+    "shift_frame_p99_ms": ("Shift replay Tk frame, p99", 0.5, 0.5, True),
+    "shift_rss_growth_mb": ("Resident memory growth over the shift", 0.5, 16.0, False),
+}
+
+# Metrics the cases return per second of calibration (see relative());
+# main() turns them back into times at this run's calibration
+RELATIVE_METRICS = ["parse_text_us_per_line", "parse_binary_us_per_frame", "console_us_per_line",
+                    "update_status_p50_us"]
+
+# Calibration runs before each repeat of a relative metric
+REPEAT_CALIBRATION_RUNS = 5
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+def calibrate(runs=40):
+    # Seconds for a fixed pure-Python loop, best of many short runs so a
+    # busy moment doesn't skew it
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        total = 0
+        for i in range(50000):
+            total += len(str(i))
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def relative(measure):
+    # One repeat of a relative metric: its result over a calibration run
+    # taken just before it
+    calibration = calibrate(REPEAT_CALIBRATION_RUNS)
+    return measure() / calibration
+
+
+# Firmware output
+def coil_output(target, winder_speed=150000, traverse_delay=500, left_limit=0, right_limit=6400):
+    # One simulated second of text telemetry at a time for a coil, as the
+    # sketch prints it: every fifth wind, the status line once a second and
+    # the traverse reversals
+    full_speed = winder_speed / float(STEPS_PER_REVOLUTION)
+    traverse_speed = steps_per_sec_for(traverse_delay)
+    turns = 0.0
+    count = 0
+    position = float(left_limit)
+    moving_right = True
+    while count < target:
+        lines = []
+        for _ in range(100):
+            turns += full_speed * slowdown_factor(target - count) * 0.01
+            position += traverse_speed * 0.01 if moving_right else -traverse_speed * 0.01
+            if moving_right and position >= right_limit:
+                position = float(right_limit)
+                moving_right = False
+                lines.append("Traverse: Changing direction to LEFT")
+            elif not moving_right and position <= left_limit:
+                position = float(left_limit)
+                moving_right = True
+                lines.append("Traverse: Changing direction to RIGHT")
+            while count + 1 <= turns and count < target:
+                count += 1
+                if count % 5 == 0 or count < 10:
+                    lines.append(f"Wind Count: {count}")
+            if count >= target:
+                lines.append("All motors stopped and disabled.")
+                lines.append(f"Target wind count reached: {count}")
+                break
+        lines.append(f"Current Wind Count: {count}")
+        yield "".join(line + "\r\n" for line in lines).encode("utf-8")
+
+
+def text_stream(lines):
+    data = bytearray()
+    while True:
+        for chunk in coil_output(5000):
+            data += chunk
+            if data.count(b"\n") >= lines:
+                return bytes(data)
+
+
+def binary_stream(frames):
+    data = bytearray()
+    for i in range(frames):
+        data += encode_frame(i, i * 21, 150000, i % 6400)
+        if i % 200 == 0:
+            data += b"Traverse: Changing direction to LEFT\r\n"
+    return bytes(data)
+
+
+# Cases
+def feed_reader(data, frames, chunk_size=4096):
+    reader = SerialLineReader(None, max_events=0)
+    reader.enable_frames(frames)
+    started = time.perf_counter()
+    for i in range(0, len(data), chunk_size):
+        reader.feed(data[i:i + chunk_size])
+    return (time.perf_counter() - started) / reader.meter.lines * 1e6
+
+
+def bench_parse(args):
+    text = text_stream(args.lines)
+    binary = binary_stream(args.lines)
+    text_ratios = []
+    binary_ratios = []
+    for _ in range(args.repeat):
+        # Interleaved, so both see the same spells of load
+        text_ratios.append(relative(lambda: feed_reader(text, False)))
+        binary_ratios.append(relative(lambda: feed_reader(binary, True)))
+    return {
+        "parse_text_us_per_line": statistics.median(text_ratios),
+        "parse_binary_us_per_frame": statistics.median(binary_ratios),
+    }, []
+
+
+def bench_console(args, app, root, port):
+    lines = text_stream(args.lines).decode("utf-8").splitlines()
+    per_line = []
+    flush_p99s = []
+
+    def push_lines():
+        flush_times = []
+        started = time.perf_counter()
+        for i in range(0, len(lines), 500):
+            for line in lines[i:i + 500]:
+                app.add_to_console(line)
+            flush_started = time.perf_counter()
+            app.console_view.flush()
+            flush_times.append((time.perf_counter() - flush_started) * 1000.0)
+        elapsed = time.perf_counter() - started
+        # Per repeat, so one busy spell can't decide the result
+        flush_p99s.append(percentile(flush_times, 99))
+        return elapsed / len(lines) * 1e6
+
+    for _ in range(args.repeat):
+        per_line.append(relative(push_lines))
+    checks = []
+    if len(app.console_view.buffer) > app.console_view.buffer.capacity * len(MESSAGE_CLASSES):
+        checks.append("console history grew past its capacity")
+    return {
+        "console_us_per_line": statistics.median(per_line),
+        "console_flush_p99_ms": statistics.median(flush_p99s),
+    }, checks
+
+
+def bench_commands(args, app, root, port):
+    settle(app, root, port)
+    pipeline = app.command_pipeline
+    submit_times = []
+    bursts = []
+    round_trips = []
+    checks = []
+    for _ in range(args.repeat):
+        # Slider drags (coalesced setpoints) mixed with one-off commands
+        commands = []
+        for i in range(args.burst):
+            commands.append(["t_home", f"w_speed:{100000 + i}", "T", f"t_speed:{400 + i % 200}"][i % 4])
+        started = time.perf_counter()
+        for command in commands:
+            submit_started = time.perf_counter()
+            app.send_command(command)
+            submit_times.append((time.perf_counter() - submit_started) * 1e6)
+        # Results are read here rather than by the Tk callbacks so the
+        # burst is timed on its own
+        finished = 0
+        deadline = time.monotonic() + 30.0
+        while time.monotonic() < deadline:
+            while not pipeline.results.empty():
+                kind, command, detail, latency_ms = pipeline.results.get_nowait()
+                if kind == RESULT_ACK:
+                    round_trips.append(latency_ms)
+                    finished += 1
+                elif kind in (RESULT_NACK, RESULT_TIMEOUT):
+                    finished += 1
+                    checks.append(f"'{command}' got {kind}")
+            if not pipeline.pending and pipeline.in_flight is None and pipeline.results.empty():
+                break
+            time.sleep(0.0005)
+        bursts.append((time.perf_counter() - started) * 1000.0)
+        if finished < args.burst // 2:
+            checks.append(f"only {finished} of {args.burst} commands were answered")
+        settle(app, root, port)
+    return {
+        "send_command_p99_us": percentile(submit_times, 99),
+        "command_burst_ms": min(bursts),
+        "command_rtt_p95_ms": percentile(round_trips, 95),
+    }, checks
+
+
+def bench_status(args, app, root, port):
+    settle(app, root, port)
+    app.desired_wind_count = 1000000
+    app.record_command("S")
+    app.handle_command_ack("S")
+    # The re-arm is left out so the loop doesn't queue copies of itself
+    rearmed = []
+    app.root.after = lambda delay, callback, *more: rearmed.append(callback)
+    times = []
+    medians = []
+    count = 0
+
+    def update_pass():
+        nonlocal count
+        pass_times = []
+        for _ in range(args.updates):
+            count += 5
+            app.handle_count(count)
+            started = time.perf_counter()
+            app.update_status()
+            pass_times.append((time.perf_counter() - started) * 1e6)
+        times.extend(pass_times)
+        return percentile(pass_times, 50)
+
+    try:
+        for _ in range(args.repeat):
+            medians.append(relative(update_pass))
+    finally:
+        del app.root.after
+    app.end_run(completed=False)
+    checks = []
+    if app.current_count_label.cget("text") != str(count):
+        checks.append("update_status showed the wrong count")
+    return {
+        "update_status_p50_us": statistics.median(medians),
+        "update_status_p99_us": percentile(times, 99),
+    }, checks
+
+
+def bench_shift(args, app, root, port):
+    # Coils back to back, with a pause between them for the operator
+    settle(app, root, port)
+    target = args.coil_turns
+    frame_times = []
+    lines_before = app.serial_reader.meter.lines
+    memory_before = resident_bytes() or 0
+    simulated = 0
+    coils = 0
+    checks = []
+    started = time.perf_counter()
+    while simulated < args.shift_hours * 3600:
+        app.reset_counter()
+        app.desired_wind_count = target
+        app.send_command(f"N{target}")
+        app.start_motors()
+        settle(app, root, port, frame_times=frame_times)
+        for chunk in coil_output(target):
+            port.feed(chunk)
+            settle(app, root, port, frame_times=frame_times)
+            simulated += 1
+        coils += 1
+        if app.current_wind_count != target:
+            checks.append(f"coil {coils} ended at {app.current_wind_count} turns")
+        for _ in range(args.changeover):
+            port.feed(f"Current Wind Count: {target}\r\n".encode("utf-8"))
+            settle(app, root, port, frame_times=frame_times)
+            simulated += 1
+    elapsed = time.perf_counter() - started
+    run_frame(root)
+    memory_after = resident_bytes() or 0
+    lines = app.serial_reader.meter.lines - lines_before
+
+    completed = len(app.run_store.find_runs(completed=True))
+    if completed != coils:
+        checks.append(f"{completed} runs recorded as complete out of {coils} coils")
+    if app.console_view.widget_lines > app.console_view.buffer.capacity:
+        checks.append(f"console widget holds {app.console_view.widget_lines} lines")
+    print(f"Shift: {coils} coils, {simulated / 3600.0:.1f} h of output, {lines} lines in {elapsed:.1f} s "
+          f"({simulated / elapsed:.0f}x real time), {len(frame_times)} frames, "
+          f"max frame {max(frame_times):.1f} ms")
+    return {
+        "shift_us_per_line": elapsed / lines * 1e6,
+        "shift_frame_p99_ms": percentile(frame_times, 99),
+        "shift_rss_growth_mb": max(memory_after - memory_before, 0) / 1e6,
+    }, checks
+
+
+# Baselines
+def load_baselines(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def machine_info(calibration):
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calibration_s": calibration,
+    }
+
+
+def compare(results, baselines, calibration):
+    # Returns [(name, baseline, limit, value, status)]
+    rows = []
+    metrics = baselines["metrics"] if baselines else {}
+    scale = calibration / baselines["machine"]["calibration_s"] if baselines else 1.0
+    for name, value in results.items():
+        entry = metrics.get(name)
+        if entry is None:
+            rows.append((name, None, None, value, "new"))
+            continue
+        _, _, _, scaled = METRICS[name]
+        baseline = entry["value"] * (scale if scaled else 1.0)
+        limit = baseline * (1.0 + entry["threshold"]) + entry["slack"]
+        rows.append((name, baseline, limit, value, "REGRESSED" if value > limit else "ok"))
+    return rows
+
+
+def save_baselines(path, results, old, calibration):
+    metrics = dict(old["metrics"]) if old else {}
+    for name, value in results.items():
+        _, threshold, slack, _ = METRICS[name]
+        entry = metrics.get(name, {"threshold": threshold, "slack": slack})
+        metrics[name] = {"value": round(value, 4), "threshold": entry["threshold"], "slack": entry["slack"]}
+    data = {
+        "recorded": time.strftime("%Y-%m-%d"),
+        "machine": machine_info(calibration),
+        "metrics": dict(sorted(metrics.items())),
+    }
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    os.replace(temp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path benchmarks with regression thresholds")
+    parser.add_argument("--only", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--baselines", default=DEFAULT_BASELINES)
+    parser.add_argument("--update", action="store_true", help="Save the results as the new baselines")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--tk", action="store_true", help="Use real Tk widgets when a display is available")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lines", type=int, default=100000, help="Lines for the parse and console cases")
+    parser.add_argument("--burst", type=int, default=200, help="Commands per burst")
+    parser.add_argument("--updates", type=int, default=2000, help="update_status calls per repeat")
+    parser.add_argument("--shift-hours", type=float, default=8.0)
+    parser.add_argument("--coil-turns", type=int, default=5000)
+    parser.add_argument("--changeover", type=int, default=10, help="Seconds between coils")
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    results = {}
+    checks = []
+    home = tempfile.mkdtemp(prefix="winder-bench-")
+    if "parse" in args.only:
+        values, failed = bench_parse(args)
+        results.update(values)
+        checks += [f"parse: {text}" for text in failed]
+    for case, bench in [("console", bench_console), ("commands", bench_commands),
+                        ("status", bench_status), ("shift", bench_shift)]:
+        if case not in args.only:
+            continue
+        # A fresh app for each case, so one can't slow down the next
+        app, root, port = load_app(real_tk=args.tk, home=home)
+        try:
+            values, failed = bench(args, app, root, port)
+        finally:
+            app.on_close()
+        results.update(values)
+        checks += [f"{case}: {text}" for text in failed]
+    shutil.rmtree(home, ignore_errors=True)
+    # Calibrated again at the end, keeping the faster, in case something
+    # else was busy at the start
+    calibration = min(calibration, calibrate())
+    for name in RELATIVE_METRICS:
+        if name in results:
+            results[name] *= calibration
+
+    baselines = load_baselines(args.baselines)
+    rows = compare(results, None if args.update else baselines, calibration)
+    print(f"Calibration: {calibration * 1000:.1f} ms"
+          + (f" (baseline {baselines['machine']['calibration_s'] * 1000:.1f} ms)" if baselines else ""))
+    print(f"{'metric':<28} {'baseline':>10} {'limit':>10} {'result':>10}  status")
+    for name, baseline, limit, value, status in rows:
+        baseline_text = f"{baseline:>10.3f}" if baseline is not None else f"{'-':>10}"
+        limit_text = f"{limit:>10.3f}" if limit is not None else f"{'-':>10}"
+        print(f"{name:<28} {baseline_text} {limit_text} {value:>10.3f}  {status}")
+    for text in checks:
+        print(f"FAILED {text}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": machine_info(calibration), "metrics": results, "failed_checks": checks},
+                      f, indent=2)
+            f.write("\n")
+    if args.update:
+        save_baselines(args.baselines, results, baselines, calibration)
+        print(f"Baselines saved to {args.baselines}")
+        return 1 if checks else 0
+    return 1 if checks or any(row[4] == "REGRESSED" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Per-port command latency and I/O thread CPU for the multi-winder mux as the port count grows.
+
+    python benchmarks/bench_multi_winder.py --ports 1 2 4 8 16 --rounds 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_winder import SerialMux, start_simulators
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+
+def run(count, rounds, firehose):
+    sim_process, ports = start_simulators(count, firehose=firehose)
+    mux = SerialMux(ports).start()
+    try:
+        time.sleep(0.5)
+        cpu_start = mux.cpu_time
+        wall_start = time.monotonic()
+        everyone = list(range(count))
+        for i in range(rounds):
+            mux.send(everyone, f"w_speed:{100000 + i}")
+            deadline = time.monotonic() + 2.0
+            while time.monotonic() < deadline:
+                if all(len(s.latencies) > i or not s.connected for s in mux.sessions):
+                    break
+                time.sleep(0.001)
+        wall = time.monotonic() - wall_start
+        cpu = mux.cpu_time - cpu_start
+        latencies = [lat * 1000.0 for s in mux.sessions for lat in s.latencies]
+        lost = count * rounds - len(latencies)
+    finally:
+        mux.stop()
+        sim_process.terminate()
+        sim_process.wait()
+    return latencies, lost, cpu / wall * 100.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-winder mux scaling benchmark")
+    parser.add_argument("--ports", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--firehose", action="store_true",
+                        help="Have every virtual winder stream telemetry at full link rate")
+    args = parser.parse_args()
+
+    print(f"{'ports':>5} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'lost':>5} {'I/O CPU %':>10}")
+    for count in args.ports:
+        latencies, lost, cpu_percent = run(count, args.rounds, args.firehose)
+        print(f"{count:>5} {percentile(latencies, 50):>8.2f} {percentile(latencies, 99):>8.2f} "
+              f"{max(latencies):>8.2f} {lost:>5} {cpu_percent:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
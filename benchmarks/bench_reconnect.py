@@ -0,0 +1,110 @@
+"""Reconnect and resync time after injected serial faults, and whether the coil still comes out right.
+
+Each trial winds a coil on a virtual winder through a supervised
+WinderClient, injects one fault part way through and checks afterwards
+that the device got its setpoints back and the bobbin got its target.
+Then it resets the counter and winds a second coil, which must get its
+own target whatever count was carried over from the first. The exit
+status is 1 if any coil came out wrong.
+
+    python benchmarks/bench_reconnect.py --faults drop brownout hang --trials 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from winder_sim import VirtualWinder, FAULTS, FAULT_DROP
+from winder_client import WinderClient, WinderError, STATUS_COMPLETE
+
+# Setpoints that differ from the firmware defaults, so a resync is visible
+SETPOINTS = {
+    "winder_speed": 200000,
+    "traverse_delay": 400,
+    "left_limit": 100,
+    "right_limit": 6000,
+}
+
+
+def trial(kind, turns, next_turns, fault_at, outage, link_path):
+    sim = VirtualWinder(link_path=link_path)
+    sim.fault_outage = outage
+    sim.start()
+    client = WinderClient(sim.port, supervise=True, resume=True)
+    try:
+        client.connect()
+        client.set_wind_count(turns)
+        client.set_winder_speed(SETPOINTS["winder_speed"])
+        client.set_traverse_delay(SETPOINTS["traverse_delay"])
+        client.set_left_limit(SETPOINTS["left_limit"])
+        client.set_right_limit(SETPOINTS["right_limit"])
+        client.start_motors()
+        time.sleep(fault_at)
+        sim.inject_fault(kind)
+        try:
+            status = client.wait_until_done(timeout=120)
+        except WinderError as e:
+            status = str(e)
+
+        supervisor = client.supervisor
+        setpoints_ok = (sim.winder_speed == SETPOINTS["winder_speed"]
+                        and sim.traverse_step_delay == SETPOINTS["traverse_delay"]
+                        and sim.left_limit == SETPOINTS["left_limit"]
+                        and sim.right_limit == SETPOINTS["right_limit"])
+        turn_error = sim.bobbin_turns - turns
+        count_error = client.wind_count - sim.bobbin_turns
+
+        # The next coil, set up the way the GUI's job queue does it
+        wound = sim.bobbin_turns
+        client.set_wind_count(next_turns)
+        client.reset_counter()
+        client.start_motors()
+        try:
+            client.wait_until_done(timeout=120)
+        except WinderError:
+            pass
+        return {
+            "status": status,
+            "reconnect": supervisor.last_reconnect_time if kind == FAULT_DROP or supervisor.reconnects else 0.0,
+            "resync": supervisor.last_resync_time,
+            "setpoints_ok": setpoints_ok,
+            "turn_error": turn_error,
+            "count_error": count_error,
+            "next_error": sim.bobbin_turns - wound - next_turns,
+        }
+    finally:
+        client.close()
+        sim.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconnect and resync after injected serial faults")
+    parser.add_argument("--faults", nargs="+", choices=FAULTS, default=list(FAULTS))
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=600)
+    parser.add_argument("--next-turns", type=int, default=200, help="Turns for the coil after the fault")
+    parser.add_argument("--fault-at", type=float, default=4.0, help="Seconds after START to inject the fault")
+    parser.add_argument("--outage", type=float, default=2.0, help="Seconds a dropped link stays down")
+    args = parser.parse_args()
+
+    link_path = os.path.join(tempfile.mkdtemp(), "winder")
+    failed = False
+    print(f"{'fault':>9} {'status':>9} {'reconnect s':>12} {'resync s':>9} {'setpoints':>10} "
+          f"{'turn err':>9} {'count err':>10} {'next err':>9}")
+    for kind in args.faults:
+        for _ in range(args.trials):
+            result = trial(kind, args.turns, args.next_turns, args.fault_at, args.outage, link_path)
+            print(f"{kind:>9} {result['status']:>9} {result['reconnect']:>12.2f} {result['resync']:>9.2f} "
+                  f"{'ok' if result['setpoints_ok'] else 'WRONG':>10} {result['turn_error']:>9} "
+                  f"{result['count_error']:>10} {result['next_error']:>9}")
+            failed |= (result["status"] != STATUS_COMPLETE or not result["setpoints_ok"]
+                       or any(result[key] for key in ("turn_error", "count_error", "next_error")))
+    os.rmdir(os.path.dirname(link_path))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
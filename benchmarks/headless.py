@@ -0,0 +1,303 @@
+"""Stand-ins for Tk and the serial port, so benchmarks can drive the real GUI without a display or a winder.
+
+    app, root, port = load_app()
+    port.feed(b"Wind Count: 5\\r\\n")
+    run_frame(root)
+
+load_app() builds a WinderControlApp from 4_Motor_Pickup_Winder_GUI.py
+with stand-in widgets (or real Tk when asked and a display is available)
+and connects it to a FakeSerial. The fake port answers each command with
+the same reply lines as the sketch, so the command pipeline, the reader
+thread and the Tk callbacks all run as they do against hardware.
+"""
+import heapq
+import importlib.util
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+import tkinter as tk
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_PATH = os.path.join(REPO_DIR, "4_Motor_Pickup_Winder_GUI.py")
+sys.path.insert(0, REPO_DIR)
+
+from channels import CHANNELS, channel_prefix, split_channel
+
+
+class HeadlessText:
+    # Stand-in for tk.Text when no display is available; keeps the lines so
+    # memory use is still representative
+    def __init__(self, *args, **kwargs):
+        self.lines = []
+
+    def config(self, **kwargs):
+        pass
+
+    configure = config
+
+    def insert(self, index, text):
+        self.lines.extend(text.splitlines())
+
+    def delete(self, start, end):
+        if end == tk.END:
+            self.lines.clear()
+        else:
+            del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+    def pack(self, **kwargs):
+        pass
+
+    def yview(self, *args):
+        pass
+
+
+class HeadlessWidget:
+    # Any ttk widget or Tk variable. Options are kept so benchmarks can read
+    # labels back; every other method does nothing.
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+        self.value = kwargs.get("value")
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+
+    configure = config
+
+    def cget(self, key):
+        return self.options.get(key)
+
+    def __getitem__(self, key):
+        return self.options.get(key)
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def get(self, *args):
+        return self.value if self.value is not None else ""
+
+    def set(self, value):
+        self.value = value
+
+
+class HeadlessRoot(HeadlessWidget):
+    # after() callbacks are queued by due time. run_due() runs the ones that
+    # are due, like Tk's event loop; tick() runs everything queued once,
+    # ignoring delays, for replays that compress time.
+    def __init__(self):
+        super().__init__()
+        self.pending = []
+        self.sequence = itertools.count()
+
+    def after(self, delay_ms, callback, *args):
+        entry = (time.monotonic() + delay_ms / 1000.0, next(self.sequence), callback, args)
+        heapq.heappush(self.pending, entry)
+        return entry[1]
+
+    def after_cancel(self, after_id):
+        self.pending = [entry for entry in self.pending if entry[1] != after_id]
+        heapq.heapify(self.pending)
+
+    def run_due(self):
+        now = time.monotonic()
+        while self.pending and self.pending[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self.pending)
+            callback(*args)
+
+    def tick(self):
+        batch, self.pending = self.pending, []
+        for _, _, callback, args in sorted(batch):
+            callback(*args)
+
+    def update(self):
+        self.run_due()
+
+    def destroy(self):
+        self.pending = []
+
+
+def headless_module(real, overrides):
+    # Module namespace that hands out stand-ins for the widget classes and the
+    # real thing for constants such as tk.END
+    module = types.ModuleType(real.__name__)
+    for name in dir(real):
+        value = getattr(real, name)
+        if name in overrides:
+            value = overrides[name]
+        elif isinstance(value, type) and name[0].isupper():
+            value = HeadlessWidget
+        setattr(module, name, value)
+    return module
+
+
+def firmware_reply(command, binary_telemetry=False):
+    # Lines the sketch prints for each command, from processCommand(). A
+    # channel 2 command gets channel 1's reply with the channel's prefix.
+    channel, rest = split_channel(command)
+    if rest != command and channel in CHANNELS:
+        if rest == "disable_all_motors" or rest.startswith("telemetry:"):
+            return [f"{channel_prefix(channel)}Unknown command: {rest}"]
+        return [channel_prefix(channel) + line for line in firmware_reply(rest)]
+    if command == "S":
+        return ["Starting traverse motors first...", "Traverse motors running, now starting winder motors...",
+                "All motors running"]
+    if command == "T":
+        return ["All motors stopped and disabled."]
+    if command == "R":
+        return ["Wind count reset to 0.", "Current wind count: 0", "Hall sensor current state: HIGH"]
+    if command == "disable_all_motors":
+        return ["All motors disabled."]
+    if command == "t_home":
+        return ["Traverse position reset to home (0)"]
+    if command == "telemetry:bin" and binary_telemetry:
+        return ["Telemetry mode: binary"]
+    if command == "telemetry:text":
+        return ["Telemetry mode: text"]
+    if command == "decel:off":
+        return ["Deceleration profile off"]
+    if command.startswith("decel:"):
+        return [f"Deceleration profile set: {len(command.split(',')) - 1} points over "
+                f"{command[6:].split(',')[0]} winds"]
+    if command.startswith("w_speed:"):
+        return [f"Winder speed set to {command[8:]} Hz"]
+    if command.startswith("t_speed:"):
+        return [f"Traverse step delay set to {command[8:]} microseconds"]
+    if command.startswith("t_leftlimit:"):
+        return [f"Left sweep limit set to {command[12:]}"]
+    if command.startswith("t_rightlimit:"):
+        return [f"Right sweep limit set to: {command[13:]}"]
+    if command.startswith("N"):
+        return [f"Desired wind count set to {command[1:]}"]
+    return [f"Unknown command: {command}"]
+
+
+class FakeSerial:
+    # In-memory port with the parts of pyserial's Serial the GUI uses. Bytes
+    # written are answered by reply(command), which returns a list of lines;
+    # feed() queues device output directly.
+    def __init__(self, reply=firmware_reply, timeout=0.05):
+        self.reply = reply
+        self.timeout = timeout
+        self.input = bytearray()
+        self.written = bytearray()
+        self.condition = threading.Condition()
+        self.is_open = True
+        self.bytes_fed = 0
+        self.commands = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.input)
+
+    def feed(self, data):
+        with self.condition:
+            self.input += data
+            self.bytes_fed += len(data)
+            self.condition.notify_all()
+
+    def read(self, size=1):
+        with self.condition:
+            if not self.input and self.is_open:
+                self.condition.wait(self.timeout)
+            data = bytes(self.input[:size])
+            del self.input[:size]
+            return data
+
+    def write(self, data):
+        self.written += data
+        newline = self.written.find(b"\n")
+        while newline >= 0:
+            command = self.written[:newline].decode("utf-8", "replace").strip()
+            del self.written[:newline + 1]
+            self.commands += 1
+            if self.reply and command:
+                self.feed("".join(line + "\r\n" for line in self.reply(command)).encode("utf-8"))
+            newline = self.written.find(b"\n")
+        return len(data)
+
+    def close(self):
+        with self.condition:
+            self.is_open = False
+            self.condition.notify_all()
+
+
+def load_app(real_tk=False, home=None, port=None):
+    # Returns (app, root, port). The GUI keeps its run history, recipes and
+    # last port under ~/.pickup_winder, so HOME points at a scratch
+    # directory; this has to happen before the GUI's modules are imported.
+    os.environ["HOME"] = home or tempfile.mkdtemp(prefix="winder-bench-")
+    spec = importlib.util.spec_from_file_location("winder_gui", GUI_PATH)
+    gui = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gui)
+
+    root = None
+    if real_tk:
+        try:
+            root = tk.Tk()
+            root.withdraw()
+        except tk.TclError:
+            root = None
+    if root is None:
+        gui.tk = headless_module(tk, {"Text": HeadlessText})
+        gui.ttk = headless_module(gui.ttk, {})
+        gui.messagebox = types.SimpleNamespace(showinfo=lambda *args: None, showerror=lambda *args: None,
+                                               askyesno=lambda *args: True, askokcancel=lambda *args: True)
+        root = HeadlessRoot()
+
+    port = port or FakeSerial()
+    gui.serial = types.SimpleNamespace(Serial=lambda *args, **kwargs: port)
+    app = gui.WinderControlApp(root)
+    # Port enumeration would only add noise
+    app.port_watcher.stop()
+    app.connect_serial("fake", interactive=False)
+    return app, root, port
+
+
+def run_frame(root):
+    # One pass of the Tk loop: every queued callback once on the stand-in,
+    # whatever is due on real Tk
+    if isinstance(root, HeadlessRoot):
+        root.tick()
+    else:
+        root.update()
+
+
+def settle(app, root, port, timeout=10.0, frame_times=None):
+    # Runs frames until the reader has taken every byte, the Tk side has
+    # drained every event and no command is waiting for its reply. Each
+    # frame's duration in ms is appended to frame_times if one is given.
+    deadline = time.monotonic() + timeout
+    idle_checks = 0
+    while time.monotonic() < deadline:
+        reader = app.serial_reader
+        pipeline = app.command_pipeline
+        waiting = not reader.events.empty() or not pipeline.results.empty()
+        if not waiting:
+            # The reader counts a chunk's bytes before it parses them, so
+            # idle only counts once it has been seen twice
+            if (not port.input and reader.meter.bytes >= port.bytes_fed
+                    and not pipeline.pending and pipeline.in_flight is None):
+                idle_checks += 1
+                if idle_checks >= 2:
+                    return True
+            else:
+                idle_checks = 0
+            # Nothing for the Tk side yet; let the reader and writer threads run
+            time.sleep(0.0002)
+            continue
+        idle_checks = 0
+        started = time.perf_counter()
+        run_frame(root)
+        if frame_times is not None:
+            frame_times.append((time.perf_counter() - started) * 1000.0)
+    return False
+
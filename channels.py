@@ -0,0 +1,107 @@
+"""Channel addressing for winding two coils at once, and host-side state for a channel.
+
+The firmware drives two independent channels: channel 1 is Winder 1 and
+Traverse 1 with the hall sensor on GPIO 34, channel 2 is Winder 2 and
+Traverse 2 with its own hall sensor on GPIO 35. Each has its own count,
+target, speed, traverse limits and slowdown, and finishes on its own.
+
+A command for channel 2 is prefixed "2:", and so is every line the
+firmware prints about it:
+
+    2:N6500           ->  2:Desired wind count set to 6500
+    2:S               ->  2:Starting traverse motors first...
+                          2:Traverse motors running, now starting winder motors...
+                          2:All motors running
+                          2:Wind Count: 5
+                          2:Target wind count reached: 6500
+
+Channel 1 commands and replies have no prefix, so hosts that only know one
+channel work unchanged; channel 2 stays silent until it is first addressed.
+Binary telemetry frames carry channel 1 only; channel 2 reports in text.
+disable_all_motors and telemetry:* apply to the whole board.
+"""
+from link_supervisor import setpoint_commands
+
+CHANNELS = (1, 2)
+PRIMARY_CHANNEL = 1
+
+# Host-side motor states, as shown by the GUI
+STATUS_STOPPED = "STOPPED"
+STATUS_STARTING = "STARTING"
+STATUS_RUNNING = "RUNNING"
+STATUS_STOPPING = "STOPPING"
+STATUS_COMPLETE = "COMPLETE"
+STATUS_DISABLED = "DISABLED"
+
+
+def channel_prefix(channel):
+    return "" if channel == PRIMARY_CHANNEL else f"{channel}:"
+
+
+def channel_command(channel, command):
+    return channel_prefix(channel) + command
+
+
+def split_channel(text):
+    # "2:Wind Count: 5" -> (2, "Wind Count: 5"); unprefixed text is channel 1
+    if len(text) > 2 and text[1] == ":" and text[0].isdigit():
+        return int(text[0]), text[2:]
+    return PRIMARY_CHANNEL, text
+
+
+class ChannelState:
+    # What the host holds for one channel: the setpoints it sent and the
+    # count and motor state the firmware reported. Tk-free; the GUI feeds
+    # it the channel's lines with the prefix removed.
+    def __init__(self, channel, desired_wind_count=1000, winder_speed=150000, traverse_delay=500,
+                 left_limit=0, right_limit=6400):
+        self.channel = channel
+        self.desired_wind_count = desired_wind_count
+        self.winder_speed = winder_speed
+        self.traverse_delay = traverse_delay
+        self.left_limit = left_limit
+        self.right_limit = right_limit
+        self.wind_count = 0
+        self.status = STATUS_STOPPED
+        # Set by the first command; until then the firmware says nothing
+        # about the channel and there is nothing to restore after a restart
+        self.used = False
+
+    def command(self, command):
+        self.used = True
+        return channel_command(self.channel, command)
+
+    def setpoint_commands(self):
+        return [channel_command(self.channel, command)
+                for command in setpoint_commands(self.desired_wind_count, self.winder_speed, self.traverse_delay,
+                                                 self.left_limit, self.right_limit)]
+
+    @property
+    def progress(self):
+        # Percent of the target wound, capped at 100
+        if self.desired_wind_count <= 0:
+            return 0.0
+        return min(self.wind_count * 100.0 / self.desired_wind_count, 100.0)
+
+    def handle_line(self, line):
+        # Returns True when the line says the coil is complete
+        if line == "All motors running":
+            self.status = STATUS_RUNNING
+        elif line.startswith("Starting traverse motors"):
+            self.status = STATUS_STARTING
+        elif line.startswith("All motors stopped"):
+            self.status = STATUS_STOPPED
+        elif line.startswith("All motors disabled"):
+            self.status = STATUS_DISABLED
+        elif line.startswith("Target wind count reached"):
+            try:
+                self.wind_count = int(line.rsplit(":", 1)[1])
+            except (ValueError, IndexError):
+                pass
+            self.status = STATUS_COMPLETE
+            return True
+        elif line.startswith("Wind count reset"):
+            self.wind_count = 0
+            if self.status == STATUS_COMPLETE:
+                self.status = STATUS_STOPPED
+        return False
@@ -0,0 +1,217 @@
+"""Background command queue that waits for the firmware's reply to each command.
+
+Commands are written one at a time from a worker thread. A command counts as
+done when its acknowledgement line arrives, the firmware rejects it, or its
+timeout expires. Setpoint commands still waiting to be written are replaced
+in place by newer values, so dragging a slider sends only the latest speed;
+a value queued before another kind of command is kept, so commands never
+change order.
+
+Commands for channel 2 carry a "2:" prefix and are acknowledged by the same
+reply with the same prefix (see channels.py).
+"""
+import bisect
+import collections
+import queue
+import threading
+import time
+
+from channels import CHANNELS, channel_prefix, split_channel
+
+# Command prefix -> (reply that acknowledges it, timeout in seconds). Order
+# matters: longer prefixes must come before the single-letter commands.
+ACKS = [
+    ("w_speed:", "Winder speed set to", 1.0),
+    ("t_speed:", "Traverse step delay set to", 1.0),
+    ("t_leftlimit:", "Left sweep limit set to", 1.0),
+    ("t_rightlimit:", "Right sweep limit set to", 1.0),
+    ("t_home", "Traverse position reset", 1.0),
+    ("telemetry:", "Telemetry mode:", 1.0),
+    ("decel:", "Deceleration profile", 1.0),
+    ("disable_all_motors", "All motors disabled", 1.0),
+    ("N", "Desired wind count set to", 1.0),
+    # startMotors() blocks for over a second before it answers
+    ("S", "All motors running", 5.0),
+    ("T", "All motors stopped", 1.0),
+    ("R", "Wind count reset", 1.0),
+]
+
+# Replies that reject whatever command is in flight, on any channel
+NACK_PREFIXES = tuple(channel_prefix(channel) + reply for channel in CHANNELS
+                      for reply in ("Unknown command", "Error"))
+
+# Commands whose pending value can be replaced by a newer one
+SETPOINT_PREFIXES = ("w_speed:", "t_speed:", "t_leftlimit:", "t_rightlimit:", "decel:", "N")
+
+# Result kinds placed on the results queue
+RESULT_SENT = "sent"
+RESULT_ACK = "ack"
+RESULT_NACK = "nack"
+RESULT_TIMEOUT = "timeout"
+RESULT_ERROR = "error"
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+def expected_reply(command):
+    return ack_for(command)[0]
+
+
+def ack_for(command):
+    # The reply to a channel 2 command carries the same prefix
+    channel, command = split_channel(command)
+    for prefix, reply, timeout in ACKS:
+        if command.startswith(prefix):
+            return channel_prefix(channel) + reply, timeout
+    return None, 0.0
+
+
+def command_key(command):
+    # Commands with the same key are treated as one kind for statistics,
+    # whichever channel they went to
+    command = split_channel(command)[1]
+    for prefix, _, _ in ACKS:
+        if command.startswith(prefix):
+            return prefix
+    return command
+
+
+def setpoint_key(command):
+    # Includes the channel, so a new channel 2 target never replaces a
+    # pending channel 1 one
+    channel, command = split_channel(command)
+    for prefix in SETPOINT_PREFIXES:
+        if command.startswith(prefix):
+            return channel_prefix(channel) + prefix
+    return None
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, latency_ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, latency_ms)] += 1
+        self.total += 1
+        self.sum_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, pct):
+        # Upper bound of the bucket holding the requested percentile
+        if not self.total:
+            return 0.0
+        rank = pct / 100.0 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return float(LATENCY_BUCKETS[i]) if i < len(LATENCY_BUCKETS) else self.max_ms
+        return self.max_ms
+
+    def mean(self):
+        return self.sum_ms / self.total if self.total else 0.0
+
+    def summary(self):
+        return (f"n={self.total} mean {self.mean():.1f} ms, p50<={self.percentile(50):.0f} ms, "
+                f"p95<={self.percentile(95):.0f} ms, max {self.max_ms:.1f} ms")
+
+
+class CommandPipeline:
+    def __init__(self, write):
+        # write(bytes) is only ever called from the worker thread
+        self.write = write
+        self.condition = threading.Condition()
+        self.pending = collections.deque()
+        self.in_flight = None
+        self.results = queue.Queue()
+        self.histograms = collections.defaultdict(LatencyHistogram)
+        self.overall = LatencyHistogram()
+        self.coalesced = 0
+        self.running = False
+        self.thread = None
+
+    def submit(self, command):
+        # Never blocks; safe to call from the Tk thread
+        with self.condition:
+            key = setpoint_key(command)
+            if key:
+                # Only among the setpoints queued since the last other
+                # command, so a change never jumps ahead of a start or stop
+                for i in range(len(self.pending) - 1, -1, -1):
+                    queued_key = setpoint_key(self.pending[i])
+                    if queued_key is None:
+                        break
+                    if queued_key == key:
+                        self.pending[i] = command
+                        self.coalesced += 1
+                        return
+            self.pending.append(command)
+            self.condition.notify()
+
+    def handle_line(self, line):
+        # Called from the serial reader thread for every text line
+        with self.condition:
+            if not self.in_flight:
+                return
+            command, reply, sent, _ = self.in_flight
+            if line.startswith(reply):
+                self.finish(RESULT_ACK, line)
+            elif line.startswith(NACK_PREFIXES):
+                self.finish(RESULT_NACK, line)
+
+    def finish(self, kind, detail):
+        # Caller holds the condition
+        command, _, sent, _ = self.in_flight
+        latency_ms = (time.monotonic() - sent) * 1000.0
+        if kind == RESULT_ACK:
+            self.histograms[command_key(command)].add(latency_ms)
+            self.overall.add(latency_ms)
+        self.results.put((kind, command, detail, latency_ms))
+        self.in_flight = None
+        self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    if self.in_flight and time.monotonic() >= self.in_flight[3]:
+                        self.finish(RESULT_TIMEOUT, "")
+                    if self.pending and not self.in_flight:
+                        break
+                    timeout = self.in_flight[3] - time.monotonic() if self.in_flight else None
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                command = self.pending.popleft()
+                reply, timeout = ack_for(command)
+                now = time.monotonic()
+                if reply:
+                    self.in_flight = (command, reply, now, now + timeout)
+
+            try:
+                self.write((command + "\n").encode())
+                self.results.put((RESULT_SENT, command, "", 0.0))
+            except Exception as e:
+                with self.condition:
+                    if self.in_flight and self.in_flight[0] == command:
+                        self.in_flight = None
+                self.results.put((RESULT_ERROR, command, str(e), 0.0))
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.pending.clear()
+            self.condition.notify()
+        if self.thread:
+            self.thread.join(timeout=1)
@@ -0,0 +1,96 @@
+"""Bounded console history with batched Tk updates and per-class filtering."""
+import collections
+import heapq
+import itertools
+import tkinter as tk
+
+# Message classes shown as filter toggles in the console
+CLASS_TELEMETRY = "telemetry"
+CLASS_TRAVERSE = "traverse"
+CLASS_ERROR = "error"
+CLASS_SENT = "sent"
+CLASS_INFO = "info"
+
+MESSAGE_CLASSES = [CLASS_TELEMETRY, CLASS_TRAVERSE, CLASS_ERROR, CLASS_SENT, CLASS_INFO]
+
+
+def classify(message):
+    if "Wind Count:" in message:
+        return CLASS_TELEMETRY
+    if message.startswith("Traverse:"):
+        return CLASS_TRAVERSE
+    if message.startswith("Sent:"):
+        return CLASS_SENT
+    if message.startswith("Error") or message.startswith("Unknown command"):
+        return CLASS_ERROR
+    return CLASS_INFO
+
+
+class ConsoleBuffer:
+    def __init__(self, capacity=5000):
+        self.capacity = capacity
+        self.sequence = itertools.count()
+        # One ring per class so a filtered view never has to look at the
+        # classes it hides
+        self.history = {cls: collections.deque(maxlen=capacity) for cls in MESSAGE_CLASSES}
+
+    def add(self, message):
+        cls = classify(message)
+        self.history[cls].append((next(self.sequence), message))
+        return cls
+
+    def view(self, classes):
+        # Newest `capacity` lines across the selected classes, oldest first
+        rings = [self.history[cls] for cls in MESSAGE_CLASSES if cls in classes]
+        merged = heapq.merge(*rings)
+        tail = collections.deque(merged, maxlen=self.capacity)
+        return [message for _, message in tail]
+
+    def __len__(self):
+        return sum(len(ring) for ring in self.history.values())
+
+
+class ConsoleView:
+    def __init__(self, text_widget, capacity=5000):
+        self.text = text_widget
+        self.buffer = ConsoleBuffer(capacity)
+        self.capacity = capacity
+        self.visible = set(MESSAGE_CLASSES)
+        self.pending = collections.deque(maxlen=capacity)
+        self.widget_lines = 0
+
+    def append(self, message):
+        cls = self.buffer.add(message)
+        if cls in self.visible:
+            self.pending.append(message)
+
+    def flush(self):
+        # One insert, one trim and one scroll per frame however many lines arrived
+        if not self.pending:
+            return
+        count = len(self.pending)
+        chunk = "\n".join(self.pending) + "\n"
+        self.pending.clear()
+
+        self.text.config(state=tk.NORMAL)
+        self.text.insert(tk.END, chunk)
+        self.widget_lines += count
+        excess = self.widget_lines - self.capacity
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.widget_lines = self.capacity
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
+
+    def set_filter(self, classes):
+        self.visible = set(classes)
+        lines = self.buffer.view(self.visible)
+        self.pending.clear()
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        if lines:
+            self.text.insert(tk.END, "\n".join(lines) + "\n")
+        self.widget_lines = len(lines)
+        self.text.see(tk.END)
+        self.text.config(state=tk.DISABLED)
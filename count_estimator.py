@@ -0,0 +1,292 @@
+"""Dead-reckoned wind count between hall reports, and missed hall pulse detection.
+
+The winder is a stepper, so the turns it has made follow from the step rate
+it was given: winderSpeed x the slowdown factor, reached at the stepper's
+acceleration, quantized to FastAccelStepper's 16 MHz tick. Integrating
+that between reports gives a smooth count to display, and an ETA that
+doesn't wait for the next report.
+
+The hall sensor is only read once per loop() pass, after five blocking
+traverse steps, so at high speed a short magnet pulse can fall between two
+reads and that wind is never counted. Each miss moves the hall count one
+turn further behind the integrated count. The gap jitters by up to a turn,
+because a report can come late in a wind, so the check uses the largest
+gap over a short window (the reports sent right at the counted edge)
+against the same measure taken once the winder reached speed.
+
+    python count_estimator.py check --days 7
+"""
+import argparse
+import collections
+import math
+import time
+
+from rate_estimator import slowdown_factor, time_to_finish, SLOWDOWN_TIME, SLOWDOWN_WINDS, STEPS_PER_REVOLUTION
+from run_recorder import RunStore, DEFAULT_STORE_DIR
+from decel_profile import WinderModel, optimal_profile
+
+# FastAccelStepper's timer on the ESP32; step periods are whole ticks
+STEPPER_TICKS_PER_SECOND = 16000000
+
+# Firmware acceleration in steps/s^2, as turns/s^2
+DEFAULT_ACCELERATION = 20000 / float(STEPS_PER_REVOLUTION)
+
+# Integration step in seconds
+STEP_TIME = 0.005
+
+# Seconds after reaching speed over which the baseline gap is measured, and
+# the window the current gap is taken over
+CALIBRATION_TIME = 1.5
+DRIFT_WINDOW = 2.0
+
+# Turns the hall count may fall behind before a missed pulse is reported
+MISSED_TOLERANCE = 0.6
+
+# A report this many turns beyond the estimate means the count was changed
+# under us (a reset or a resync), not that the model is off
+JUMP_TURNS = 50
+
+
+def stepper_hz(hz):
+    # Step rate FastAccelStepper actually produces for a requested rate
+    if hz <= 0:
+        return 0.0
+    ticks = max(1, int(round(STEPPER_TICKS_PER_SECOND / float(hz))))
+    return STEPPER_TICKS_PER_SECOND / float(ticks)
+
+
+class CountEstimator:
+    def __init__(self, acceleration=DEFAULT_ACCELERATION, tolerance=MISSED_TOLERANCE):
+        self.acceleration = acceleration
+        self.tolerance = tolerance
+        self.desired = 0
+        self.winder_hz = 0
+        self.profile = None
+        self.reset()
+
+    def reset(self):
+        self.running = False
+        self.time = None
+        self.position = 0.0      # Turns, in the units of the hall count
+        self.speed = 0.0         # Turns/s
+        self.last_count = None
+        self.last_report_time = None
+        self.calibrate_from = None
+        self.calibration = []
+        self.baseline = None
+        self.window = collections.deque()
+        self.gap = 0.0
+        self.missed = 0
+        self.check_from = 0.0
+        self.turns_checked = 0.0
+
+    def configure(self, desired, winder_hz, profile=None):
+        self.desired = desired
+        self.winder_hz = winder_hz
+        self.profile = profile
+
+    # Motor state
+    def start(self, now, count):
+        self.reset()
+        self.running = True
+        self.time = now
+        self.position = float(count)
+        self.last_count = count
+        # Gaps are only compared once the start ramp is over
+        full = stepper_hz(self.winder_hz) / STEPS_PER_REVOLUTION
+        self.calibrate_from = now + full / self.acceleration + 0.5
+
+    def stop(self, now):
+        self.advance(now)
+        self.running = False
+        self.speed = 0.0
+
+    def speed_report(self, now, hz):
+        # Binary telemetry carries the winder's actual step rate; the model
+        # carries on from it towards the commanded speed
+        self.advance(now)
+        self.speed = hz / float(STEPS_PER_REVOLUTION)
+
+    # Integration
+    def commanded_speed(self):
+        remaining = self.desired - int(self.hall_position())
+        factor = self.profile.factor(remaining) if self.profile else slowdown_factor(remaining)
+        return stepper_hz(self.winder_hz * factor) / STEPS_PER_REVOLUTION
+
+    def advance(self, now):
+        if self.time is None:
+            self.time = now
+        if not self.running or now <= self.time:
+            self.time = max(self.time, now)
+            return
+        change = self.acceleration * STEP_TIME
+        while self.time < now:
+            dt = min(STEP_TIME, now - self.time)
+            target = self.commanded_speed()
+            if self.speed < target:
+                speed = min(target, self.speed + change * dt / STEP_TIME)
+            else:
+                speed = max(target, self.speed - change * dt / STEP_TIME)
+            self.position += (self.speed + speed) * 0.5 * dt
+            self.speed = speed
+            self.time += dt
+
+    def hall_position(self):
+        # Where the hall count should be, allowing for pulses already missed
+        return self.position - self.missed
+
+    # Hall reports
+    def observe(self, now, count):
+        # Returns the number of newly detected missed pulses
+        if not self.running:
+            self.last_count = count
+            return 0
+        self.advance(now)
+        if self.last_count is not None and (count < self.last_count or
+                                            count > self.hall_position() + JUMP_TURNS):
+            self.start(now, count)
+            return 0
+        self.last_count = count
+        self.last_report_time = now
+        gap = count - self.position
+        if now < self.calibrate_from:
+            return 0
+
+        if self.baseline is None:
+            self.calibration.append(gap)
+            if now >= self.calibrate_from + CALIBRATION_TIME:
+                # "All motors running" is printed after the winder starts, so
+                # the integrated count can only start late; a baseline below
+                # zero means pulses were already missed on the way up
+                self.baseline = max(max(self.calibration), 0.0)
+                self.turns_checked = 0.0
+                self.check_from = self.position
+            return 0
+
+        self.window.append((now, gap))
+        while self.window and self.window[0][0] < now - DRIFT_WINDOW:
+            self.window.popleft()
+        self.gap = max(g for _, g in self.window)
+        self.turns_checked = self.position - self.check_from
+        missed = int(math.floor(self.baseline - self.gap + 1.0 - self.tolerance))
+        if missed > self.missed:
+            new = missed - self.missed
+            self.missed = missed
+            return new
+        return 0
+
+    # Estimates
+    def estimate(self, now):
+        # Smooth count for display: never behind the last report, and never
+        # more than one turn ahead of it
+        if self.last_count is None:
+            return 0.0
+        if not self.running:
+            return float(self.last_count)
+        self.advance(now)
+        estimate = self.hall_position()
+        return min(max(estimate, self.last_count), self.last_count + 0.999)
+
+    @property
+    def miss_fraction(self):
+        if self.turns_checked < 1.0:
+            return 0.0
+        return min(self.missed / self.turns_checked, 0.5)
+
+    def finish_turns(self):
+        # Turns the bobbin will have when the hall count reaches the target
+        remaining = max(self.desired - (self.last_count or 0), 0)
+        return self.desired + self.missed + remaining * self.miss_fraction / (1.0 - self.miss_fraction)
+
+    def finish_eta(self, now):
+        # Seconds until the hall count reaches the target
+        if not self.running:
+            return math.inf
+        remaining = self.desired - self.estimate(now)
+        full = stepper_hz(self.winder_hz) / STEPS_PER_REVOLUTION * (1.0 - self.miss_fraction)
+        table = self.profile.slowdown_time if self.profile else SLOWDOWN_TIME
+        return time_to_finish(int(math.ceil(remaining)), full, table)
+
+    def describe(self):
+        if self.baseline is None:
+            return "checking" if self.running else "--"
+        if not self.missed:
+            return f"OK ({self.baseline - self.gap:+.2f} turns)"
+        return f"{self.missed} missed, coil ~{self.finish_turns():.0f} turns"
+
+
+def check_run(run, acceleration=DEFAULT_ACCELERATION, tolerance=MISSED_TOLERANCE):
+    # Replays a recorded run. Returns (missed pulses, turns checked) or None
+    # if the run never got past the start ramp. Recordings don't say whether
+    # an optimized slowdown was used, so checking stops before either kind
+    # of slowdown could begin.
+    times = run.times
+    counts = run.counts
+    events = sorted(run.events())
+    estimator = CountEstimator(acceleration, tolerance)
+    target = run.info["target"]
+    winder_hz = run.info["winder_speed"]
+    event_index = 0
+    started = False
+    for i in range(len(times)):
+        now = times[i]
+        while event_index < len(events) and events[event_index][0] <= now:
+            _, name, value = events[event_index]
+            if name == "target":
+                target = value
+            elif name == "w_speed":
+                winder_hz = value
+            event_index += 1
+        estimator.configure(target, winder_hz)
+        slowdown = max(SLOWDOWN_WINDS, optimal_profile(WinderModel(), winder_hz).span) if winder_hz > 0 else 0
+        if target - counts[i] <= slowdown:
+            break
+        if not started:
+            # The motors start once startMotors() returns, which the
+            # recording only shows as the first count that moves
+            if i and counts[i] > counts[i - 1]:
+                estimator.start(times[i - 1], counts[i - 1])
+                started = True
+            else:
+                continue
+        estimator.observe(now, counts[i])
+    if estimator.baseline is None:
+        return None
+    return estimator.missed, estimator.turns_checked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check recorded runs for missed hall pulses")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    sub = parser.add_subparsers(dest="action", required=True)
+    check_parser = sub.add_parser("check", help="Replay recorded runs against the dead-reckoned count")
+    check_parser.add_argument("--machine")
+    check_parser.add_argument("--target", type=int)
+    check_parser.add_argument("--days", type=float, default=7.0)
+    check_parser.add_argument("--tolerance", type=float, default=MISSED_TOLERANCE)
+    args = parser.parse_args()
+
+    store = RunStore(args.store)
+    try:
+        infos = store.find_runs(target=args.target, machine=args.machine, since=time.time() - args.days * 86400)
+        print(f"{'run':>6} {'started':>16} {'target':>7} {'speed Hz':>9} {'checked':>8} {'missed':>7} {'rate':>7}")
+        for info in infos:
+            run = store.open_run(info)
+            try:
+                result = check_run(run, tolerance=args.tolerance)
+            finally:
+                run.close()
+            started = time.strftime("%Y-%m-%d %H:%M", time.localtime(info["started"]))
+            if result is None:
+                print(f"{info['id']:>6} {started:>16} {info['target']:>7} {info['winder_speed']:>9} {'too short':>8}")
+                continue
+            missed, checked = result
+            rate = missed / checked * 100.0 if checked else 0.0
+            print(f"{info['id']:>6} {started:>16} {info['target']:>7} {info['winder_speed']:>9} "
+                  f"{checked:>8.0f} {missed:>7} {rate:>6.2f}%")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""End-of-coil deceleration profiles fitted from recorded runs.
+
+The stock firmware slows down linearly over the last 111 winds to 10% of
+the winder speed. Two things limit how late and how hard it can really
+slow down:
+
+* the stepper can only change speed at its acceleration limit, and
+* the wind count is checked once per loop() pass, so the winder keeps
+  turning for up to one pass after the target wind is counted.
+
+This module fits both from recorded runs. It then works out the fastest
+profile that still reaches the target at a speed slow enough to stop
+within a tolerance, and encodes the profile as a "decel:" command the
+firmware interpolates between.
+
+    python decel_profile.py fit
+    python decel_profile.py profile --speed 150000
+    python decel_profile.py simulate --speeds 50000,100000,150000,200000 --targets 2000,5000,10000
+"""
+import argparse
+import array
+import bisect
+import math
+import operator
+import statistics
+
+from rate_estimator import slowdown_factor, SLOWDOWN_WINDS, STEPS_PER_REVOLUTION
+from run_recorder import RunStore, DEFAULT_STORE_DIR
+from traverse_planner import steps_per_sec_for, STEPS_PER_PASS
+
+# FastAccelStepper acceleration set by the firmware (steps/s^2)
+WINDER_ACCELERATION = 20000
+
+MAX_POINTS = 32
+DEFAULT_POINTS = 16
+# Largest overrun past the target, in turns, a profile may allow
+DEFAULT_TOLERANCE = 0.05
+# Fraction of the fitted acceleration profiles may use when slowing down
+DECEL_MARGIN = 0.8
+# Seconds of samples used to judge the rate while fitting the start ramp
+RATE_WINDOW = 0.5
+
+PROFILE_PREFIX = "decel:"
+PROFILE_OFF = "decel:off"
+
+
+def loop_period(traverse_delay):
+    # Seconds per loop() pass while the motors run
+    return STEPS_PER_PASS / steps_per_sec_for(traverse_delay)
+
+
+def fit_line(xs, ys):
+    # Least-squares (slope, intercept), or None if the points are degenerate
+    n = len(xs)
+    if n < 2:
+        return None
+    sum_x = sum(xs)
+    sum_y = sum(ys)
+    sum_xx = sum(map(operator.mul, xs, xs))
+    sum_xy = sum(map(operator.mul, xs, ys))
+    denominator = n * sum_xx - sum_x * sum_x
+    if denominator <= 0:
+        return None
+    slope = (n * sum_xy - sum_x * sum_y) / denominator
+    return slope, (sum_y - slope * sum_x) / n
+
+
+class WinderModel:
+    def __init__(self, acceleration=WINDER_ACCELERATION / float(STEPS_PER_REVOLUTION),
+                 efficiency=1.0, traverse_delay=500, runs=0):
+        # acceleration in turns/s^2; efficiency is observed over commanded speed
+        self.acceleration = acceleration
+        self.efficiency = efficiency
+        self.traverse_delay = traverse_delay
+        self.runs = runs
+
+    @property
+    def loop_period(self):
+        return loop_period(self.traverse_delay)
+
+    def describe(self):
+        source = f"fitted from {self.runs} runs" if self.runs else "firmware defaults"
+        return (f"acceleration {self.acceleration:.2f} turns/s^2, efficiency {self.efficiency:.3f}, "
+                f"loop pass {self.loop_period * 1000:.2f} ms ({source})")
+
+
+def fit_run(run):
+    # Returns (acceleration turns/s^2, efficiency, traverse delay) for one
+    # completed run, or None if it is too short to tell
+    info = run.info
+    counts = run.counts
+    if len(counts) < 8:
+        return None
+    # Relative times keep the least-squares sums well inside double precision
+    origin = run.times[0]
+    times = [t - origin for t in run.times]
+    target = info["target"]
+    commanded = info["winder_speed"] / float(STEPS_PER_REVOLUTION)
+    delays = [value for _, name, value in run.events() if name == "t_speed"]
+
+    # Full speed rate from the middle of the coil, clear of both ramps
+    middle = [i for i in range(len(counts)) if target * 0.3 <= counts[i] <= target - SLOWDOWN_WINDS]
+    line = fit_line([times[i] for i in middle], [float(counts[i]) for i in middle])
+    if line is None or line[0] <= 0:
+        return None
+    full_rate = line[0]
+
+    # During the start ramp count = a/2 (t - t0)^2, so sqrt(count) is linear
+    # in time with slope sqrt(a/2). The ramp ends once the rate over the
+    # last RATE_WINDOW seconds passes 80% of full speed.
+    ramp_times = []
+    ramp_roots = []
+    for i in range(1, len(counts)):
+        j = bisect.bisect_left(times, times[i] - RATE_WINDOW)
+        dt = times[i] - times[j]
+        if dt >= RATE_WINDOW / 2 and (counts[i] - counts[j]) / dt > 0.8 * full_rate:
+            break
+        if counts[i] > 0:
+            ramp_times.append(times[i])
+            ramp_roots.append(math.sqrt(counts[i]))
+    acceleration = None
+    if len(ramp_times) >= 3:
+        ramp = fit_line(ramp_times, ramp_roots)
+        if ramp and ramp[0] > 0:
+            acceleration = 2.0 * ramp[0] * ramp[0]
+    return acceleration, full_rate / commanded, delays[-1] if delays else None
+
+
+def fit_model(store, machine=None, limit=50):
+    # Medians over the most recent completed runs, falling back to the
+    # firmware's own constants for anything the runs can't tell us
+    model = WinderModel()
+    infos = store.find_runs(machine=machine, completed=True)[-limit:]
+    accelerations = []
+    efficiencies = []
+    delays = []
+    for info in infos:
+        run = store.open_run(info)
+        try:
+            fit = fit_run(run)
+        finally:
+            run.close()
+        if fit is None:
+            continue
+        acceleration, efficiency, delay = fit
+        if acceleration:
+            accelerations.append(acceleration)
+        efficiencies.append(efficiency)
+        if delay:
+            delays.append(delay)
+    if accelerations:
+        model.acceleration = statistics.median(accelerations)
+    if efficiencies:
+        model.efficiency = statistics.median(efficiencies)
+    if delays:
+        model.traverse_delay = statistics.median(delays)
+    model.runs = len(efficiencies)
+    return model
+
+
+class DecelProfile:
+    # Speed in permille of winderSpeed at `len(table)` breakpoints spread
+    # evenly from 0 to `span` winds left after the one being wound; beyond
+    # `span` the winder runs at full speed. Interpolated exactly like the
+    # firmware does.
+    def __init__(self, span, table):
+        self.span = span
+        self.table = array.array("H", table)
+        self.slowdown_time = self.build_slowdown_time()
+
+    def factor(self, remaining):
+        after = remaining - 1
+        if after >= self.span:
+            return 1.0
+        position = max(after, 0) * (len(self.table) - 1) / float(self.span)
+        index = int(position)
+        fraction = position - index
+        low = self.table[index]
+        high = self.table[min(index + 1, len(self.table) - 1)]
+        return (low + (high - low) * fraction) / 1000.0
+
+    def build_slowdown_time(self):
+        # Same form as rate_estimator.SLOWDOWN_TIME, for ETA estimates
+        table = array.array("d", [0.0])
+        for remaining in range(1, self.span + 2):
+            table.append(table[-1] + 1.0 / self.factor(remaining))
+        return table
+
+    def command(self):
+        return PROFILE_PREFIX + ",".join(str(value) for value in [self.span] + list(self.table))
+
+    @classmethod
+    def parse(cls, command):
+        values = [int(value) for value in command[len(PROFILE_PREFIX):].split(",")]
+        return cls(values[0], values[1:])
+
+
+def optimal_profile(model, winder_hz, tolerance=DEFAULT_TOLERANCE, points=DEFAULT_POINTS):
+    # Fastest profile that decelerates at the model's limit and reaches the
+    # target slowly enough to stop within `tolerance` turns: with r turns
+    # left after the current wind the speed may be v(r) = sqrt(v_end^2 + 2 a r).
+    # The curve is concave, so interpolating between breakpoints never asks
+    # for more than it allows.
+    points = max(2, min(points, MAX_POINTS))
+    full = winder_hz / float(STEPS_PER_REVOLUTION) * model.efficiency
+    if full <= 0:
+        return None
+    deceleration = model.acceleration * DECEL_MARGIN
+    end_speed = min(tolerance / model.loop_period, full)
+    span = int(math.ceil((full * full - end_speed * end_speed) / (2.0 * deceleration)))
+    span = max(span, points - 1)
+
+    table = []
+    for i in range(points):
+        remaining = span * i / float(points - 1)
+        speed = math.sqrt(end_speed * end_speed + 2.0 * deceleration * remaining)
+        # Round down so the table never asks for more than v(r)
+        table.append(max(1, min(1000, int(speed / full * 1000))))
+    table[-1] = 1000
+    return DecelProfile(span, table)
+
+
+def simulate_coil(model, winder_hz, target, factor=slowdown_factor, full_above=SLOWDOWN_WINDS):
+    # Returns (seconds from the winder starting to stopping, worst-case turns
+    # past the target). The speed follows each loop pass's setting at the
+    # acceleration limit, and the count is only checked once per pass, so
+    # the target wind may have been reached up to a whole pass earlier.
+    dt = model.loop_period
+    full = winder_hz / float(STEPS_PER_REVOLUTION) * model.efficiency
+    if full <= 0 or target <= 0:
+        return 0.0, 0.0
+    position = 0.0
+    speed = 0.0
+    elapsed = 0.0
+    change = model.acceleration * dt
+    while True:
+        count = int(position)
+        if count >= target:
+            return elapsed, speed * dt
+        remaining = target - count
+        if speed >= full and remaining > full_above + 2:
+            # Cruising: skip straight to the slowdown zone
+            distance = remaining - full_above - 2
+            position += distance
+            elapsed += distance / full
+            continue
+        commanded = full * factor(remaining)
+        if speed < commanded:
+            next_speed = min(commanded, speed + change)
+        else:
+            next_speed = max(commanded, speed - change)
+        position += (speed + next_speed) * 0.5 * dt
+        speed = next_speed
+        elapsed += dt
+
+
+def compare(model, winder_hz, target, tolerance=DEFAULT_TOLERANCE, points=DEFAULT_POINTS):
+    # (stock seconds, stock overrun, profile seconds, profile overrun, profile)
+    profile = optimal_profile(model, winder_hz, tolerance, points)
+    stock_time, stock_over = simulate_coil(model, winder_hz, target)
+    fast_time, fast_over = simulate_coil(model, winder_hz, target, profile.factor, profile.span + 1)
+    return stock_time, stock_over, fast_time, fast_over, profile
+
+
+def parse_list(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit and simulate end-of-coil deceleration profiles")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--machine", help="Only fit runs from this machine")
+    parser.add_argument("--defaults", action="store_true", help="Ignore recorded runs")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Largest overrun past the target in turns")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS)
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    sub.add_parser("fit", help="Show the model fitted from recorded runs")
+
+    profile_parser = sub.add_parser("profile", help="Print the decel: command for a speed")
+    profile_parser.add_argument("--speed", type=int, default=150000)
+
+    sim_parser = sub.add_parser("simulate", help="Time saved per coil across speeds and targets")
+    sim_parser.add_argument("--speeds", default="50000,100000,150000,200000")
+    sim_parser.add_argument("--targets", default="2000,5000,8000,10000")
+    args = parser.parse_args()
+
+    if args.defaults:
+        model = WinderModel()
+    else:
+        store = RunStore(args.store)
+        model = fit_model(store, args.machine)
+        store.close()
+    print(f"Model: {model.describe()}")
+
+    if args.action == "profile":
+        profile = optimal_profile(model, args.speed, args.tolerance, args.points)
+        print(f"Slowdown over the last {profile.span} winds, ending at {profile.table[0] / 10.0:.1f}%")
+        print(profile.command())
+    elif args.action == "simulate":
+        print(f"{'speed Hz':>9} {'target':>7} {'stock s':>8} {'over':>6} {'profile s':>9} {'over':>6} {'saved s':>8}")
+        for speed in parse_list(args.speeds):
+            for target in parse_list(args.targets):
+                stock_time, stock_over, fast_time, fast_over, _ = compare(
+                    model, speed, target, args.tolerance, args.points)
+                print(f"{speed:>9} {target:>7} {stock_time:>8.1f} {stock_over:>6.3f} "
+                      f"{fast_time:>9.1f} {fast_over:>6.3f} {stock_time - fast_time:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Detects a dead serial link, reconnects with backoff, and works out what to resync.
+
+The supervisor is a small state machine with no threads of its own. The
+GUI calls poll() from root.after and WinderClient calls it from its
+supervisor thread. The owner reports what it sees (read errors, bytes
+received, a firmware restart), and poll() says when a reconnect worked
+and the device needs its setpoints again.
+
+A link counts as dead when a read or write fails, or when no bytes arrive
+for STALE_AFTER seconds. The firmware reports the wind count every second
+even when idle, so silence means the link or the board is stuck.
+"""
+import random
+
+# Seconds without a byte before a connected link is treated as dead
+STALE_AFTER = 3.0
+
+# Reconnect attempts back off from INITIAL_BACKOFF to MAX_BACKOFF seconds
+INITIAL_BACKOFF = 0.25
+MAX_BACKOFF = 8.0
+
+# How long to wait for the device to report its count after a resync
+RECONCILE_TIMEOUT = 3.0
+
+# Supervisor states
+STATE_DOWN = "down"              # Not connected and not trying to be
+STATE_UP = "up"
+STATE_LOST = "lost"              # Waiting for the next reconnect attempt
+STATE_RESYNCING = "resyncing"    # Connected, waiting to reconcile the count
+
+# Returned by poll()
+POLL_RECONNECTED = "reconnected"
+POLL_LOST = "lost"
+
+# Outcomes of reconcile_count()
+COUNT_MATCH = "match"            # Device agrees with the last known count
+COUNT_AHEAD = "ahead"            # Device kept winding while we were away
+COUNT_LOST = "lost"              # Device restarted and its count went back
+
+
+def setpoint_commands(desired_count, winder_speed, traverse_delay, left_limit, right_limit, count_offset=0):
+    # Commands that put a restarted or reconnected device back into the
+    # state the host holds. The device's own target is shortened by any
+    # turns it has lost track of.
+    return [
+        f"N{max(desired_count - count_offset, 1)}",
+        f"w_speed:{winder_speed}",
+        f"t_speed:{traverse_delay}",
+        f"t_leftlimit:{left_limit}",
+        f"t_rightlimit:{right_limit}",
+    ]
+
+
+def reconcile_count(last_known, reported):
+    # Compare the count the device reports (plus any offset already in use)
+    # with the last count the host saw
+    if reported == last_known:
+        return COUNT_MATCH
+    if reported > last_known:
+        return COUNT_AHEAD
+    return COUNT_LOST
+
+
+class Backoff:
+    def __init__(self, initial=INITIAL_BACKOFF, maximum=MAX_BACKOFF, jitter=0.1):
+        self.initial = initial
+        self.maximum = maximum
+        self.jitter = jitter
+        self.delay = initial
+
+    def reset(self):
+        self.delay = self.initial
+
+    def next(self):
+        # A little jitter keeps several winders on one hub from retrying in step
+        delay = self.delay * (1.0 + random.uniform(-self.jitter, self.jitter))
+        self.delay = min(self.delay * 2.0, self.maximum)
+        return delay
+
+
+class LinkSupervisor:
+    def __init__(self, connect, disconnect, stale_after=STALE_AFTER, backoff=None):
+        # connect() returns True once the port is open again; disconnect()
+        # tears down whatever is left of the old link
+        self.connect = connect
+        self.disconnect = disconnect
+        self.stale_after = stale_after
+        self.backoff = backoff or Backoff()
+        self.state = STATE_DOWN
+        self.reason = ""
+        self.lost_at = 0.0
+        self.next_attempt = 0.0
+        self.last_bytes = 0
+        self.last_activity = 0.0
+        self.resync_started = 0.0
+        self.attempts = 0
+
+        # Measurements for status displays and benchmarks
+        self.faults = 0
+        self.reconnects = 0
+        self.last_reconnect_time = 0.0
+        self.last_resync_time = 0.0
+
+    def started(self, now, bytes_total=0):
+        # The owner connected; supervise from here on
+        self.state = STATE_UP
+        self.last_bytes = bytes_total
+        self.last_activity = now
+
+    def stopped(self):
+        # The owner disconnected on purpose
+        self.state = STATE_DOWN
+
+    def lost(self, reason, now):
+        if self.state not in (STATE_UP, STATE_RESYNCING):
+            return False
+        self.disconnect()
+        self.state = STATE_LOST
+        self.reason = reason
+        self.lost_at = now
+        self.next_attempt = now
+        self.attempts = 0
+        self.faults += 1
+        self.backoff.reset()
+        return True
+
+    def device_restarted(self, now):
+        # The board reset (e.g. a brownout) but the link survived; its
+        # setpoints and count are gone, so treat it like a reconnect
+        if self.state == STATE_UP:
+            self.faults += 1
+            self.lost_at = now
+            self.begin_resync(now)
+
+    def begin_resync(self, now):
+        # Also called again when a resync has to be repeated
+        if self.state in (STATE_UP, STATE_RESYNCING):
+            self.state = STATE_RESYNCING
+            self.resync_started = now
+
+    def retry_now(self):
+        # E.g. the port just reappeared; don't wait out the backoff
+        self.next_attempt = 0.0
+
+    def poll(self, now, bytes_total):
+        if self.state in (STATE_UP, STATE_RESYNCING):
+            if bytes_total != self.last_bytes:
+                self.last_bytes = bytes_total
+                self.last_activity = now
+            elif now - self.last_activity >= self.stale_after:
+                self.lost(f"No data for {self.stale_after:.0f} s", now)
+                return POLL_LOST
+        elif self.state == STATE_LOST and now >= self.next_attempt:
+            self.attempts += 1
+            if self.connect():
+                self.state = STATE_RESYNCING
+                self.reconnects += 1
+                self.last_reconnect_time = now - self.lost_at
+                self.resync_started = now
+                self.last_bytes = 0
+                self.last_activity = now
+                return POLL_RECONNECTED
+            self.next_attempt = now + self.backoff.next()
+        return None
+
+    def resynced(self, now):
+        # Setpoints are back and the count has been reconciled
+        if self.state == STATE_RESYNCING:
+            self.state = STATE_UP
+            self.last_resync_time = now - self.lost_at
+
+    def reconcile_overdue(self, now):
+        return self.state == STATE_RESYNCING and now - self.resync_started >= RECONCILE_TIMEOUT
+
+    @property
+    def ready(self):
+        # START is only allowed on a link that is up and reconciled
+        return self.state == STATE_UP
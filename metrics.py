@@ -0,0 +1,361 @@
+"""Process metrics on a local HTTP endpoint or in a text file, plus a sampling profiler.
+
+    curl http://127.0.0.1:9108/metrics          # text, one "name value" per line
+    curl http://127.0.0.1:9108/metrics.json
+    curl http://127.0.0.1:9108/profile/start    # sample every thread's stack
+    curl http://127.0.0.1:9108/profile          # collapsed stacks so far
+    curl http://127.0.0.1:9108/profile/stop
+
+Metrics are read through callables the owner registers, and only when they
+are asked for, so an idle endpoint costs nothing. The text output follows
+the Prometheus exposition format. The profile is one line per distinct
+stack ("thread;outer;inner count"), which flamegraph.pl and speedscope read
+directly.
+"""
+import collections
+import gc
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+
+from command_pipeline import LatencyHistogram
+
+DEFAULT_PORT = 9108
+
+# Seconds between writes of the metrics file
+FILE_INTERVAL = 10.0
+
+# Loop lag samples kept for the recent max and percentile (about a minute
+# at the status update rate)
+LAG_HISTORY = 600
+
+# Profiler sampling period in seconds, and the most distinct stacks kept
+PROFILE_INTERVAL = 0.01
+MAX_STACKS = 20000
+
+
+class LoopLagMeter:
+    # How late a periodic callback runs compared with when it was due. Call
+    # schedule() when the callback is re-armed and tick() when it runs.
+    def __init__(self, history=LAG_HISTORY):
+        self.due = None
+        self.histogram = LatencyHistogram()
+        self.recent = collections.deque(maxlen=history)
+        self.last_ms = 0.0
+
+    def schedule(self, delay):
+        self.due = time.monotonic() + delay
+
+    def tick(self):
+        if self.due is None:
+            return 0.0
+        lag_ms = max(0.0, (time.monotonic() - self.due) * 1000.0)
+        self.histogram.add(lag_ms)
+        self.recent.append(lag_ms)
+        self.last_ms = lag_ms
+        return lag_ms
+
+    def recent_max(self):
+        return max(self.recent, default=0.0)
+
+    def recent_percentile(self, pct):
+        values = sorted(self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(pct / 100.0 * len(values)))]
+
+
+class Metric:
+    def __init__(self, name, kind, help_text, read):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        # read() returns a number, or a dict of label text -> number such as
+        # {'quantile="0.95"': 12.0}
+        self.read = read
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.read_errors = 0
+        self.counter("metrics_read_errors_total", "Metric callbacks that raised", lambda: self.read_errors)
+
+    def gauge(self, name, help_text, read):
+        self.metrics.append(Metric(name, "gauge", help_text, read))
+
+    def counter(self, name, help_text, read):
+        self.metrics.append(Metric(name, "counter", help_text, read))
+
+    def collect(self):
+        # [(metric, {labels: value})]; a failing callback drops only its metric
+        values = []
+        for metric in self.metrics:
+            try:
+                value = metric.read()
+            except Exception:
+                self.read_errors += 1
+                continue
+            if value is None:
+                continue
+            if not isinstance(value, dict):
+                value = {"": value}
+            values.append((metric, value))
+        return values
+
+    def render(self):
+        lines = []
+        for metric, value in self.collect():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, number in value.items():
+                label_text = "{" + labels + "}" if labels else ""
+                lines.append(f"{metric.name}{label_text} {float(number):g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        result = {}
+        for metric, value in self.collect():
+            result[metric.name] = value[""] if list(value) == [""] else value
+        return result
+
+
+def quantiles(histogram):
+    return {f'quantile="{pct / 100.0:g}"': histogram.percentile(pct) for pct in (50, 95, 99)}
+
+
+def resident_bytes():
+    # Current RSS on Linux; peak RSS elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def add_process_metrics(registry):
+    # Things that creep up over a long shift
+    started = time.monotonic()
+    registry.gauge("process_uptime_seconds", "Seconds since the process started",
+                   lambda: time.monotonic() - started)
+    registry.counter("process_cpu_seconds_total", "CPU time used by all threads", time.process_time)
+    registry.gauge("process_resident_memory_bytes", "Resident memory", resident_bytes)
+    registry.gauge("process_threads", "Live Python threads", threading.active_count)
+    registry.counter("python_gc_collections_total", "Garbage collections by generation",
+                     lambda: {f'generation="{i}"': stats["collections"]
+                              for i, stats in enumerate(gc.get_stats())})
+    registry.gauge("python_gc_pending", "Allocations counted towards the next collection, by generation",
+                   lambda: {f'generation="{i}"': count for i, count in enumerate(gc.get_count())})
+
+
+class SamplingProfiler:
+    # Samples every thread's Python stack from a background thread. It costs
+    # nothing until start() and can be started and stopped at any time.
+    def __init__(self, interval=PROFILE_INTERVAL, max_stacks=MAX_STACKS):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.sample_time = 0.0
+        self.started_at = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        started = time.perf_counter()
+        frames = sys._current_frames()
+        keys = []
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            parts.append(names.get(ident, str(ident)))
+            keys.append(";".join(reversed(parts)))
+        del frames
+        with self.lock:
+            for key in keys:
+                if key in self.stacks or len(self.stacks) < self.max_stacks:
+                    self.stacks[key] += 1
+                else:
+                    self.dropped += 1
+            self.samples += 1
+            self.sample_time += time.perf_counter() - started
+
+    def run(self):
+        while self.running:
+            self.sample()
+            time.sleep(self.interval)
+
+    def start(self, interval=None):
+        if interval:
+            self.interval = interval
+        if self.running:
+            return self
+        self.running = True
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self.run, name="profiler")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        self.thread = None
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+            self.samples = 0
+            self.dropped = 0
+            self.sample_time = 0.0
+
+    def collapsed(self):
+        with self.lock:
+            items = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def add_metrics(self, registry):
+        registry.gauge("profiler_running", "1 while the sampling profiler is on", lambda: int(self.running))
+        registry.counter("profiler_samples_total", "Stack samples taken", lambda: self.samples)
+        registry.counter("profiler_sample_seconds_total", "Time spent taking samples",
+                         lambda: self.sample_time)
+
+
+class MetricsServer:
+    def __init__(self, registry, profiler=None, host="127.0.0.1", port=DEFAULT_PORT):
+        # Bound to localhost by default; there is no authentication
+        self.registry = registry
+        self.profiler = profiler
+        self.server = http.server.ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def handler_class(self):
+        owner = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                try:
+                    status, content_type, body = owner.respond(url.path, urllib.parse.parse_qs(url.query))
+                except Exception:
+                    status, content_type, body = 500, "text/plain", traceback.format_exc()
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type + "; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, path, query):
+        # (HTTP status, content type, body)
+        if path in ("/", "/metrics"):
+            return 200, "text/plain; version=0.0.4", self.registry.render()
+        if path == "/metrics.json":
+            return 200, "application/json", json.dumps(self.registry.snapshot(), indent=2)
+        profiler = self.profiler
+        if profiler is None or not path.startswith("/profile"):
+            return 404, "text/plain", "Not found\n"
+        if path == "/profile/start":
+            if "reset" in query:
+                profiler.reset()
+            interval = float(query.get("interval", [0])[0]) or None
+            profiler.start(interval)
+            return 200, "text/plain", f"Profiling every {profiler.interval * 1000:.0f} ms\n"
+        if path == "/profile/stop":
+            profiler.stop()
+            return 200, "text/plain", f"Stopped after {profiler.samples} samples\n"
+        if path == "/profile/reset":
+            profiler.reset()
+            return 200, "text/plain", "Profile cleared\n"
+        if path == "/profile":
+            return 200, "text/plain", profiler.collapsed()
+        return 404, "text/plain", "Not found\n"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFile:
+    # Rewrites `path` every `interval` seconds, for stations where opening
+    # a port isn't wanted; the profile goes next to it while it is running
+    def __init__(self, registry, path, interval=FILE_INTERVAL, profiler=None):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.profiler = profiler
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def write(self):
+        self.write_file(self.path, self.registry.render())
+        if self.profiler and self.profiler.samples:
+            self.write_file(self.path + ".profile", self.profiler.collapsed())
+
+    def write_file(self, path, text):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def run(self):
+        while self.running:
+            try:
+                self.write()
+            except OSError:
+                self.registry.read_errors += 1
+            self.wake.wait(self.interval)
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="metrics-file")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=1)
@@ -0,0 +1,381 @@
+"""Dashboard that drives several winders from one process and one I/O thread.
+
+    python multi_winder.py /dev/ttyUSB0 /dev/ttyUSB1 /dev/ttyUSB2
+    python multi_winder.py --sim 8
+
+All ports share a single selector loop; the Tk thread only reads the state
+each port session keeps and queues commands for the loop to write.
+"""
+import argparse
+import collections
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import serial
+
+from serial_reader import SerialLineReader, EVENT_COUNT, EVENT_FRAME, EVENT_LINE, EVENT_ERROR
+from command_pipeline import expected_reply
+
+# Grid refresh interval (ms)
+GRID_UPDATE_INTERVAL = 250
+
+# Latency samples kept per port
+LATENCY_HISTORY = 256
+
+
+def parse_selection(text, count):
+    # "all", "3" or "1-4,6" -> zero-based machine indexes
+    text = text.strip().lower()
+    if not text or text == "all":
+        return list(range(count))
+    selected = set()
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = part.split("-", 1)
+            selected.update(range(int(first), int(last) + 1))
+        elif part:
+            selected.add(int(part))
+    return sorted(i - 1 for i in selected if 1 <= i <= count)
+
+
+class PortSession(SerialLineReader):
+    # Parses one port's stream on the I/O thread and keeps its latest state
+    # instead of queueing every event for the UI
+    def __init__(self, index, port):
+        super().__init__(None)
+        self.index = index
+        self.port = port
+        self.connected = False
+        self.error = ""
+        self.wind_count = 0
+        self.target = 0
+        self.speed = 0
+        self.motor_status = "UNKNOWN"
+        self.last_line = ""
+        self.outgoing = collections.deque()
+        self.awaiting = collections.deque()
+        self.latencies = collections.deque(maxlen=LATENCY_HISTORY)
+
+    def open(self):
+        self.conn = serial.Serial(self.port, 115200, timeout=0)
+        self.connected = True
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+        self.connected = False
+
+    def post(self, kind, payload):
+        if kind == EVENT_COUNT:
+            self.wind_count = payload
+        elif kind == EVENT_FRAME:
+            self.wind_count = payload[0]
+        elif kind == EVENT_LINE:
+            self.handle_reply(payload)
+        elif kind == EVENT_ERROR:
+            self.error = payload
+
+    def handle_reply(self, line):
+        self.last_line = line
+        for i, (reply, sent) in enumerate(self.awaiting):
+            if line.startswith(reply):
+                # Anything queued ahead of this command was never answered
+                # (e.g. S while already running), so stop waiting for it
+                for _ in range(i + 1):
+                    self.awaiting.popleft()
+                self.latencies.append(time.monotonic() - sent)
+                break
+
+        try:
+            if line.startswith("Desired wind count set to"):
+                self.target = int(line.rsplit(" ", 1)[1])
+            elif line.startswith("Winder speed set to"):
+                self.speed = int(line.split()[4])
+            elif line == "All motors running":
+                self.motor_status = "RUNNING"
+            elif line.startswith("All motors stopped"):
+                self.motor_status = "STOPPED"
+            elif line.startswith("All motors disabled"):
+                self.motor_status = "DISABLED"
+            elif line.startswith("Target wind count reached"):
+                self.motor_status = "COMPLETE"
+            elif line.startswith("Unknown command"):
+                # Nothing else will answer the command at the head of the queue
+                if self.awaiting:
+                    self.awaiting.popleft()
+        except (ValueError, IndexError):
+            # A garbled reply; the rest of the port's stream is still good
+            self.parse_errors += 1
+
+    def write_pending(self):
+        while self.outgoing:
+            command = self.outgoing.popleft()
+            reply = expected_reply(command)
+            if reply:
+                self.awaiting.append((reply, time.monotonic()))
+            self.conn.write((command + "\n").encode())
+
+
+class SerialMux:
+    def __init__(self, ports):
+        self.sessions = [PortSession(i, port) for i, port in enumerate(ports)]
+        self.selector = selectors.DefaultSelector()
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+        self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+        self.commands = collections.deque()
+        self.running = False
+        self.thread = None
+        self.cpu_time = 0.0
+
+    def open_all(self):
+        for session in self.sessions:
+            try:
+                session.open()
+                self.selector.register(session.conn.fileno(), selectors.EVENT_READ, session)
+            except Exception as e:
+                session.error = f"Failed to connect: {str(e)}"
+
+    def send(self, indexes, command):
+        # Thread-safe; the I/O thread performs the writes
+        for index in indexes:
+            self.commands.append((index, command))
+        os.write(self.wake_write, b"\0")
+
+    def run(self):
+        self.running = True
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.1):
+                session = key.data
+                if session is None:
+                    try:
+                        os.read(self.wake_read, 4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                try:
+                    data = os.read(key.fd, 4096)
+                    if data:
+                        session.feed(data)
+                except BlockingIOError:
+                    pass
+                except OSError as e:
+                    session.error = f"Error reading: {str(e)}"
+                    self.drop(session)
+                except Exception as e:
+                    # Only this port is dropped; the thread serves the others
+                    session.error = f"Error parsing: {str(e)}"
+                    self.drop(session)
+
+            while self.commands:
+                index, command = self.commands.popleft()
+                session = self.sessions[index]
+                if session.connected:
+                    session.outgoing.append(command)
+            for session in self.sessions:
+                if session.outgoing and session.connected:
+                    try:
+                        session.write_pending()
+                    except Exception as e:
+                        session.error = f"Error sending command: {str(e)}"
+                        self.drop(session)
+            self.cpu_time = time.thread_time()
+
+    def drop(self, session):
+        try:
+            self.selector.unregister(session.conn.fileno())
+        except (KeyError, ValueError):
+            pass
+        session.close()
+
+    def start(self):
+        self.open_all()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        os.write(self.wake_write, b"\0")
+        if self.thread:
+            self.thread.join(timeout=1)
+        for session in self.sessions:
+            if session.connected:
+                self.drop(session)
+        os.close(self.wake_read)
+        os.close(self.wake_write)
+
+
+class MultiWinderApp:
+    def __init__(self, root, mux):
+        self.root = root
+        self.mux = mux
+        self.root.title("Winding Machines")
+        self.root.configure(padx=10, pady=10)
+        self.rows = []
+        self.shown = {}
+
+        self.create_broadcast_section()
+        self.create_grid_section()
+
+        self.root.after(GRID_UPDATE_INTERVAL, self.update_grid)
+
+    def create_broadcast_section(self):
+        frame = ttk.LabelFrame(self.root, text="Broadcast")
+        frame.pack(fill="x", padx=5, pady=5)
+
+        row = ttk.Frame(frame)
+        row.pack(fill="x", padx=5, pady=5)
+        ttk.Label(row, text="Machines:").pack(side="left")
+        self.selection_var = tk.StringVar(value="all")
+        ttk.Entry(row, textvariable=self.selection_var, width=12).pack(side="left", padx=5)
+        ttk.Label(row, text="Wind Count:").pack(side="left")
+        self.wind_count_var = tk.StringVar(value="1000")
+        ttk.Entry(row, textvariable=self.wind_count_var, width=8).pack(side="left", padx=5)
+        ttk.Label(row, text="Speed (Hz):").pack(side="left")
+        self.speed_var = tk.StringVar(value="150000")
+        ttk.Entry(row, textvariable=self.speed_var, width=8).pack(side="left", padx=5)
+
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill="x", padx=5, pady=5)
+        ttk.Button(buttons, text="Set Count", command=self.broadcast_wind_count).pack(side="left", padx=2)
+        ttk.Button(buttons, text="Set Speed", command=self.broadcast_speed).pack(side="left", padx=2)
+        ttk.Button(buttons, text="Set Count + START", command=self.broadcast_count_and_start).pack(side="left", padx=2)
+        ttk.Button(buttons, text="START", command=lambda: self.broadcast("S")).pack(side="left", padx=2)
+        ttk.Button(buttons, text="STOP", command=lambda: self.broadcast("T")).pack(side="left", padx=2)
+        ttk.Button(buttons, text="RESET COUNTER", command=lambda: self.broadcast("R")).pack(side="left", padx=2)
+
+    def create_grid_section(self):
+        frame = ttk.LabelFrame(self.root, text="Machines")
+        frame.pack(fill="both", expand=True, padx=5, pady=5)
+
+        headings = ["#", "Port", "Motors", "Count", "Target", "Progress", "RTT (ms)", "Last message"]
+        for column, heading in enumerate(headings):
+            ttk.Label(frame, text=heading, font=("Arial", 10, "bold")).grid(row=0, column=column, padx=4, sticky="w")
+
+        for session in self.mux.sessions:
+            r = session.index + 1
+            widgets = {
+                "motors": ttk.Label(frame, text=""),
+                "count": ttk.Label(frame, text="0"),
+                "target": ttk.Label(frame, text=""),
+                "progress": ttk.Progressbar(frame, length=120, mode="determinate"),
+                "rtt": ttk.Label(frame, text=""),
+                "last": ttk.Label(frame, text="", width=40),
+            }
+            ttk.Label(frame, text=str(r)).grid(row=r, column=0, padx=4, sticky="w")
+            ttk.Label(frame, text=session.port).grid(row=r, column=1, padx=4, sticky="w")
+            for column, name in enumerate(["motors", "count", "target", "progress", "rtt", "last"], start=2):
+                widgets[name].grid(row=r, column=column, padx=4, sticky="w")
+            self.rows.append(widgets)
+
+    def selected(self):
+        try:
+            return parse_selection(self.selection_var.get(), len(self.mux.sessions))
+        except ValueError:
+            messagebox.showerror("Error", "Machines must look like 'all', '3' or '1-4,6'")
+            return []
+
+    def broadcast(self, command):
+        indexes = self.selected()
+        if indexes:
+            self.mux.send(indexes, command)
+
+    def read_positive(self, var, name):
+        try:
+            value = int(var.get())
+        except ValueError:
+            messagebox.showerror("Error", f"Invalid {name} value")
+            return None
+        if value <= 0:
+            messagebox.showerror("Error", f"{name.capitalize()} must be greater than 0")
+            return None
+        return value
+
+    def broadcast_wind_count(self):
+        count = self.read_positive(self.wind_count_var, "wind count")
+        if count:
+            self.broadcast(f"N{count}")
+
+    def broadcast_speed(self):
+        speed = self.read_positive(self.speed_var, "speed")
+        if speed:
+            self.broadcast(f"w_speed:{speed}")
+
+    def broadcast_count_and_start(self):
+        count = self.read_positive(self.wind_count_var, "wind count")
+        indexes = self.selected()
+        if count and indexes:
+            self.mux.send(indexes, f"N{count}")
+            self.mux.send(indexes, "R")
+            self.mux.send(indexes, "S")
+
+    def set_text(self, widget, key, text):
+        # Only touch widgets whose text changed
+        if self.shown.get(key) != text:
+            self.shown[key] = text
+            widget.config(text=text)
+
+    def update_grid(self):
+        for session, widgets in zip(self.mux.sessions, self.rows):
+            i = session.index
+            status = session.motor_status if session.connected else "OFFLINE"
+            self.set_text(widgets["motors"], (i, "motors"), status)
+            self.set_text(widgets["count"], (i, "count"), str(session.wind_count))
+            self.set_text(widgets["target"], (i, "target"), str(session.target or ""))
+            if session.latencies:
+                latencies = list(session.latencies)
+                rtt = sum(latencies) / len(latencies) * 1000.0
+                self.set_text(widgets["rtt"], (i, "rtt"), f"{rtt:.1f}")
+            self.set_text(widgets["last"], (i, "last"), session.error or session.last_line)
+            if session.target:
+                widgets["progress"]["value"] = min(100.0, session.wind_count * 100.0 / session.target)
+        self.root.after(GRID_UPDATE_INTERVAL, self.update_grid)
+
+
+def start_simulators(count, firehose=False):
+    # Virtual winders in a child process so they don't share our GIL
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "winder_sim.py"),
+               "--count", str(count)]
+    if firehose:
+        command.append("--firehose")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    ports = [process.stdout.readline().split()[-1] for _ in range(count)]
+    return process, ports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control several winders from one window")
+    parser.add_argument("ports", nargs="*", help="Serial ports, one per machine")
+    parser.add_argument("--sim", type=int, default=0, help="Add this many virtual winders")
+    args = parser.parse_args()
+
+    sim_process = None
+    ports = list(args.ports)
+    if args.sim:
+        sim_process, sim_ports = start_simulators(args.sim)
+        ports.extend(sim_ports)
+    if not ports:
+        parser.error("no ports given")
+
+    mux = SerialMux(ports).start()
+    root = tk.Tk()
+    MultiWinderApp(root, mux)
+    try:
+        root.mainloop()
+    finally:
+        mux.stop()
+        if sim_process:
+            sim_process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Serial port discovery off the UI thread, hotplug detection and the last-used port.
+
+PortWatcher enumerates ports on its own thread and queues a snapshot
+whenever the set of ports changes, so a slow ``comports()`` never blocks
+the window. The port of the last successful connection is saved together
+with its USB identity, so the same winder can be found again after its
+device name changes (for example ttyUSB0 -> ttyUSB1).
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from winder_client import list_ports
+
+DEFAULT_LAST_PORT_FILE = os.path.join(os.path.expanduser("~"), ".pickup_winder", "last_port.json")
+
+# Seconds between scans while watching for hotplug changes
+SCAN_INTERVAL = 1.0
+
+
+class PortInfo:
+    def __init__(self, device, description="", vid=None, pid=None, serial_number=None):
+        self.device = device
+        self.description = description
+        self.vid = vid
+        self.pid = pid
+        self.serial_number = serial_number
+
+    @classmethod
+    def from_list_port(cls, port):
+        return cls(port.device, port.description or "", port.vid, port.pid, port.serial_number)
+
+    def identity(self):
+        # None for ports that don't report a USB identity
+        if self.vid is None:
+            return None
+        return self.vid, self.pid, self.serial_number
+
+    def label(self):
+        if self.vid is None:
+            return self.device
+        serial_text = f" {self.serial_number}" if self.serial_number else ""
+        return f"{self.device} ({self.vid:04X}:{self.pid:04X}{serial_text})"
+
+    def to_dict(self):
+        return {
+            "device": self.device,
+            "description": self.description,
+            "vid": self.vid,
+            "pid": self.pid,
+            "serial_number": self.serial_number,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["device"], data.get("description", ""), data.get("vid"), data.get("pid"),
+                   data.get("serial_number"))
+
+
+def load_last_port(path=DEFAULT_LAST_PORT_FILE):
+    try:
+        with open(path) as f:
+            return PortInfo.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_last_port(info, path=DEFAULT_LAST_PORT_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(info.to_dict(), f, indent=2)
+    os.replace(temp_path, path)
+
+
+def find_port(ports, last):
+    # The port that is most likely the remembered winder: same USB identity
+    # first (the device name may have changed), then same device name
+    if last is None:
+        return None
+    identity = last.identity()
+    if identity is not None:
+        for port in ports:
+            if port.identity() == identity:
+                return port
+        # A different USB device now has the old name; don't assume it's ours
+        for port in ports:
+            if port.device == last.device and port.identity() not in (None, identity):
+                return None
+    for port in ports:
+        if port.device == last.device:
+            return port
+    return None
+
+
+class PortWatcher:
+    # Each change is queued as (ports, added devices, removed devices); the
+    # first scan is always queued so callers learn the initial port list
+    def __init__(self, interval=SCAN_INTERVAL, enumerate_ports=list_ports):
+        self.interval = interval
+        self.enumerate_ports = enumerate_ports
+        self.changes = queue.Queue()
+        self.ports = None
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+        self.scan_time = 0.0
+        self.error = ""
+
+    def scan(self):
+        started = time.perf_counter()
+        try:
+            ports = sorted((PortInfo.from_list_port(p) for p in self.enumerate_ports()),
+                           key=lambda p: p.device)
+            self.error = ""
+        except Exception as e:
+            # Keep the last good list; a failed scan is not an unplug
+            self.error = str(e)
+            return
+        finally:
+            self.scan_time = time.perf_counter() - started
+
+        devices = {p.device: p.identity() for p in ports}
+        if self.ports is not None:
+            previous = {p.device: p.identity() for p in self.ports}
+            if devices == previous:
+                return
+            added = [d for d in devices if previous.get(d, False) != devices[d]]
+            removed = [d for d in previous if devices.get(d, False) != previous[d]]
+        else:
+            added = list(devices)
+            removed = []
+        self.ports = ports
+        self.changes.put((ports, added, removed))
+
+    def run(self):
+        while self.running:
+            self.scan()
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def refresh(self):
+        # Scan now instead of at the next interval
+        self.wake.set()
+
+    def find(self, device):
+        for port in self.ports or []:
+            if port.device == device:
+                return port
+        return None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=1)
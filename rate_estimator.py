@@ -0,0 +1,150 @@
+"""Streaming wind-rate, RPM and ETA estimation plus a decimated series for plotting."""
+import array
+import bisect
+import math
+import operator
+
+STEPS_PER_REVOLUTION = 3200
+SLOWDOWN_WINDS = 111
+SLOWDOWN_FLOOR = 0.1
+
+
+def slowdown_factor(remaining):
+    # Same linear ramp as the firmware's updateWinderSpeed()
+    if remaining > SLOWDOWN_WINDS:
+        return 1.0
+    return max(remaining / float(SLOWDOWN_WINDS), SLOWDOWN_FLOOR)
+
+
+# SLOWDOWN_TIME[r] is the time to wind the last r winds at 1 wind/s full
+# speed; anything beyond the slowdown zone adds 1 s per wind
+SLOWDOWN_TIME = array.array("d", [0.0])
+for _remaining in range(1, SLOWDOWN_WINDS + 1):
+    SLOWDOWN_TIME.append(SLOWDOWN_TIME[-1] + 1.0 / slowdown_factor(_remaining))
+
+
+def commanded_turns_per_sec(winder_speed):
+    return winder_speed / float(STEPS_PER_REVOLUTION)
+
+
+def time_to_finish(remaining, full_turns_per_sec, slowdown_time=SLOWDOWN_TIME):
+    # Seconds to wind `remaining` turns, including the end-of-coil slowdown;
+    # pass an uploaded profile's slowdown_time when one is in use
+    if remaining <= 0:
+        return 0.0
+    if full_turns_per_sec <= 0:
+        return math.inf
+    slow = min(remaining, len(slowdown_time) - 1)
+    return (slowdown_time[slow] + (remaining - slow)) / full_turns_per_sec
+
+
+class RateEstimator:
+    def __init__(self, capacity=256, window=5.0):
+        self.capacity = capacity
+        self.window = window
+        self.times = array.array("d", [0.0] * capacity)
+        self.counts = array.array("d", [0.0] * capacity)
+        self.size = 0
+        self.head = 0
+        # Times are stored relative to the first sample so the regression
+        # sums stay well inside double precision
+        self.origin = None
+
+    def reset(self):
+        self.size = 0
+        self.head = 0
+        self.origin = None
+
+    def add(self, timestamp, count):
+        if self.size and count < self.counts[(self.head - 1) % self.capacity]:
+            # Counter was reset on the device
+            self.reset()
+        if self.origin is None:
+            self.origin = timestamp
+        self.times[self.head] = timestamp - self.origin
+        self.counts[self.head] = count
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def window_samples(self):
+        # Ring contents oldest first, trimmed to the last `window` seconds
+        if self.size < self.capacity:
+            times = self.times[:self.size]
+            counts = self.counts[:self.size]
+        else:
+            times = self.times[self.head:] + self.times[:self.head]
+            counts = self.counts[self.head:] + self.counts[:self.head]
+        cutoff = times[-1] - self.window if times else 0.0
+        first = min(bisect.bisect_left(times, cutoff), max(len(times) - 2, 0))
+        return times[first:], counts[first:]
+
+    def turns_per_sec(self):
+        # Least-squares slope of count over time across the window
+        if self.size < 2:
+            return 0.0
+        times, counts = self.window_samples()
+        n = len(times)
+        sum_t = sum(times)
+        sum_c = sum(counts)
+        sum_tt = sum(map(operator.mul, times, times))
+        sum_tc = sum(map(operator.mul, times, counts))
+        denominator = n * sum_tt - sum_t * sum_t
+        if denominator <= 0:
+            return 0.0
+        return max(0.0, (n * sum_tc - sum_t * sum_c) / denominator)
+
+    def estimate(self, current_count, desired_count, winder_speed, profile=None):
+        # Returns (turns/s, RPM, commanded RPM, efficiency, ETA seconds)
+        rate = self.turns_per_sec()
+        remaining = desired_count - current_count
+        commanded = commanded_turns_per_sec(winder_speed)
+        if profile:
+            expected_now = commanded * profile.factor(remaining)
+            eta_table = profile.slowdown_time
+        else:
+            expected_now = commanded * slowdown_factor(remaining)
+            eta_table = SLOWDOWN_TIME
+        efficiency = rate / expected_now if expected_now > 0 and rate > 0 else 1.0
+        eta = time_to_finish(remaining, commanded * efficiency, eta_table)
+        return rate, rate * 60.0, commanded * 60.0, efficiency, eta
+
+
+class DecimatedSeries:
+    # Keeps at most `capacity` points for any run length by merging
+    # neighbouring buckets whenever it fills up
+    def __init__(self, capacity=300, bucket_seconds=0.5):
+        self.capacity = capacity
+        self.initial_bucket = bucket_seconds
+        self.reset()
+
+    def reset(self):
+        self.bucket_seconds = self.initial_bucket
+        self.times = array.array("d")
+        self.values = array.array("d")
+        self.bucket_sum = 0.0
+        self.bucket_samples = 0
+        self.bucket_start = None
+
+    def add(self, timestamp, value):
+        if self.bucket_start is None:
+            self.bucket_start = timestamp
+        if timestamp - self.bucket_start >= self.bucket_seconds and self.bucket_samples:
+            self.times.append(self.bucket_start)
+            self.values.append(self.bucket_sum / self.bucket_samples)
+            self.bucket_sum = 0.0
+            self.bucket_samples = 0
+            self.bucket_start = timestamp
+            if len(self.times) >= self.capacity:
+                self.decimate()
+        self.bucket_sum += value
+        self.bucket_samples += 1
+
+    def decimate(self):
+        # Halve the resolution of everything recorded so far
+        self.times = self.times[::2]
+        self.values = array.array("d", map(lambda a, b: (a + b) / 2.0,
+                                           self.values[::2], self.values[1::2] + self.values[-1:]))
+        self.bucket_seconds *= 2
+
+    def points(self):
+        return self.times, self.values
@@ -0,0 +1,140 @@
+"""Named coil recipes and a queue of coils to wind back to back."""
+import collections
+import json
+import os
+
+from winder_client import parse_wind_count, parse_winder_speed, parse_traverse_delay, parse_left_limit, \
+    parse_right_limit
+
+DEFAULT_RECIPE_FILE = os.path.join(os.path.expanduser("~"), ".pickup_winder", "recipes.json")
+
+
+class Recipe:
+    def __init__(self, name, wind_count, winder_speed, traverse_delay, left_limit, right_limit,
+                 home_traverse=True):
+        self.name = name
+        self.wind_count = int(wind_count)
+        self.winder_speed = int(winder_speed)
+        self.traverse_delay = int(traverse_delay)
+        self.left_limit = int(left_limit)
+        self.right_limit = int(right_limit)
+        self.home_traverse = bool(home_traverse)
+        self.validate()
+
+    def validate(self):
+        # Same checks the GUI's set_* methods and WinderClient use
+        if not self.name:
+            raise ValueError("Recipe needs a name")
+        parse_wind_count(self.wind_count)
+        parse_winder_speed(self.winder_speed)
+        parse_traverse_delay(self.traverse_delay)
+        parse_left_limit(self.left_limit)
+        parse_right_limit(self.right_limit)
+        if self.left_limit >= self.right_limit:
+            # The firmware would reverse the traverse on every step
+            raise ValueError("Left limit must be below the right limit")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "wind_count": self.wind_count,
+            "winder_speed": self.winder_speed,
+            "traverse_delay": self.traverse_delay,
+            "left_limit": self.left_limit,
+            "right_limit": self.right_limit,
+            "home_traverse": self.home_traverse,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data["wind_count"], data["winder_speed"], data["traverse_delay"],
+                   data["left_limit"], data["right_limit"], data.get("home_traverse", True))
+
+
+class RecipeBook:
+    def __init__(self, path=DEFAULT_RECIPE_FILE):
+        self.path = path
+        self.recipes = collections.OrderedDict()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for item in data.get("recipes", []):
+            try:
+                recipe = Recipe.from_dict(item)
+            except (KeyError, ValueError, TypeError):
+                continue
+            self.recipes[recipe.name] = recipe
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"recipes": [r.to_dict() for r in self.recipes.values()]}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def add(self, recipe):
+        self.recipes[recipe.name] = recipe
+        self.save()
+
+    def remove(self, name):
+        if self.recipes.pop(name, None):
+            self.save()
+
+    def names(self):
+        return list(self.recipes)
+
+    def get(self, name):
+        return self.recipes.get(name)
+
+
+class JobQueue:
+    def __init__(self):
+        self.jobs = collections.deque()
+        self.current = None
+        self.active = False
+        self.completed = 0
+
+    def add(self, recipe, quantity=1):
+        for _ in range(quantity):
+            self.jobs.append(recipe)
+
+    def clear(self):
+        self.jobs.clear()
+        self.current = None
+        self.active = False
+
+    def start(self):
+        # Returns the first recipe to load, or None if there is nothing queued
+        self.active = bool(self.jobs)
+        self.completed = 0
+        return self.advance()
+
+    def advance(self):
+        if not self.active or not self.jobs:
+            self.current = None
+            self.active = False
+            return None
+        self.current = self.jobs.popleft()
+        return self.current
+
+    def coil_complete(self):
+        # Called when the firmware reports the target reached; returns the
+        # next recipe to load, or None when the queue is finished
+        if not self.active:
+            return None
+        self.completed += 1
+        return self.advance()
+
+    def stop(self):
+        if self.current is not None:
+            self.jobs.appendleft(self.current)
+        self.current = None
+        self.active = False
+
+    def describe(self):
+        return [recipe.name for recipe in self.jobs]
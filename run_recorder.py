@@ -0,0 +1,304 @@
+"""Per-coil run recorder: append-only column files per run plus an SQLite index.
+
+Each run gets its own directory holding one flat binary file per column.
+Samples and events are appended as native arrays and read back through
+mmap, so queries only touch the runs and byte ranges they need.
+
+    python run_recorder.py list --target 5000 --days 30 --curve
+"""
+import argparse
+import array
+import bisect
+import mmap
+import os
+import sqlite3
+import time
+
+DEFAULT_STORE_DIR = os.path.join(os.path.expanduser("~"), ".pickup_winder", "runs")
+
+# Column file name -> array typecode
+COLUMNS = {
+    "sample_time.f64": "d",
+    "sample_count.u32": "I",
+    "event_time.f64": "d",
+    "event_kind.u8": "B",
+    "event_value.i64": "q",
+}
+
+# Event kinds stored in event_kind.u8
+EVENT_START = 1
+EVENT_STOP = 2
+EVENT_COMPLETE = 3
+EVENT_TARGET = 4
+EVENT_WINDER_SPEED = 5
+EVENT_TRAVERSE_DELAY = 6
+EVENT_LEFT_LIMIT = 7
+EVENT_RIGHT_LIMIT = 8
+EVENT_RESET = 9
+EVENT_HOME = 10
+EVENT_DISABLE = 11
+# Value is the total hall pulses missed so far in the coil
+EVENT_MISSED = 12
+
+EVENT_NAMES = {
+    EVENT_START: "start",
+    EVENT_STOP: "stop",
+    EVENT_COMPLETE: "complete",
+    EVENT_TARGET: "target",
+    EVENT_WINDER_SPEED: "w_speed",
+    EVENT_TRAVERSE_DELAY: "t_speed",
+    EVENT_LEFT_LIMIT: "t_leftlimit",
+    EVENT_RIGHT_LIMIT: "t_rightlimit",
+    EVENT_RESET: "reset",
+    EVENT_HOME: "t_home",
+    EVENT_DISABLE: "disable_all_motors",
+    EVENT_MISSED: "missed_pulses",
+}
+
+# Command prefix -> event kind, for commands that carry a value
+VALUE_COMMANDS = [
+    ("w_speed:", EVENT_WINDER_SPEED),
+    ("t_speed:", EVENT_TRAVERSE_DELAY),
+    ("t_leftlimit:", EVENT_LEFT_LIMIT),
+    ("t_rightlimit:", EVENT_RIGHT_LIMIT),
+    ("N", EVENT_TARGET),
+]
+
+PLAIN_COMMANDS = {
+    "S": EVENT_START,
+    "T": EVENT_STOP,
+    "R": EVENT_RESET,
+    "t_home": EVENT_HOME,
+    "disable_all_motors": EVENT_DISABLE,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    ended REAL,
+    machine TEXT NOT NULL,
+    target INTEGER NOT NULL,
+    winder_speed INTEGER NOT NULL,
+    final_count INTEGER,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_by_target ON runs (target, started);
+CREATE INDEX IF NOT EXISTS runs_by_machine ON runs (machine, started);
+CREATE INDEX IF NOT EXISTS runs_by_started ON runs (started);
+"""
+
+# Flush buffered samples to disk after this many samples or seconds
+FLUSH_SAMPLES = 512
+FLUSH_INTERVAL = 1.0
+
+
+def command_event(command):
+    # Map a command string to (event kind, value), or None if not recorded
+    kind = PLAIN_COMMANDS.get(command)
+    if kind is not None:
+        return kind, 0
+    for prefix, kind in VALUE_COMMANDS:
+        if command.startswith(prefix):
+            try:
+                return kind, int(command[len(prefix):])
+            except ValueError:
+                return None
+    return None
+
+
+class RunWriter:
+    def __init__(self, run_id, path):
+        self.run_id = run_id
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.columns = {name: array.array(code) for name, code in COLUMNS.items()}
+        self.files = {name: open(os.path.join(path, name), "ab") for name in COLUMNS}
+        self.last_flush = time.monotonic()
+        self.last_count = 0
+
+    def add_sample(self, timestamp, count):
+        self.columns["sample_time.f64"].append(timestamp)
+        self.columns["sample_count.u32"].append(count)
+        self.last_count = count
+        if (len(self.columns["sample_time.f64"]) >= FLUSH_SAMPLES
+                or time.monotonic() - self.last_flush >= FLUSH_INTERVAL):
+            self.flush()
+
+    def add_event(self, timestamp, kind, value=0):
+        self.columns["event_time.f64"].append(timestamp)
+        self.columns["event_kind.u8"].append(kind)
+        self.columns["event_value.i64"].append(value)
+
+    def flush(self):
+        for name, column in self.columns.items():
+            if column:
+                column.tofile(self.files[name])
+                del column[:]
+                self.files[name].flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+
+class RunData:
+    # Read-only, memory-mapped view of one run's columns
+    def __init__(self, info, path):
+        self.info = info
+        self.path = path
+        self.maps = []
+        self.columns = {}
+        for name, code in COLUMNS.items():
+            self.columns[name] = self.map_column(os.path.join(path, name), code)
+
+    def map_column(self, filename, code):
+        itemsize = array.array(code).itemsize
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+        # Ignore a partly written trailing item from a crash
+        size -= size % itemsize
+        if size == 0:
+            return memoryview(array.array(code))
+        with open(filename, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        self.maps.append(mapped)
+        return memoryview(mapped).cast(code)
+
+    @property
+    def times(self):
+        return self.columns["sample_time.f64"]
+
+    @property
+    def counts(self):
+        return self.columns["sample_count.u32"]
+
+    def events(self):
+        times = self.columns["event_time.f64"]
+        kinds = self.columns["event_kind.u8"]
+        values = self.columns["event_value.i64"]
+        return [(times[i], EVENT_NAMES.get(kinds[i], str(kinds[i])), values[i])
+                for i in range(len(kinds))]
+
+    def wind_rate_curve(self, points=50):
+        # Winds per second at `points` evenly spaced times, found by bisection
+        # so only O(points log n) samples are touched
+        times = self.times
+        counts = self.counts
+        if len(times) < 2:
+            return []
+        start = times[0]
+        span = times[-1] - start
+        if span <= 0:
+            return []
+        curve = []
+        previous_index = 0
+        for i in range(1, points + 1):
+            t = start + span * i / points
+            index = min(bisect.bisect_right(times, t) - 1, len(times) - 1)
+            dt = times[index] - times[previous_index]
+            if dt > 0:
+                curve.append((t - start, (counts[index] - counts[previous_index]) / dt))
+            previous_index = index
+        return curve
+
+    def close(self):
+        for name in list(self.columns):
+            self.columns[name].release()
+        self.columns = {}
+        for mapped in self.maps:
+            mapped.close()
+        self.maps = []
+
+
+class RunStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.db"))
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def run_path(self, run_id):
+        return os.path.join(self.root, f"run_{run_id:08d}")
+
+    def start_run(self, machine, target, winder_speed, started=None):
+        cursor = self.db.execute(
+            "INSERT INTO runs (started, machine, target, winder_speed) VALUES (?, ?, ?, ?)",
+            (started or time.time(), machine, target, winder_speed))
+        self.db.commit()
+        run_id = cursor.lastrowid
+        return RunWriter(run_id, self.run_path(run_id))
+
+    def finish_run(self, writer, completed, ended=None):
+        writer.close()
+        self.db.execute("UPDATE runs SET ended = ?, final_count = ?, completed = ? WHERE id = ?",
+                        (ended or time.time(), writer.last_count, int(completed), writer.run_id))
+        self.db.commit()
+
+    def find_runs(self, target=None, machine=None, since=None, until=None, completed=None):
+        clauses = []
+        params = []
+        if target is not None:
+            clauses.append("target = ?")
+            params.append(target)
+        if machine is not None:
+            clauses.append("machine = ?")
+            params.append(machine)
+        if since is not None:
+            clauses.append("started >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("started < ?")
+            params.append(until)
+        if completed is not None:
+            clauses.append("completed = ?")
+            params.append(int(completed))
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return self.db.execute(f"SELECT * FROM runs{where} ORDER BY started", params).fetchall()
+
+    def open_run(self, info):
+        return RunData(info, self.run_path(info["id"]))
+
+    def close(self):
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query recorded winding runs")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    sub = parser.add_subparsers(dest="action", required=True)
+
+    list_parser = sub.add_parser("list", help="List runs matching the filters")
+    list_parser.add_argument("--target", type=int)
+    list_parser.add_argument("--machine")
+    list_parser.add_argument("--days", type=float, help="Only runs started in the last N days")
+    list_parser.add_argument("--completed", action="store_true", help="Only runs that reached target")
+    list_parser.add_argument("--curve", action="store_true", help="Print each run's wind-rate curve")
+    args = parser.parse_args()
+
+    store = RunStore(args.store)
+    query_start = time.perf_counter()
+    since = time.time() - args.days * 86400 if args.days else None
+    runs = store.find_runs(target=args.target, machine=args.machine, since=since,
+                           completed=True if args.completed else None)
+    for info in runs:
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(info["started"]))
+        print(f"Run {info['id']}: {started} {info['machine']} target {info['target']} "
+              f"final {info['final_count']} {'complete' if info['completed'] else 'incomplete'}")
+        if args.curve:
+            run = store.open_run(info)
+            curve = run.wind_rate_curve()
+            print("  " + " ".join(f"{rate:.1f}" for _, rate in curve))
+            run.close()
+    elapsed = (time.perf_counter() - query_start) * 1000.0
+    print(f"{len(runs)} runs in {elapsed:.1f} ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Raw serial capture with timestamps, and replay of a capture through the normal ingest path.
+
+    python serial_capture.py info session.wcap
+    python serial_capture.py dump session.wcap --from 120 --to 130
+    python serial_capture.py replay session.wcap --speed max
+
+A capture holds every chunk read from or written to the port, as it was
+read or written, stamped with time.monotonic() relative to the start of
+the capture. Marks record when links were opened and closed. The GUI
+writes one with --capture PATH and plays one back with --replay PATH in
+place of a port. ReplaySerial can stand in for serial.Serial anywhere.
+
+File layout, little endian: b"WCAP", a version byte, a uint32 length and
+that many bytes of JSON header. Then records: uint64 microseconds, uint8
+kind, uint32 length, data. A path ending in .gz is gzip compressed. A
+capture cut short by a crash reads up to its last complete record.
+"""
+import argparse
+import gzip
+import io
+import json
+import socket
+import struct
+import threading
+import time
+
+from serial_reader import SerialLineReader, EVENT_COUNT, EVENT_FRAME
+
+MAGIC = b"WCAP"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")
+RECORD = struct.Struct("<QBI")
+
+# Record kinds
+KIND_IN = 0       # Device to host
+KIND_OUT = 1      # Host to device
+KIND_MARK = 2     # UTF-8 note, e.g. "open /dev/ttyUSB0"
+
+KIND_ARROWS = {KIND_IN: "<", KIND_OUT: ">", KIND_MARK: "*"}
+
+# Seconds between flushes to disk while capturing
+FLUSH_INTERVAL = 1.0
+
+# Bytes ReplaySerial buffers ahead when replaying at maximum speed
+MAX_SPEED_CHUNK = 65536
+
+
+def open_file(path, mode):
+    if path.endswith(".gz"):
+        # Buffered in front of gzip so the compressor sees large blocks
+        # rather than one small read at a time
+        if "w" in mode:
+            return io.BufferedWriter(gzip.open(path, mode), 65536)
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def parse_speed(text):
+    # "max" (or 0) replays as fast as the reader takes the bytes
+    if text == "max":
+        return 0.0
+    speed = float(text)
+    if speed < 0:
+        raise ValueError("speed must be positive")
+    return speed
+
+
+class SerialCapture:
+    # Thread-safe: the reader thread records what it reads and the command
+    # pipeline what it writes
+    def __init__(self, path):
+        self.path = path
+        self.file = open_file(path, "wb")
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.last_flush = self.started
+        self.bytes_in = 0
+        self.bytes_out = 0
+        header = json.dumps({
+            "started": time.time(),
+            "host": socket.gethostname(),
+        }).encode("utf-8")
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(header)) + header)
+
+    def record(self, kind, data):
+        now = time.monotonic()
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD.pack(int((now - self.started) * 1e6), kind, len(data)))
+            self.file.write(data)
+            if kind == KIND_IN:
+                self.bytes_in += len(data)
+            elif kind == KIND_OUT:
+                self.bytes_out += len(data)
+            # Flushed about once a second so a hang or crash loses little
+            if now - self.last_flush >= FLUSH_INTERVAL:
+                self.file.flush()
+                self.last_flush = now
+
+    def mark(self, note):
+        self.record(KIND_MARK, note.encode("utf-8"))
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class CapturingSerial:
+    # Wraps an open port and records every read and write; everything else
+    # is passed through
+    def __init__(self, conn, capture):
+        self.conn = conn
+        self.capture = capture
+
+    def read(self, size=1):
+        data = self.conn.read(size)
+        if data:
+            self.capture.record(KIND_IN, data)
+        return data
+
+    def write(self, data):
+        written = self.conn.write(data)
+        self.capture.record(KIND_OUT, bytes(data))
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class CaptureReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open_file(path, "rb")
+        self.truncated = False
+        head = self.read(HEADER.size)
+        if len(head) < HEADER.size:
+            # Empty, or cut short before the header was flushed
+            self.file.close()
+            raise ValueError(f"{path} is not a serial capture")
+        magic, version, length = HEADER.unpack(head)
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a serial capture")
+        if version != VERSION:
+            self.file.close()
+            raise ValueError(f"{path} is capture version {version}, expected {VERSION}")
+        header = self.read(length)
+        try:
+            if len(header) < length:
+                raise ValueError
+            self.header = json.loads(header.decode("utf-8"))
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{path} is not a serial capture") from None
+
+    def read(self, size):
+        # A gzip stream cut short raises rather than returning what it has
+        try:
+            return self.file.read(size)
+        except EOFError:
+            self.truncated = True
+            return b""
+
+    def __iter__(self):
+        # (seconds since the capture started, kind, data)
+        while True:
+            head = self.read(RECORD.size)
+            if len(head) < RECORD.size:
+                self.truncated = self.truncated or bool(head)
+                return
+            micros, kind, length = RECORD.unpack(head)
+            data = self.read(length)
+            if len(data) < length:
+                self.truncated = True
+                return
+            yield micros / 1e6, kind, data
+
+    def close(self):
+        self.file.close()
+
+
+class ReplaySerial:
+    # Plays a capture's inbound bytes back like a serial port. A chunk is
+    # readable once its timestamp, divided by `speed`, has passed since the
+    # first read; speed 0 hands them over as fast as they are read. Writes
+    # are counted and dropped.
+    def __init__(self, path, speed=1.0, timeout=1.0):
+        self.reader = CaptureReader(path)
+        self.records = (record for record in self.reader if record[1] == KIND_IN)
+        self.speed = speed
+        self.timeout = timeout
+        self.buffer = bytearray()
+        self.next_record = next(self.records, None)
+        self.first_time = self.next_record[0] if self.next_record else 0.0
+        self.started = None
+        self.is_open = True
+        self.bytes_replayed = 0
+        self.bytes_written = 0
+        # Seconds behind schedule the latest chunk was read; stays near 0
+        # while the consumer keeps up
+        self.lag = 0.0
+
+    @property
+    def finished(self):
+        return self.next_record is None and not self.buffer
+
+    def due_at(self, record):
+        return self.started + (record[0] - self.first_time) / self.speed
+
+    def release(self):
+        # Moves every chunk that is due into the buffer
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        while self.next_record is not None:
+            if self.speed:
+                due = self.due_at(self.next_record)
+                if due > now:
+                    break
+                self.lag = now - due
+            elif len(self.buffer) >= MAX_SPEED_CHUNK:
+                break
+            self.buffer += self.next_record[2]
+            self.bytes_replayed += len(self.next_record[2])
+            self.next_record = next(self.records, None)
+
+    @property
+    def in_waiting(self):
+        self.release()
+        return len(self.buffer)
+
+    def read(self, size=1):
+        deadline = time.monotonic() + self.timeout
+        while self.is_open:
+            self.release()
+            if self.buffer:
+                data = bytes(self.buffer[:size])
+                del self.buffer[:size]
+                return data
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            # Like a quiet port once the capture has run out
+            wait = deadline - now
+            if self.next_record is not None and self.speed:
+                wait = min(wait, self.due_at(self.next_record) - now)
+            time.sleep(max(wait, 0.0))
+        return b""
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+    def close(self):
+        self.is_open = False
+        self.reader.close()
+
+
+def summarize(path):
+    reader = CaptureReader(path)
+    totals = {KIND_IN: 0, KIND_OUT: 0, KIND_MARK: 0}
+    records = 0
+    lines = 0
+    last = 0.0
+    marks = []
+    try:
+        for seconds, kind, data in reader:
+            records += 1
+            last = seconds
+            totals[kind] = totals.get(kind, 0) + len(data)
+            if kind == KIND_IN:
+                lines += data.count(b"\n")
+            elif kind == KIND_MARK:
+                marks.append((seconds, data.decode("utf-8", "replace")))
+    finally:
+        reader.close()
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(reader.header["started"]))
+    print(f"Captured {started} on {reader.header.get('host', '?')}")
+    print(f"Duration: {last:.1f} s in {records} records")
+    print(f"Inbound: {totals[KIND_IN]} bytes, {lines} lines")
+    print(f"Outbound: {totals[KIND_OUT]} bytes")
+    for seconds, note in marks:
+        print(f"{seconds:12.6f} * {note}")
+    if reader.truncated:
+        print("The capture ends with a partial record")
+
+
+def dump(path, start, end):
+    reader = CaptureReader(path)
+    try:
+        for seconds, kind, data in reader:
+            if seconds < start:
+                continue
+            if end is not None and seconds > end:
+                break
+            text = data.decode("utf-8", "backslashreplace")
+            print(f"{seconds:12.6f} {KIND_ARROWS.get(kind, '?')} {text!r}")
+    finally:
+        reader.close()
+
+
+def replay(path, speed):
+    # The reader-thread half of the GUI's ingest path, with the events
+    # drained as the Tk thread would. Frames are accepted from the start,
+    # as the GUI does; text-only captures never contain the sync byte.
+    conn = ReplaySerial(path, speed, timeout=0.1)
+    reader = SerialLineReader(conn, max_events=0)
+    reader.enable_frames(True)
+    counts = 0
+    count = None
+    started = time.monotonic()
+    max_lag = 0.0
+    try:
+        while not conn.finished:
+            reader.pump()
+            max_lag = max(max_lag, conn.lag)
+            while not reader.events.empty():
+                kind, payload = reader.events.get_nowait()
+                if kind == EVENT_COUNT:
+                    counts += 1
+                    count = payload
+                elif kind == EVENT_FRAME:
+                    counts += 1
+                    count = payload[0]
+    finally:
+        conn.close()
+    elapsed = time.monotonic() - started
+    print(f"Replayed {conn.bytes_replayed} bytes, {reader.meter.lines} lines in {elapsed:.2f} s "
+          f"({reader.meter.lines / elapsed if elapsed else 0.0:.0f} lines/s)")
+    print(f"Counts: {counts}, last {count}; parse errors: {reader.parse_errors}")
+    if speed:
+        print(f"Worst lag behind the capture's timing: {max_lag * 1000.0:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay raw serial captures")
+    sub = parser.add_subparsers(dest="action", required=True)
+    info_parser = sub.add_parser("info", help="Duration, byte counts and link marks")
+    info_parser.add_argument("path")
+    dump_parser = sub.add_parser("dump", help="Every chunk with its timestamp and direction")
+    dump_parser.add_argument("path")
+    dump_parser.add_argument("--from", dest="start", type=float, default=0.0, help="Seconds into the capture")
+    dump_parser.add_argument("--to", dest="end", type=float)
+    replay_parser = sub.add_parser("replay", help="Feed the inbound bytes through the line reader")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--speed", type=parse_speed, default=0.0,
+                               help="1 for real time, 10 for ten times faster, max for no waiting")
+    args = parser.parse_args()
+
+    if args.action == "info":
+        summarize(args.path)
+    elif args.action == "dump":
+        dump(args.path, args.start, args.end)
+    elif args.action == "replay":
+        replay(args.path, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Chunked serial reader that turns the firmware's output into events for the Tk thread."""
+import queue
+import time
+
+from telemetry import SYNC_BYTE, FRAME_SIZE, decode_frame
+
+WIND_COUNT_TAG = b"Wind Count:"
+
+# Lines about channel 2 start with "2:" (see channels.py)
+CHANNEL_SEPARATOR = ord(":")
+
+# Event kinds placed on the queue
+EVENT_LINE = "line"
+EVENT_COUNT = "count"
+EVENT_FRAME = "frame"
+EVENT_CHANNEL_COUNT = "channel_count"    # (channel, count) for channels other than 1
+EVENT_ERROR = "error"
+
+
+class ThroughputMeter:
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+        self.last_time = time.monotonic()
+        self.last_lines = 0
+        self.last_bytes = 0
+        self.lines_per_sec = 0.0
+        self.bytes_per_sec = 0.0
+
+    def sample(self):
+        # Rates since the previous sample; call from one thread only
+        now = time.monotonic()
+        elapsed = now - self.last_time
+        if elapsed > 0:
+            self.lines_per_sec = (self.lines - self.last_lines) / elapsed
+            self.bytes_per_sec = (self.bytes - self.last_bytes) / elapsed
+        self.last_time = now
+        self.last_lines = self.lines
+        self.last_bytes = self.bytes
+        return self.lines_per_sec, self.bytes_per_sec
+
+
+class LineSplitter:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.scan_from = 0
+        # Set once binary telemetry has been requested; text-only links skip
+        # the sync byte search entirely
+        self.frames = False
+
+    def feed(self, data, emit, emit_frame=None):
+        # emit(buffer, start, end) is called for every complete line so the
+        # caller can parse in place and only copy the bytes it keeps
+        buf = self.buffer
+        buf += data
+        if self.frames:
+            self.feed_mixed(emit, emit_frame)
+            return
+        start = 0
+        newline = buf.find(b"\n", self.scan_from)
+        while newline >= 0:
+            emit(buf, start, newline)
+            start = newline + 1
+            newline = buf.find(b"\n", start)
+        if start:
+            del buf[:start]
+        self.scan_from = len(buf)
+
+    def feed_mixed(self, emit, emit_frame):
+        # Text lines and binary frames interleaved; emit_frame gets the
+        # decoded tuple, or None for a frame that failed its checksum
+        buf = self.buffer
+        start = 0
+        newline = buf.find(b"\n")
+        sync = buf.find(SYNC_BYTE)
+        while True:
+            if sync >= 0 and (newline < 0 or sync < newline):
+                if len(buf) - sync < FRAME_SIZE:
+                    start = sync
+                    break
+                frame = decode_frame(buf, sync)
+                emit_frame(frame)
+                start = sync + (FRAME_SIZE if frame is not None else 1)
+                sync = buf.find(SYNC_BYTE, start)
+                if newline >= 0 and newline < start:
+                    newline = buf.find(b"\n", start)
+                continue
+            if newline < 0:
+                break
+            emit(buf, start, newline)
+            start = newline + 1
+            newline = buf.find(b"\n", start)
+        if start:
+            del buf[:start]
+        self.scan_from = 0
+
+
+class SerialLineReader:
+    def __init__(self, conn, max_events=10000, chunk_size=4096):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.events = queue.Queue(maxsize=max_events)
+        self.splitter = LineSplitter()
+        self.meter = ThroughputMeter()
+        self.running = True
+        self.parse_errors = 0
+        # Optional callable given every text line on the reader thread, for
+        # consumers that can't wait for the Tk thread to drain the queue
+        self.line_hook = None
+
+    def pump(self):
+        # Blocks inside the driver until at least one byte arrives or the
+        # port timeout expires, then takes everything that is buffered
+        waiting = self.conn.in_waiting
+        data = self.conn.read(min(waiting, self.chunk_size) if waiting else 1)
+        if data:
+            self.feed(data)
+
+    def feed(self, data):
+        self.meter.bytes += len(data)
+        self.splitter.feed(data, self.handle_line, self.handle_frame)
+
+    def enable_frames(self, enabled=True):
+        self.splitter.frames = enabled
+
+    def handle_frame(self, frame):
+        if frame is None:
+            self.parse_errors += 1
+            return
+        # Frames count towards the line rate as one telemetry record each
+        self.meter.lines += 1
+        self.post(EVENT_FRAME, frame)
+
+    def handle_line(self, buf, start, end):
+        # Strip surrounding whitespace (including the firmware's \r)
+        while start < end and buf[start] <= 32:
+            start += 1
+        while end > start and buf[end - 1] <= 32:
+            end -= 1
+        if start == end:
+            return
+        self.meter.lines += 1
+
+        tag = buf.find(WIND_COUNT_TAG, start, end)
+        if tag >= 0:
+            try:
+                count = int(buf[tag + len(WIND_COUNT_TAG):end])
+                if buf[start + 1] == CHANNEL_SEPARATOR and 0x31 < buf[start] <= 0x39:
+                    self.post(EVENT_CHANNEL_COUNT, (buf[start] - 0x30, count))
+                else:
+                    self.post(EVENT_COUNT, count)
+            except ValueError:
+                self.parse_errors += 1
+
+        line = buf[start:end].decode("utf-8", "replace")
+        if self.line_hook:
+            self.line_hook(line)
+        self.post(EVENT_LINE, line)
+
+    def post(self, kind, payload):
+        # Block rather than drop so no reply is lost; the Tk thread drains
+        # the queue every frame so this only applies backpressure in bursts
+        while self.running:
+            try:
+                self.events.put((kind, payload), timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,49 @@
+"""Binary telemetry frames sent by firmware that supports "telemetry:bin".
+
+Frame layout, little endian, 19 bytes:
+
+    0xA5 0x5A            sync
+    uint32 wind count
+    uint32 timestamp     millis() on the ESP32
+    uint32 winder speed  current Hz
+    int32  traverse      current traverse position in steps
+    uint8  checksum      sum of the 16 payload bytes, mod 256
+
+The sync byte 0xA5 never appears in the firmware's ASCII text, so frames and
+text lines can share the link.
+"""
+import struct
+
+SYNC = b"\xa5\x5a"
+SYNC_BYTE = SYNC[0]
+FRAME = struct.Struct("<2sIIIiB")
+FRAME_SIZE = FRAME.size
+PAYLOAD_START = 2
+PAYLOAD_END = FRAME_SIZE - 1
+
+# Negotiation commands and the firmware's replies
+REQUEST_BINARY = "telemetry:bin"
+REQUEST_TEXT = "telemetry:text"
+REPLY_BINARY = "Telemetry mode: binary"
+REPLY_TEXT = "Telemetry mode: text"
+REPLY_UNSUPPORTED = "Unknown command: " + REQUEST_BINARY
+
+
+def checksum(buf, start, end):
+    with memoryview(buf) as view:
+        return sum(view[start:end]) & 0xFF
+
+
+def encode_frame(wind_count, timestamp_ms, winder_hz, traverse_position):
+    payload = struct.pack("<IIIi", wind_count & 0xFFFFFFFF, timestamp_ms & 0xFFFFFFFF,
+                          winder_hz & 0xFFFFFFFF, traverse_position)
+    return SYNC + payload + bytes([sum(payload) & 0xFF])
+
+
+def decode_frame(buf, offset):
+    # Returns (wind_count, timestamp_ms, winder_hz, traverse_position) or
+    # None when the checksum doesn't match
+    sync, count, timestamp, hz, traverse, check = FRAME.unpack_from(buf, offset)
+    if sync != SYNC or check != checksum(buf, offset + PAYLOAD_START, offset + PAYLOAD_END):
+        return None
+    return count, timestamp, hz, traverse
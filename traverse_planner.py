@@ -0,0 +1,231 @@
+"""Traverse limits and step timing from bobbin geometry, plus a coil build simulation.
+
+The firmware moves both traverse motors one step per controlBothTraverseMotors()
+call, pulsing each for `traverseStepDelay` microseconds, and waits 100 us
+between calls. One traverse step therefore takes about 2 x delay + 100 us.
+Only one t_speed value is active at a time, so scatter patterns are pushed
+as a new t_speed at each "Traverse: Changing direction" message.
+"""
+import array
+import math
+import random
+
+WINDER_STEPS_PER_REV = 3200
+TRAVERSE_STEPS_PER_REV = 3200     # 16 microsteps on a 200 step motor
+DEFAULT_LEAD_MM = 8.0             # T8 lead screw
+MAX_RIGHT_LIMIT = 12800
+LOOP_OVERHEAD_US = 100            # delayMicroseconds(100) after each step
+STEPS_PER_PASS = 5                # Traverse steps per loop() pass
+MIN_STEP_DELAY = 20
+MAX_STEP_DELAY = 65535
+SLOWDOWN_WINDS = 111
+SLOWDOWN_FLOOR = 0.1
+
+# Approximate overall diameter of heavy-build enamelled magnet wire (mm)
+WIRE_DIAMETERS = {
+    41: 0.0792,
+    42: 0.0711,
+    43: 0.0635,
+    44: 0.0584,
+    45: 0.0508,
+    46: 0.0457,
+}
+
+# Layers of turns-per-layer multipliers; level winding uses (1.0,)
+SCATTER_PATTERNS = {
+    "level": (1.0,),
+    "alternating": (1.0, 0.8, 1.2, 0.9, 1.1),
+    "random": None,
+}
+
+
+def wire_diameter(awg):
+    try:
+        return WIRE_DIAMETERS[int(awg)]
+    except (KeyError, ValueError):
+        # Standard AWG formula for bare copper plus ~12% for insulation
+        return 0.127 * 92 ** ((36 - float(awg)) / 39.0) * 1.12
+
+
+def step_period_us(delay):
+    # The firmware timing model: both traverse pulses plus the pause
+    return 2.0 * delay + LOOP_OVERHEAD_US
+
+
+def step_delay_for(steps_per_sec):
+    # Inverse of step_period_us()
+    if steps_per_sec <= 0:
+        return MAX_STEP_DELAY
+    period_us = 1e6 / steps_per_sec
+    return int(round((period_us - LOOP_OVERHEAD_US) / 2.0))
+
+
+def steps_per_sec_for(delay):
+    return 1e6 / step_period_us(delay)
+
+
+class TraversePlan:
+    def __init__(self, left_limit, right_limit, layer_delays, turns_per_layer, warnings):
+        self.left_limit = left_limit
+        self.right_limit = right_limit
+        # One t_speed value per layer; the pattern repeats after the last
+        self.layer_delays = layer_delays
+        self.turns_per_layer = turns_per_layer
+        self.warnings = warnings
+        self.layer = 0
+        self.profile = None
+        self.wire_length_m = 0.0
+        self.layers = 0
+
+    def first_delay(self):
+        return self.layer_delays[0]
+
+    def next_delay(self):
+        # Delay for the layer that starts at the next direction change
+        self.layer += 1
+        return self.layer_delays[self.layer % len(self.layer_delays)]
+
+    def restart(self):
+        self.layer = 0
+
+
+class TraversePlanner:
+    def __init__(self, bobbin_width_mm=9.0, awg=42, lead_mm=DEFAULT_LEAD_MM, left_offset_mm=0.0,
+                 core_length_mm=58.0, core_width_mm=11.0):
+        self.bobbin_width_mm = bobbin_width_mm
+        self.awg = awg
+        self.wire_mm = wire_diameter(awg)
+        self.lead_mm = lead_mm
+        self.left_offset_mm = left_offset_mm
+        self.core_length_mm = core_length_mm
+        self.core_width_mm = core_width_mm
+        self.steps_per_mm = TRAVERSE_STEPS_PER_REV / lead_mm
+
+    def limits(self):
+        left = int(round(self.left_offset_mm * self.steps_per_mm))
+        right = int(round((self.left_offset_mm + self.bobbin_width_mm) * self.steps_per_mm))
+        return left, right
+
+    def layer_multipliers(self, scatter, layers, seed=0):
+        if scatter == "random":
+            rng = random.Random(seed)
+            return [rng.uniform(0.75, 1.25) for _ in range(max(layers, 1))]
+        return list(SCATTER_PATTERNS.get(scatter, (1.0,)))
+
+    def plan(self, target_turns, winder_hz, turns_per_layer=None, scatter="level", seed=0):
+        warnings = []
+        left, right = self.limits()
+        if left < 0:
+            raise ValueError(f"Left limit {left} is behind the traverse home position")
+        if right > MAX_RIGHT_LIMIT:
+            # Clamping would wind the whole coil into a narrower sweep
+            raise ValueError(f"Right limit {right} exceeds the firmware maximum of {MAX_RIGHT_LIMIT}: "
+                             f"the bobbin doesn't fit at a {self.left_offset_mm:g} mm offset")
+        if right - left <= 0:
+            raise ValueError("The bobbin is narrower than one traverse step")
+        if winder_hz <= 0 or target_turns <= 0:
+            raise ValueError("The winder speed and target must be positive")
+
+        if not turns_per_layer:
+            # Level wind: one wire diameter of travel per turn
+            turns_per_layer = self.bobbin_width_mm / self.wire_mm
+        winder_rev_per_sec = winder_hz / float(WINDER_STEPS_PER_REV)
+        span_steps = right - left
+        layer_estimate = int(math.ceil(target_turns / turns_per_layer))
+
+        delays = array.array("H")
+        for multiplier in self.layer_multipliers(scatter, layer_estimate, seed):
+            layer_turns = turns_per_layer * multiplier
+            layer_seconds = layer_turns / winder_rev_per_sec
+            delay = step_delay_for(span_steps / layer_seconds)
+            if delay < MIN_STEP_DELAY:
+                warnings.append(f"Traverse can't keep up: needs a {delay} us step delay, "
+                                f"using the {MIN_STEP_DELAY} us minimum")
+                delay = MIN_STEP_DELAY
+            delays.append(min(delay, MAX_STEP_DELAY))
+
+        plan = TraversePlan(left, right, delays, turns_per_layer, warnings)
+        self.simulate(plan, target_turns, winder_hz)
+        return plan
+
+    def simulate(self, plan, target_turns, winder_hz, bins=50):
+        # Predicts the build height across the bobbin and the total wire
+        # length, including the wider pitch of the end-of-coil slowdown when
+        # the winder slows but the traverse does not
+        bin_width = self.bobbin_width_mm / bins
+        heights = [0.0] * bins
+        wire_area = self.wire_mm * self.wire_mm
+        core_perimeter = 2.0 * (self.core_length_mm + self.core_width_mm)
+        span_mm = (plan.right_limit - plan.left_limit) / self.steps_per_mm
+        winder_rev_per_sec = winder_hz / float(WINDER_STEPS_PER_REV)
+
+        turns_done = 0.0
+        length_mm = 0.0
+        layer = 0
+        while turns_done < target_turns:
+            delay = plan.layer_delays[layer % len(plan.layer_delays)]
+            traverse_mm_per_sec = steps_per_sec_for(delay) / self.steps_per_mm
+            layer_seconds = span_mm / traverse_mm_per_sec
+            full_speed_turns = layer_seconds * winder_rev_per_sec
+
+            # Turns that fit in one full pass, fewer once the winder slows
+            # down for the end of the coil (factor taken at the pass midpoint)
+            remaining = target_turns - turns_done
+            slow_start = max(target_turns - SLOWDOWN_WINDS, 0)
+            if turns_done + full_speed_turns > slow_start:
+                fast = max(slow_start - turns_done, 0.0)
+                midpoint = max(turns_done, slow_start) + (full_speed_turns - fast) / 2.0
+                factor = max((target_turns - midpoint) / SLOWDOWN_WINDS, SLOWDOWN_FLOOR)
+                pass_turns = fast + (full_speed_turns - fast) * factor
+            else:
+                pass_turns = full_speed_turns
+            if pass_turns <= 0:
+                # No progress would ever be made
+                raise ValueError("A traverse pass winds no turns at this speed")
+
+            # The last pass may stop part way across
+            if remaining < pass_turns:
+                layer_turns = remaining
+                coverage = remaining / pass_turns
+            else:
+                layer_turns = pass_turns
+                coverage = 1.0
+            covered_bins = max(1, int(round(bins * coverage)))
+            per_bin_turns = layer_turns / covered_bins
+            if layer % 2:
+                covered = range(bins - covered_bins, bins)
+            else:
+                covered = range(covered_bins)
+            growth = per_bin_turns * wire_area / bin_width
+            mean_height = sum(heights[i] for i in covered) / covered_bins
+            length_mm += layer_turns * (core_perimeter + 2.0 * math.pi * (mean_height + growth / 2.0))
+            for i in covered:
+                heights[i] += growth
+
+            turns_done += layer_turns
+            layer += 1
+
+        plan.profile = array.array("d", heights)
+        plan.wire_length_m = length_mm / 1000.0
+        plan.layers = layer
+        return plan
+
+
+class PlanTable:
+    # Plans precomputed for a set of winder speeds so switching is a lookup
+    def __init__(self, planner, target_turns, speeds, turns_per_layer=None, scatter="level", seed=0):
+        self.planner = planner
+        self.target_turns = target_turns
+        self.turns_per_layer = turns_per_layer
+        self.scatter = scatter
+        self.seed = seed
+        self.plans = {}
+        for speed in speeds:
+            self.get(speed)
+
+    def get(self, winder_hz):
+        plan = self.plans.get(winder_hz)
+        if plan is None:
+            plan = self.planner.plan(self.target_turns, winder_hz, self.turns_per_layer, self.scatter, self.seed)
+            self.plans[winder_hz] = plan
+        return plan
@@ -0,0 +1,562 @@
+"""Serial client for the winder with no GUI dependencies, plus the ``wind`` command.
+
+    wind --port /dev/ttyUSB0 --turns 5000 --speed 150000 --wait
+    python winder_client.py --list
+
+WinderClient does everything the GUI's controls do: it validates setpoints
+the same way, sends each command through a CommandPipeline and waits for
+the firmware's reply, and tracks the wind count from text or binary
+telemetry. Port enumeration is imported only when it is needed, so
+scripted runs start quickly.
+
+With supervise=True a dropped or silent link is reconnected with backoff
+and the device is given its setpoints again, like the GUI does. With
+resume=True as well, a coil the device lost count of after a restart is
+continued from the last count seen.
+"""
+import argparse
+import collections
+import queue
+import sys
+import threading
+import time
+
+import serial
+
+from serial_reader import SerialLineReader, EVENT_COUNT, EVENT_FRAME, EVENT_LINE, EVENT_ERROR
+from command_pipeline import CommandPipeline, RESULT_SENT, RESULT_ACK, RESULT_NACK, RESULT_TIMEOUT, \
+    RESULT_ERROR, ack_for
+from telemetry import REQUEST_BINARY, REPLY_BINARY
+from link_supervisor import LinkSupervisor, setpoint_commands, reconcile_count, STATE_DOWN, \
+    POLL_RECONNECTED, COUNT_LOST
+
+BAUD_RATE = 115200
+MAX_RIGHT_LIMIT = 12800
+
+# How long connect() keeps probing a board that is still booting (seconds)
+READY_TIMEOUT = 5.0
+
+# The firmware prints "All motors stopped" just before "Target wind count
+# reached"; how long to wait for the second line after the first (seconds)
+STOP_GRACE = 0.25
+
+# How often the supervisor thread checks the link (seconds)
+SUPERVISE_INTERVAL = 0.1
+
+# Recent lines kept for callers that want to show what the firmware said
+LINE_HISTORY = 200
+
+# Motor states, as shown by the GUI
+STATUS_STOPPED = "STOPPED"
+STATUS_STARTING = "STARTING"
+STATUS_RUNNING = "RUNNING"
+STATUS_COMPLETE = "COMPLETE"
+STATUS_DISABLED = "DISABLED"
+
+
+class WinderError(Exception):
+    pass
+
+
+# Setpoint checks shared with the GUI's set_* methods and recipes. Each takes
+# a string or number and returns the int to send, or raises ValueError with
+# the message to show.
+def parse_int(value, invalid):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(invalid)
+
+
+def parse_wind_count(value):
+    count = parse_int(value, "Invalid wind count value")
+    if count <= 0:
+        raise ValueError("Wind count must be greater than 0")
+    return count
+
+
+def parse_winder_speed(value):
+    speed = parse_int(value, "Invalid speed value")
+    if speed <= 0:
+        raise ValueError("Speed must be greater than 0")
+    return speed
+
+
+def parse_traverse_delay(value):
+    delay = parse_int(value, "Invalid delay value")
+    if delay <= 0:
+        raise ValueError("Delay must be greater than 0")
+    return delay
+
+
+def parse_left_limit(value):
+    limit = parse_int(value, "Invalid limit value")
+    if limit < 0:
+        raise ValueError("Left limit cannot be negative")
+    return limit
+
+
+def parse_right_limit(value):
+    limit = parse_int(value, "Invalid limit value")
+    if limit <= 0 or limit > MAX_RIGHT_LIMIT:
+        raise ValueError(f"Right limit must be between 1 and {MAX_RIGHT_LIMIT}")
+    return limit
+
+
+def list_ports():
+    # Enumerating ports is slow on some machines, so only pay for it here
+    import serial.tools.list_ports
+    return serial.tools.list_ports.comports()
+
+
+class ClientReader(SerialLineReader):
+    # Hands every event straight to the client on the reader thread
+    def __init__(self, conn, handler):
+        super().__init__(conn)
+        self.handler = handler
+
+    def post(self, kind, payload):
+        self.handler(kind, payload)
+
+
+class WinderClient:
+    def __init__(self, port, baud=BAUD_RATE, supervise=False, resume=False):
+        self.port = port
+        self.baud = baud
+        self.conn = None
+        self.reader = None
+        self.pipeline = None
+        self.thread = None
+        self.connected = False
+        self.error = ""
+
+        # Link supervision; the supervisor is only touched on its own thread,
+        # the reader thread reports to it through the flags below
+        self.supervisor = LinkSupervisor(self.reopen, self.close_link) if supervise else None
+        self.resume = resume
+        self.supervisor_thread = None
+        self.supervising = False
+        self.wake = threading.Event()
+        self.link_error = ""
+        self.restarted = False
+        self.awaiting_count = False
+        self.reconciled_at = None
+        self.count_offset = 0
+
+        # Device state, updated on the reader thread under `condition`
+        self.condition = threading.Condition()
+        self.wind_count = 0
+        self.desired_wind_count = 1000
+        self.winder_speed = 150000
+        self.traverse_delay = 500
+        self.left_limit = 0
+        self.right_limit = 6400
+        self.motor_status = STATUS_STOPPED
+        self.telemetry_mode = "text"
+        self.lines = collections.deque(maxlen=LINE_HISTORY)
+        # Optional callable given every text line on the reader thread
+        self.line_hook = None
+
+    # Connection
+    def open_link(self):
+        self.conn = serial.Serial(self.port, self.baud, timeout=0.1)
+        self.reader = ClientReader(self.conn, self.handle_event)
+        self.pipeline = CommandPipeline(self.conn.write).start()
+        self.reader.line_hook = self.pipeline.handle_line
+        self.connected = True
+        self.error = ""
+        self.thread = threading.Thread(target=self.read_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def connect(self, ready_timeout=READY_TIMEOUT, binary=True):
+        self.open_link()
+
+        # Opening the port resets most ESP32 boards, and anything sent while
+        # they boot is lost; probe until the firmware answers. The telemetry
+        # request doubles as the probe, and older firmware rejecting it
+        # still shows the board is up.
+        self.reader.enable_frames(binary)
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            request = REQUEST_BINARY if binary else "telemetry:text"
+            kind, _ = self.command(request, check=False)
+            if kind in (RESULT_ACK, RESULT_NACK):
+                break
+            if time.monotonic() >= deadline or not self.connected:
+                self.close()
+                raise WinderError(f"No reply from {self.port}")
+
+        if self.supervisor:
+            # The boot banner seen while probing is not a restart
+            self.restarted = False
+            self.supervisor.started(time.monotonic(), self.reader.meter.bytes)
+            self.supervising = True
+            self.supervisor_thread = threading.Thread(target=self.supervise)
+            self.supervisor_thread.daemon = True
+            self.supervisor_thread.start()
+        return self
+
+    def read_loop(self):
+        while self.connected:
+            try:
+                self.reader.pump()
+            except Exception as e:
+                with self.condition:
+                    self.error = f"Serial connection error: {str(e)}"
+                    self.link_error = self.error
+                    self.connected = False
+                    self.condition.notify_all()
+                break
+
+    def close_link(self):
+        self.connected = False
+        if self.reader:
+            self.reader.stop()
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1)
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+        with self.condition:
+            self.awaiting_count = False
+            self.condition.notify_all()
+
+    def close(self):
+        self.supervising = False
+        self.wake.set()
+        if self.supervisor_thread and self.supervisor_thread is not threading.current_thread():
+            self.supervisor_thread.join(timeout=1)
+        if self.supervisor:
+            self.supervisor.stopped()
+        self.close_link()
+
+    @property
+    def online(self):
+        # Supervised clients stay online while they reconnect
+        return self.connected or (self.supervisor is not None and self.supervisor.state != STATE_DOWN)
+
+    # Supervision
+    def supervise(self):
+        while self.supervising:
+            now = time.monotonic()
+            supervisor = self.supervisor
+            if self.link_error:
+                reason, self.link_error = self.link_error, ""
+                supervisor.lost(reason, now)
+            if self.restarted:
+                self.restarted = False
+                supervisor.device_restarted(now)
+                self.resync()
+            if self.reconciled_at is not None:
+                supervisor.resynced(self.reconciled_at)
+                self.reconciled_at = None
+            result = supervisor.poll(now, self.reader.meter.bytes if self.connected else 0)
+            if result == POLL_RECONNECTED or supervisor.reconcile_overdue(now):
+                self.resync()
+            with self.condition:
+                self.condition.notify_all()
+            self.wake.wait(SUPERVISE_INTERVAL)
+
+    def reopen(self):
+        try:
+            self.open_link()
+        except Exception as e:
+            self.error = f"Reconnecting: {str(e)}"
+            return False
+        return True
+
+    def resync(self):
+        # Put the device back into the state the client holds; the first
+        # count it reports afterwards is reconciled in update_count()
+        self.supervisor.begin_resync(time.monotonic())
+        with self.condition:
+            self.awaiting_count = True
+            commands = setpoint_commands(self.desired_wind_count, self.winder_speed, self.traverse_delay,
+                                         self.left_limit, self.right_limit, self.count_offset)
+            if self.telemetry_mode == "binary":
+                self.reader.enable_frames(True)
+                commands.append(REQUEST_BINARY)
+        for command in commands:
+            self.pipeline.submit(command)
+
+    def reconcile(self, raw):
+        # Caller holds the condition
+        self.awaiting_count = False
+        last = self.wind_count
+        if reconcile_count(last, raw + self.count_offset) == COUNT_LOST:
+            running = self.motor_status in (STATUS_STARTING, STATUS_RUNNING)
+            if self.resume and 0 < last < self.desired_wind_count:
+                self.count_offset = last - raw
+                self.pipeline.submit(f"N{max(self.desired_wind_count - self.count_offset, 1)}")
+                if running:
+                    self.pipeline.submit("S")
+                    self.motor_status = STATUS_STARTING
+            else:
+                self.count_offset = 0
+                if running:
+                    self.motor_status = STATUS_STOPPED
+        elif raw + self.count_offset >= self.desired_wind_count and self.motor_status == STATUS_RUNNING:
+            # The coil finished while the link was down
+            self.motor_status = STATUS_COMPLETE
+        self.reconciled_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Incoming data
+    def handle_event(self, kind, payload):
+        with self.condition:
+            if kind == EVENT_COUNT:
+                self.update_count(payload)
+            elif kind == EVENT_FRAME:
+                self.update_count(payload[0])
+            elif kind == EVENT_LINE:
+                self.handle_line(payload)
+            elif kind == EVENT_ERROR:
+                self.error = payload
+            self.condition.notify_all()
+        if kind == EVENT_LINE and self.line_hook:
+            self.line_hook(payload)
+
+    def update_count(self, raw):
+        # Caller holds the condition
+        if self.awaiting_count:
+            self.reconcile(raw)
+        self.wind_count = raw + self.count_offset
+
+    def handle_line(self, line):
+        # Caller holds the condition
+        self.lines.append(line)
+        if line == "All motors running":
+            self.motor_status = STATUS_RUNNING
+        elif line.startswith("All motors stopped"):
+            self.motor_status = STATUS_STOPPED
+        elif line.startswith("All motors disabled"):
+            self.motor_status = STATUS_DISABLED
+        elif line.startswith("Target wind count reached"):
+            try:
+                self.wind_count = int(line.rsplit(":", 1)[1]) + self.count_offset
+            except (ValueError, IndexError):
+                pass
+            self.motor_status = STATUS_COMPLETE
+        elif line.startswith("Wind count reset"):
+            self.wind_count = 0
+        elif line.startswith("Desired wind count set to"):
+            try:
+                self.desired_wind_count = int(line.rsplit(" ", 1)[1]) + self.count_offset
+            except ValueError:
+                pass
+        elif line == REPLY_BINARY:
+            self.telemetry_mode = "binary"
+        elif line == "System initialized" and self.supervisor:
+            self.restarted = True
+
+    # Commands
+    def command(self, command, check=True):
+        # Sends one command and waits for the firmware's reply. Returns
+        # (result kind, reply line); with check=True a rejected or
+        # unanswered command raises WinderError instead.
+        if not self.connected:
+            raise WinderError(self.error or "Not connected to device")
+        self.pipeline.submit(command)
+        reply, _ = ack_for(command)
+        while True:
+            try:
+                kind, sent, detail, _ = self.pipeline.results.get(timeout=0.5)
+            except queue.Empty:
+                if not self.connected:
+                    raise WinderError(self.error or "Connection lost")
+                continue
+            # Results for commands sent without waiting are skipped
+            if sent != command or (kind == RESULT_SENT and reply):
+                continue
+            if check and kind == RESULT_NACK:
+                raise WinderError(f"'{command}' rejected: {detail}")
+            if check and kind == RESULT_TIMEOUT:
+                raise WinderError(f"No reply to '{command}'")
+            if check and kind == RESULT_ERROR:
+                raise WinderError(f"Failed to send '{command}': {detail}")
+            return kind, detail
+
+    def set_wind_count(self, value):
+        count = parse_wind_count(value)
+        # The device only counts the turns since its last restart
+        self.command(f"N{max(count - self.count_offset, 1)}")
+        self.desired_wind_count = count
+
+    def set_winder_speed(self, value):
+        speed = parse_winder_speed(value)
+        self.command(f"w_speed:{speed}")
+        self.winder_speed = speed
+
+    def set_traverse_delay(self, value):
+        delay = parse_traverse_delay(value)
+        self.command(f"t_speed:{delay}")
+        self.traverse_delay = delay
+
+    def set_left_limit(self, value):
+        limit = parse_left_limit(value)
+        self.command(f"t_leftlimit:{limit}")
+        self.left_limit = limit
+
+    def set_right_limit(self, value):
+        limit = parse_right_limit(value)
+        self.command(f"t_rightlimit:{limit}")
+        self.right_limit = limit
+
+    def start_motors(self):
+        with self.condition:
+            self.motor_status = STATUS_STARTING
+        self.command("S")
+
+    def stop_motors(self):
+        # The firmware stays silent when the motors were already stopped
+        kind, _ = self.command("T", check=False)
+        if kind == RESULT_TIMEOUT:
+            with self.condition:
+                self.motor_status = STATUS_STOPPED
+        elif kind != RESULT_ACK:
+            raise WinderError("Failed to stop motors")
+
+    def reset_counter(self):
+        self.command("R")
+        with self.condition:
+            offset, self.count_offset = self.count_offset, 0
+            self.wind_count = 0
+        if offset:
+            # The device holds a target shortened by the resumed count
+            self.command(f"N{self.desired_wind_count}")
+
+    def reset_traverse_home(self):
+        self.command("t_home")
+
+    def disable_all_motors(self):
+        self.command("disable_all_motors")
+
+    def wait_until_done(self, timeout=None, progress=None, interval=1.0):
+        # Blocks until the coil completes, the motors stop, or the link
+        # drops; progress(count, target) is called every `interval` seconds.
+        # Returns the final motor status.
+        deadline = time.monotonic() + timeout if timeout else None
+        next_progress = time.monotonic()
+        with self.condition:
+            while self.online and self.motor_status in (STATUS_STARTING, STATUS_RUNNING):
+                now = time.monotonic()
+                if progress and now >= next_progress:
+                    progress(self.wind_count, self.desired_wind_count)
+                    next_progress = now + interval
+                if deadline and now >= deadline:
+                    raise WinderError("Timed out waiting for the coil to finish")
+                wait = next_progress - now if progress else 0.5
+                self.condition.wait(max(min(wait, 0.5), 0.01))
+            if not self.online:
+                raise WinderError(self.error or "Connection lost")
+            if self.motor_status == STATUS_STOPPED:
+                self.condition.wait_for(lambda: self.motor_status != STATUS_STOPPED, STOP_GRACE)
+            return self.motor_status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="wind", description="Wind a coil from the command line")
+    parser.add_argument("--port", help="Serial port (default: the last one used, or the only one found)")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    parser.add_argument("--list", action="store_true", help="List serial ports and exit")
+    parser.add_argument("--turns", help="Desired wind count")
+    parser.add_argument("--speed", help="Winder speed in Hz")
+    parser.add_argument("--delay", help="Traverse step delay in microseconds")
+    parser.add_argument("--left", help="Left sweep limit in steps")
+    parser.add_argument("--right", help="Right sweep limit in steps")
+    parser.add_argument("--home", action="store_true", help="Reset the traverse position to home first")
+    parser.add_argument("--reset", action="store_true", help="Reset the wind count first")
+    parser.add_argument("--start", action="store_true", help="Start the motors")
+    parser.add_argument("--wait", action="store_true", help="Start the motors and wait for the target")
+    parser.add_argument("--stop", action="store_true", help="Stop the motors")
+    parser.add_argument("--timeout", type=float, help="Give up waiting after this many seconds")
+    parser.add_argument("--reconnect", action="store_true",
+                        help="Reconnect after serial faults and carry on with the coil")
+    parser.add_argument("--quiet", action="store_true", help="Don't print progress")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for port in list_ports():
+            print(f"{port.device}\t{port.description}")
+        return 0
+
+    # Check every setpoint before touching the device
+    setpoints = [
+        ("set_wind_count", args.turns, parse_wind_count),
+        ("set_winder_speed", args.speed, parse_winder_speed),
+        ("set_traverse_delay", args.delay, parse_traverse_delay),
+        ("set_left_limit", args.left, parse_left_limit),
+        ("set_right_limit", args.right, parse_right_limit),
+    ]
+    try:
+        setpoints = [(method, parse(value)) for method, value, parse in setpoints if value is not None]
+    except ValueError as e:
+        parser.error(str(e))
+
+    port = args.port
+    if not port:
+        # The winder the GUI last connected to, else the only port there is
+        from port_discovery import PortInfo, load_last_port, find_port
+        ports = [PortInfo.from_list_port(p) for p in list_ports()]
+        match = find_port(ports, load_last_port())
+        if match:
+            port = match.device
+        elif len(ports) == 1:
+            port = ports[0].device
+        else:
+            parser.error("--port is required when there isn't exactly one serial port")
+
+    say = (lambda text: None) if args.quiet else print
+    client = WinderClient(port, args.baud, supervise=args.reconnect, resume=args.reconnect)
+    try:
+        client.connect()
+        if args.stop:
+            client.stop_motors()
+        for method, value in setpoints:
+            getattr(client, method)(value)
+        if args.reset:
+            client.reset_counter()
+        if args.home:
+            client.reset_traverse_home()
+        if not (args.start or args.wait):
+            return 0
+
+        client.start_motors()
+        say(f"Winding {client.desired_wind_count} turns on {port}")
+        if not args.wait:
+            return 0
+        status = client.wait_until_done(args.timeout,
+                                        lambda count, target: say(f"Wind count: {count}/{target}"))
+        say(f"{status}: {client.wind_count} turns")
+        return 0 if status == STATUS_COMPLETE else 2
+    except WinderError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except serial.SerialException as e:
+        print(f"Error: Failed to connect: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        # Don't leave the winder running unattended
+        if client.connected:
+            try:
+                client.stop_motors()
+            except WinderError:
+                pass
+        return 130
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Load-test harness for the serial link, run against winder_sim or real hardware.
+
+    python winder_loadtest.py throughput --seconds 10
+    python winder_loadtest.py latency --count 200
+    python winder_loadtest.py soak --hours 3 --target 500
+"""
+import argparse
+import queue
+import time
+
+import serial
+
+from serial_reader import SerialLineReader
+from telemetry import REQUEST_BINARY
+from winder_sim import VirtualWinder
+
+
+def open_port(args):
+    sim = None
+    port = args.port
+    if not port:
+        sim = VirtualWinder(baud=args.baud, firehose=getattr(args, "firehose", False)).start()
+        port = sim.port
+    conn = serial.Serial(port, 115200, timeout=1)
+    return sim, conn
+
+
+def parse_line(raw, state):
+    # Same decoding and parsing that monitor_serial applies to each line
+    line = raw.decode("utf-8").strip()
+    if line and "Wind Count:" in line:
+        try:
+            state["count"] = int(line.split("Wind Count:")[1].strip())
+        except (ValueError, IndexError):
+            state["parse_errors"] += 1
+    return line
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def wait_for(conn, prefix, state, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        raw = conn.readline()
+        if not raw:
+            continue
+        line = parse_line(raw, state)
+        if line.startswith(prefix):
+            return line
+    return None
+
+
+def run_throughput(args):
+    args.firehose = True
+    sim, conn = open_port(args)
+    state = {"count": 0, "parse_errors": 0}
+    lines = 0
+    nbytes = 0
+    start = time.monotonic()
+    try:
+        if args.binary:
+            conn.write(f"{REQUEST_BINARY}\n".encode())
+        if args.reader == "chunked":
+            reader = SerialLineReader(conn)
+            reader.enable_frames(args.binary)
+            while time.monotonic() - start < args.seconds:
+                reader.pump()
+                # Drain like the Tk thread would
+                while True:
+                    try:
+                        reader.events.get_nowait()
+                    except queue.Empty:
+                        break
+            lines = reader.meter.lines
+            nbytes = reader.meter.bytes
+            state["parse_errors"] = reader.parse_errors
+        else:
+            while time.monotonic() - start < args.seconds:
+                raw = conn.readline()
+                if raw:
+                    lines += 1
+                    nbytes += len(raw)
+                    parse_line(raw, state)
+    finally:
+        conn.close()
+        if sim:
+            sim.close()
+    elapsed = time.monotonic() - start
+    print(f"Ingest ({args.reader}{', binary' if args.binary else ''}): {lines / elapsed:.0f} lines/s, {nbytes / elapsed:.0f} bytes/s "
+          f"({lines} lines in {elapsed:.1f}s, {state['parse_errors']} parse errors)")
+
+
+def run_latency(args):
+    sim, conn = open_port(args)
+    state = {"count": 0, "parse_errors": 0}
+    samples = []
+    lost = 0
+    try:
+        time.sleep(0.2)
+        conn.reset_input_buffer()
+        for i in range(args.count):
+            speed = 100000 + i
+            sent = time.monotonic()
+            conn.write(f"w_speed:{speed}\n".encode())
+            if wait_for(conn, "Winder speed set to", state) is None:
+                lost += 1
+            else:
+                samples.append((time.monotonic() - sent) * 1000.0)
+    finally:
+        conn.close()
+        if sim:
+            sim.close()
+    print(f"Round trip over {len(samples)} commands ({lost} lost): "
+          f"p50 {percentile(samples, 50):.2f} ms, p95 {percentile(samples, 95):.2f} ms, "
+          f"p99 {percentile(samples, 99):.2f} ms, max {max(samples or [0]):.2f} ms")
+
+
+def run_soak(args):
+    sim, conn = open_port(args)
+    state = {"count": 0, "parse_errors": 0}
+    coils = 0
+    failures = 0
+    deadline = time.monotonic() + args.hours * 3600
+    try:
+        conn.write(f"w_speed:{args.speed}\n".encode())
+        wait_for(conn, "Winder speed set to", state)
+        conn.write(f"N{args.target}\n".encode())
+        wait_for(conn, "Desired wind count set to", state)
+        while time.monotonic() < deadline:
+            conn.write(b"R\n")
+            wait_for(conn, "Wind count reset", state)
+            coil_start = time.monotonic()
+            conn.write(b"S\n")
+            done = wait_for(conn, "Target wind count reached", state, timeout=args.coil_timeout)
+            coils += 1
+            if done is None or int(done.split(":")[1]) != args.target:
+                failures += 1
+                print(f"Coil {coils}: FAILED ({done!r})")
+            else:
+                print(f"Coil {coils}: {args.target} winds in {time.monotonic() - coil_start:.1f}s, "
+                      f"{state['parse_errors']} parse errors so far")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+        if sim:
+            sim.close()
+    print(f"Soak finished: {coils} coils, {failures} failures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial link load tests")
+    parser.add_argument("--port", help="Serial port to test; defaults to a fresh virtual winder")
+    parser.add_argument("--baud", type=int, default=115200, help="Virtual winder link rate")
+    sub = parser.add_subparsers(dest="test", required=True)
+
+    throughput = sub.add_parser("throughput", help="Telemetry ingest rate in firehose mode")
+    throughput.add_argument("--seconds", type=float, default=10)
+    throughput.add_argument("--reader", choices=["chunked", "readline"], default="chunked",
+                            help="Chunked SerialLineReader or the old one-readline-per-line loop")
+    throughput.add_argument("--binary", action="store_true",
+                            help="Request binary telemetry frames (chunked reader only)")
+    throughput.set_defaults(func=run_throughput)
+
+    latency = sub.add_parser("latency", help="Command round-trip latency")
+    latency.add_argument("--count", type=int, default=200)
+    latency.set_defaults(func=run_latency)
+
+    soak = sub.add_parser("soak", help="Wind coils back to back for a long time")
+    soak.add_argument("--hours", type=float, default=1.0)
+    soak.add_argument("--target", type=int, default=500)
+    soak.add_argument("--speed", type=int, default=150000)
+    soak.add_argument("--coil-timeout", type=float, default=600)
+    soak.set_defaults(func=run_soak)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,653 @@
+"""Headless virtual winder that speaks the firmware serial protocol on a pty.
+
+Run it with ``python winder_sim.py`` and point the GUI (or ``serial.Serial``)
+at the printed port path.
+
+For reconnect testing it can inject faults: drop the link (the pty goes
+away and comes back, like a USB glitch), restart the firmware (a brownout)
+or go silent. Use --link for a stable path that follows the new pty.
+
+With --magnet-arc the hall sensor is only read once per loop() pass like
+the real firmware does, so at high speed it misses magnet passes.
+
+Both channels are simulated: commands prefixed "2:" drive the second
+winder and traverse, which count, slow down and finish on their own (see
+channels.py). Channel 1's state is also readable as the winder's own,
+e.g. sim.wind_count.
+"""
+import argparse
+import fcntl
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from telemetry import encode_frame, REQUEST_BINARY, REQUEST_TEXT, REPLY_BINARY, REPLY_TEXT
+from decel_profile import DecelProfile, MAX_POINTS, PROFILE_PREFIX, PROFILE_OFF
+from count_estimator import stepper_hz
+from channels import CHANNELS, channel_prefix, split_channel
+from traverse_planner import step_period_us, STEPS_PER_PASS
+
+# Firmware constants (see 4_Motor_Pickup_Winder.ino)
+STEPS_PER_REVOLUTION = 3200
+SLOWDOWN_WINDS = 111
+SLOWDOWN_FLOOR = 0.1
+WINDER_ACCELERATION = 20000
+STATUS_PRINT_INTERVAL = 1.0
+MAX_RIGHT_LIMIT = 12800
+
+# startMotors() steps the traverse 50 times, 5.3 ms apart, then pauses 1 s
+# before the winder starts; the other channel keeps winding meanwhile
+START_TIME = 50 * 0.0053 + 1.0
+
+# Time from a reset to "System initialized" (delay(1000) in setup())
+BOOT_TIME = 1.0
+
+# Kinds of fault the simulator can inject
+FAULT_DROP = "drop"
+FAULT_BROWNOUT = "brownout"
+FAULT_HANG = "hang"
+FAULTS = (FAULT_DROP, FAULT_BROWNOUT, FAULT_HANG)
+
+# Time for one loop() pass while idle; when running it lasts five traverse
+# steps of the first running channel
+IDLE_LOOP_TIME = 0.00005
+
+BANNER = [
+    "System initialized",
+    "Available commands:",
+    "  S             -> Start motors",
+    "  T             -> Stop motors",
+    "  R             -> Reset wind count",
+    "  N<number>     -> Set desired wind count",
+    "  w_speed:<Hz>  -> Set winder speed in Hz",
+    "  t_speed:<us>  -> Set traverse step delay (µs)",
+    "  t_leftlimit:X -> Set left sweep limit (steps)",
+    "  t_rightlimit:X -> Set right sweep limit (steps)",
+    "  t_home        -> Reset traverse position to 0 (home)",
+    "  disable_all_motors -> Disable all motors",
+    "  telemetry:bin / telemetry:text -> Binary or text wind count telemetry",
+    "  decel:<span>,<p0>,... / decel:off -> Slowdown profile (permille of speed)",
+    "  2:<command>   -> Send S, T, R, N, w_speed, t_*, decel to winder 2",
+]
+
+
+def slowdown_factor(remaining):
+    # Same linear ramp as updateWinderSpeed()
+    if remaining > SLOWDOWN_WINDS:
+        return 1.0
+    return max(remaining / float(SLOWDOWN_WINDS), SLOWDOWN_FLOOR)
+
+
+class SimChannel:
+    # One winder, traverse and hall sensor with the firmware's per-channel
+    # globals. Lines about channel 2 are printed with its "2:" prefix.
+    def __init__(self, winder, channel):
+        self.winder = winder
+        self.channel = channel
+        self.prefix = channel_prefix(channel)
+        self.missed_pulses = 0
+        # Turns actually on the bobbin; unlike wind_count this survives a
+        # brownout, so tests can check a resumed coil got exactly its target
+        self.bobbin_turns = 0
+        self.reset()
+
+    def reset(self):
+        # Power-on state of the channel's globals
+        self.motors_running = False
+        self.addressed = False
+        self.wind_count = 0
+        self.desired_wind_count = 1000
+        self.winder_speed = 150000
+        self.traverse_step_delay = 500
+        self.left_limit = 0
+        self.right_limit = 6400
+        self.traverse_moving_right = True
+        self.traverse_position = 0.0
+        self.decel_profile = None
+
+        # Physical model
+        self.current_hz = 0.0
+        self.revolutions = 0.0
+        self.magnet_passes = 0
+        self.start_done_at = None
+
+    def println(self, text):
+        self.winder.println(self.prefix + text)
+
+    def send_telemetry(self, text_prefix):
+        # Binary frames only ever carry channel 1
+        if self.channel == CHANNELS[0]:
+            self.winder.send_telemetry(text_prefix)
+        else:
+            self.println(f"{text_prefix}: {self.wind_count}")
+
+    # Command handling, mirrors processChannelCommand()
+    def process_command(self, command):
+        if command == "S":
+            self.start_motors()
+        elif command == "T":
+            self.stop_motors()
+        elif command == "R":
+            self.wind_count = 0
+            self.revolutions = 0.0
+            self.magnet_passes = 0
+            self.println("Wind count reset to 0.")
+            self.println("Current wind count: 0")
+            self.println("Hall sensor current state: HIGH")
+        elif command.startswith("N"):
+            value = to_int(command[1:])
+            if value > 0:
+                self.desired_wind_count = value
+                self.println(f"Desired wind count set to {value}")
+        elif command.startswith("w_speed:"):
+            value = to_int(command[8:])
+            if value > 0:
+                self.winder_speed = value
+                self.println(f"Winder speed set to {value} Hz")
+        elif command.startswith("t_speed:"):
+            value = to_int(command[8:])
+            if value > 0:
+                self.traverse_step_delay = value
+                self.println(f"Traverse step delay set to {value} microseconds")
+        elif command.startswith("t_leftlimit:"):
+            self.left_limit = to_int(command[12:])
+            self.println(f"Left sweep limit set to {self.left_limit}")
+        elif command.startswith("t_rightlimit:"):
+            value = to_int(command[13:])
+            if 0 <= value <= MAX_RIGHT_LIMIT:
+                self.right_limit = value
+                self.println(f"Right sweep limit set to: {value}")
+            else:
+                self.println("Error: Right limit must be between 0 and 12800")
+        elif command == "t_home":
+            self.traverse_position = 0.0
+            self.println("Traverse position reset to home (0)")
+        elif command == PROFILE_OFF:
+            self.decel_profile = None
+            self.println("Deceleration profile off")
+        elif command.startswith(PROFILE_PREFIX):
+            self.set_decel_profile(command)
+        else:
+            self.println(f"Unknown command: {command}")
+
+    def set_decel_profile(self, command):
+        # Same checks as setDecelProfile()
+        values = [to_int(value) for value in command[len(PROFILE_PREFIX):].split(",")]
+        if len(values) < 3 or len(values) > MAX_POINTS + 1 or values[0] <= 0:
+            self.println("Error: Deceleration profile needs a span and 2 to 32 points")
+            return
+        if not all(0 < value <= 1000 for value in values[1:]):
+            self.println("Error: Deceleration profile points must be 1 to 1000")
+            return
+        self.decel_profile = DecelProfile(values[0], values[1:])
+        self.println(f"Deceleration profile set: {len(values) - 1} points over {values[0]} winds")
+
+    @property
+    def starting(self):
+        return self.start_done_at is not None
+
+    def start_motors(self):
+        if self.motors_running or self.starting:
+            return
+        self.traverse_moving_right = True
+        self.traverse_position += 50
+        self.println("Starting traverse motors first...")
+        self.start_done_at = time.monotonic() + START_TIME
+
+    def finish_start(self):
+        self.start_done_at = None
+        self.println("Traverse motors running, now starting winder motors...")
+        self.current_hz = 0.0
+        self.motors_running = True
+        self.println("All motors running")
+
+    def stop_motors(self):
+        if self.motors_running or self.starting:
+            self.motors_running = False
+            self.start_done_at = None
+            self.current_hz = 0.0
+            self.println("All motors stopped and disabled.")
+
+    def disable(self):
+        self.motors_running = False
+        self.start_done_at = None
+        self.current_hz = 0.0
+
+    # Physical model
+    def advance(self, dt):
+        if not self.motors_running:
+            return
+
+        remaining = self.desired_wind_count - self.wind_count
+        if self.decel_profile:
+            target_hz = stepper_hz(self.winder_speed * self.decel_profile.factor(remaining))
+        else:
+            target_hz = stepper_hz(self.winder_speed * slowdown_factor(remaining))
+        # The stepper ramps towards each new speed at its acceleration limit
+        if self.current_hz < target_hz:
+            self.current_hz = min(target_hz, self.current_hz + WINDER_ACCELERATION * dt)
+        else:
+            self.current_hz = max(target_hz, self.current_hz - WINDER_ACCELERATION * dt)
+
+        self.advance_traverse(dt)
+
+        self.revolutions += self.current_hz * dt / STEPS_PER_REVOLUTION
+        while self.magnet_passes + 1 <= self.revolutions:
+            self.magnet_passes += 1
+            self.bobbin_turns += 1
+            if not self.hall_sees_pass():
+                self.missed_pulses += 1
+                continue
+            self.wind_count += 1
+            if self.winder.binary_telemetry and self.channel == CHANNELS[0]:
+                # Binary frames are small enough to send on every wind
+                self.send_telemetry("Wind Count")
+            elif self.wind_count % 5 == 0 or self.wind_count < 10:
+                self.println(f"Wind Count: {self.wind_count}")
+            if self.desired_wind_count > 0 and self.wind_count >= self.desired_wind_count:
+                self.stop_motors()
+                self.println(f"Target wind count reached: {self.wind_count}")
+                self.revolutions = float(self.magnet_passes)
+                break
+
+    def hall_sees_pass(self):
+        # countWinds() reads the sensor once per loop() pass; a pass is only
+        # counted if one of those reads lands while the magnet is in front
+        magnet_arc = self.winder.magnet_arc
+        if magnet_arc is None or self.current_hz <= 0:
+            return True
+        low_time = magnet_arc * STEPS_PER_REVOLUTION / self.current_hz
+        return self.winder.hall_rng.random() < low_time / self.winder.loop_time()
+
+    def advance_traverse(self, dt):
+        # Each channel steps on its own deadline, whatever the other does
+        steps = dt * 1e6 / step_period_us(self.traverse_step_delay)
+        if self.traverse_moving_right:
+            self.traverse_position += steps
+            if self.traverse_position >= self.right_limit:
+                self.traverse_position = float(self.right_limit)
+                self.traverse_moving_right = False
+                self.println("Traverse: Changing direction to LEFT")
+        else:
+            self.traverse_position -= steps
+            if self.traverse_position <= self.left_limit:
+                self.traverse_position = float(self.left_limit)
+                self.traverse_moving_right = True
+                self.println("Traverse: Changing direction to RIGHT")
+
+
+class VirtualWinder:
+    def __init__(self, baud=115200, firehose=False, tick=0.002, banner=True, binary_support=True,
+                 link_path=None, magnet_arc=None):
+        # `link_path` is kept pointing at the current pty, which changes
+        # each time the link is dropped
+        self.link_path = link_path
+        self.master_fd = self.slave_fd = None
+        self.open_pty()
+
+        self.baud = baud
+        self.firehose = firehose
+        # Set binary_support=False to behave like firmware that predates
+        # the binary telemetry frames
+        self.binary_support = binary_support
+        self.start_time = time.monotonic()
+        self.tick = tick
+        # Fraction of a turn the hall sensors read LOW; None counts every turn
+        self.magnet_arc = magnet_arc
+        self.hall_rng = random.Random(0)
+
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+        self.in_buffer = bytearray()
+        self.out_buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.commands_processed = 0
+
+        # Fault injection
+        self.link_up_at = None
+        self.drop_outage = None
+        self.mute_until = 0.0
+        self.fault_interval = 0.0
+        self.fault_outage = 2.0
+        self.next_fault = None
+        self.faults_injected = 0
+
+        self.channels = [SimChannel(self, channel) for channel in CHANNELS]
+        self.reset_firmware()
+        if banner:
+            for line in BANNER:
+                self.println(line)
+
+    def __getattr__(self, name):
+        # Channel 1's state reads as the winder's own, as it did before
+        # there were two channels
+        if name == "channels":
+            raise AttributeError(name)
+        return getattr(self.channels[0], name)
+
+    def open_pty(self):
+        # The slave side stays open while the link is up so clients can
+        # close and reopen the port without the master seeing EIO
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        flags = fcntl.fcntl(self.master_fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.master_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.pty_path = os.ttyname(self.slave_fd)
+        if self.link_path:
+            temp_path = self.link_path + ".tmp"
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            os.symlink(self.pty_path, temp_path)
+            os.replace(temp_path, self.link_path)
+
+    @property
+    def port(self):
+        return self.link_path or self.pty_path
+
+    def reset_firmware(self):
+        # Power-on state of the sketch's globals
+        self.binary_telemetry = False
+        for channel in self.channels:
+            channel.reset()
+        self.busy_until = 0.0
+        self.booting = False
+        self.last_status_time = 0.0
+        self.loop_credit = 0.0
+
+    # Output helpers
+    def println(self, text):
+        self.out_buffer += (text + "\r\n").encode("utf-8")
+
+    def send_telemetry(self, text_prefix):
+        primary = self.channels[0]
+        if self.binary_telemetry:
+            millis = int((time.monotonic() - self.start_time) * 1000)
+            self.out_buffer += encode_frame(primary.wind_count, millis, int(primary.current_hz),
+                                            int(primary.traverse_position))
+        else:
+            self.println(f"{text_prefix}: {primary.wind_count}")
+
+    def loop_time(self):
+        # A pass lasts five steps of the first running channel
+        for channel in self.channels:
+            if channel.motors_running:
+                return STEPS_PER_PASS * step_period_us(channel.traverse_step_delay) / 1e6
+        return IDLE_LOOP_TIME
+
+    # Command handling, mirrors processCommand()
+    def process_command(self, command):
+        self.commands_processed += 1
+        channel, rest = split_channel(command)
+        if rest != command and channel in CHANNELS:
+            target = self.channels[CHANNELS.index(channel)]
+            target.addressed = True
+            target.process_command(rest)
+        elif command == REQUEST_BINARY and self.binary_support:
+            self.binary_telemetry = True
+            self.println(REPLY_BINARY)
+        elif command == REQUEST_TEXT and self.binary_support:
+            self.binary_telemetry = False
+            self.println(REPLY_TEXT)
+        elif command == "disable_all_motors":
+            for target in self.channels:
+                target.disable()
+            self.println("All motors disabled.")
+        else:
+            self.channels[0].process_command(command)
+
+    def step(self, now, dt):
+        with self.lock:
+            if self.booting:
+                # Anything sent while the board boots is lost
+                self.in_buffer.clear()
+                if now < self.busy_until:
+                    return
+                self.booting = False
+                self.last_status_time = now
+                for line in BANNER:
+                    self.println(line)
+            for channel in self.channels:
+                if channel.starting and now >= channel.start_done_at:
+                    channel.finish_start()
+
+            # One command per loop() pass, like Serial.readStringUntil()
+            self.loop_credit = min(self.loop_credit + dt, 1.0)
+            while self.loop_credit >= self.loop_time():
+                newline = self.in_buffer.find(b"\n")
+                if newline < 0:
+                    self.loop_credit = 0.0
+                    break
+                raw = bytes(self.in_buffer[:newline])
+                del self.in_buffer[:newline + 1]
+                self.loop_credit -= self.loop_time()
+                self.process_command(raw.decode("utf-8", "replace").strip())
+
+            for channel in self.channels:
+                channel.advance(dt)
+
+            if now - self.last_status_time >= STATUS_PRINT_INTERVAL:
+                self.send_telemetry("Current Wind Count")
+                for channel in self.channels[1:]:
+                    if channel.addressed:
+                        channel.send_telemetry("Current Wind Count")
+                self.last_status_time = now
+
+    # Fault injection
+    @property
+    def link_up(self):
+        return self.link_up_at is None
+
+    def drop_link(self, outage):
+        # Like a USB glitch: the port disappears (clients see EIO) and a new
+        # one appears after `outage` seconds. The firmware keeps running.
+        # The pty is closed by check_faults() on the serving thread, which
+        # is the only one that touches the fds.
+        with self.lock:
+            if self.link_up and self.drop_outage is None:
+                self.drop_outage = outage
+                self.faults_injected += 1
+
+    def close_pty(self, outage):
+        with self.lock:
+            os.close(self.master_fd)
+            os.close(self.slave_fd)
+            self.master_fd = self.slave_fd = None
+            self.in_buffer.clear()
+            self.out_buffer.clear()
+            self.link_up_at = time.monotonic() + outage
+            self.drop_outage = None
+
+    def brownout(self):
+        # The board resets: motors stop, the count and setpoints go back to
+        # their defaults and the banner is printed again after booting
+        with self.lock:
+            self.reset_firmware()
+            self.in_buffer.clear()
+            self.busy_until = time.monotonic() + BOOT_TIME
+            self.booting = True
+            self.faults_injected += 1
+
+    def hang(self, duration):
+        # The link stays open but nothing comes out of it
+        with self.lock:
+            self.mute_until = time.monotonic() + duration
+            self.faults_injected += 1
+
+    def inject_fault(self, kind=None):
+        kind = kind or random.choice(FAULTS)
+        if kind == FAULT_DROP:
+            self.drop_link(self.fault_outage)
+        elif kind == FAULT_BROWNOUT:
+            self.brownout()
+        else:
+            self.hang(self.fault_outage + 3.0)
+        return kind
+
+    def check_faults(self, now):
+        # Brings a dropped link back, and injects a random fault every
+        # `fault_interval` seconds when that is enabled
+        if self.drop_outage is not None:
+            self.close_pty(self.drop_outage)
+        if self.link_up_at is not None and now >= self.link_up_at:
+            with self.lock:
+                self.open_pty()
+                self.link_up_at = None
+        if self.fault_interval:
+            if self.next_fault is None:
+                self.next_fault = now + self.fault_interval
+            elif now >= self.next_fault and self.link_up:
+                self.inject_fault()
+                self.next_fault = now + self.fault_interval
+
+    # I/O
+    def link_budget(self, dt):
+        if not self.baud:
+            return 1 << 20
+        # 8N1 framing, 10 bits per byte
+        return max(1, int(self.baud / 10 * dt))
+
+    def pump_io(self, dt):
+        if not self.link_up:
+            return
+        try:
+            data = os.read(self.master_fd, 4096)
+            if data:
+                self.bytes_in += len(data)
+                with self.lock:
+                    self.in_buffer += data
+        except (BlockingIOError, OSError):
+            pass
+
+        budget = self.link_budget(dt)
+        with self.lock:
+            if time.monotonic() < self.mute_until:
+                self.out_buffer.clear()
+                return
+            if self.firehose:
+                while len(self.out_buffer) < budget:
+                    self.send_telemetry("Current Wind Count")
+            if not self.out_buffer:
+                return
+            chunk = bytes(self.out_buffer[:budget])
+        try:
+            written = os.write(self.master_fd, chunk)
+        except (BlockingIOError, OSError):
+            written = 0
+        if written:
+            self.bytes_out += written
+            with self.lock:
+                del self.out_buffer[:written]
+
+    def serve_forever(self):
+        self.running = True
+        last = time.monotonic()
+        while self.running:
+            if self.link_up:
+                select.select([self.master_fd], [], [], self.tick)
+            else:
+                time.sleep(self.tick)
+            now = time.monotonic()
+            dt = now - last
+            last = now
+            self.check_faults(now)
+            self.pump_io(dt)
+            self.step(now, dt)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+
+    def close(self):
+        self.stop()
+        if self.link_up:
+            os.close(self.master_fd)
+            os.close(self.slave_fd)
+        if self.link_path and os.path.lexists(self.link_path):
+            os.remove(self.link_path)
+
+
+def serve_group(sims, tick=0.002):
+    # Run several virtual winders on one thread, for multi-port benchmarks
+    last = time.monotonic()
+    while True:
+        fds = [sim.master_fd for sim in sims if sim.link_up]
+        if fds:
+            select.select(fds, [], [], tick)
+        else:
+            time.sleep(tick)
+        now = time.monotonic()
+        dt = now - last
+        last = now
+        for sim in sims:
+            sim.check_faults(now)
+            sim.pump_io(dt)
+            sim.step(now, dt)
+
+
+def to_int(text):
+    # Arduino String::toInt() returns 0 for anything it can't parse
+    digits = ""
+    for ch in text.strip():
+        if ch.isdigit() or (ch == "-" and not digits):
+            digits += ch
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual pickup winder on a pseudo-terminal")
+    parser.add_argument("--baud", type=int, default=115200,
+                        help="Emulated link rate in baud, 0 for unthrottled")
+    parser.add_argument("--firehose", action="store_true",
+                        help="Emit telemetry as fast as the link allows")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Reject binary telemetry like older firmware")
+    parser.add_argument("--count", type=int, default=1, help="Number of virtual winders")
+    parser.add_argument("--link", help="Stable symlink to the pty (numbered when --count > 1)")
+    parser.add_argument("--faults", type=float, default=0.0,
+                        help="Inject a random fault (link drop, brownout, hang) every N seconds")
+    parser.add_argument("--outage", type=float, default=2.0, help="Seconds a dropped link stays down")
+    parser.add_argument("--magnet-arc", type=float,
+                        help="Fraction of a turn the hall sensor sees the magnet; misses pulses at speed")
+    args = parser.parse_args()
+
+    sims = []
+    for i in range(args.count):
+        link_path = None
+        if args.link:
+            link_path = args.link if args.count == 1 else f"{args.link}{i + 1}"
+        sim = VirtualWinder(baud=args.baud, firehose=args.firehose, binary_support=not args.text_only,
+                            link_path=link_path, magnet_arc=args.magnet_arc)
+        sim.fault_interval = args.faults
+        sim.fault_outage = args.outage
+        sims.append(sim)
+    for sim in sims:
+        print(f"Virtual winder on {sim.port}", flush=True)
+    try:
+        serve_group(sims)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sim in sims:
+            sim.close()
+
+
+if __name__ == "__main__":
+    main()